@@ -21,7 +21,7 @@ class PecaAdmin(admin.ModelAdmin):
 class ItemPedidoInline(admin.TabularInline):
     model = ItemPedido
     extra = 1
-    readonly_fields = ('subtotal',)
+    readonly_fields = ('valor_unitario', 'subtotal')
 
 # Configuração do admin para Pedido
 @admin.register(Pedido)
@@ -41,8 +41,8 @@ class PedidoAdmin(admin.ModelAdmin):
 # Configuração do admin para ItemPedido
 @admin.register(ItemPedido)
 class ItemPedidoAdmin(admin.ModelAdmin):
-    list_display = ('pedido', 'peca', 'quantidade', 'subtotal')
+    list_display = ('pedido', 'peca', 'quantidade', 'valor_unitario', 'subtotal')
     list_filter = ('pedido', 'peca')
     search_fields = ('peca__nome', 'pedido__id_unico')
-    readonly_fields = ('subtotal',)
+    readonly_fields = ('valor_unitario', 'subtotal')
     ordering = ('pedido', 'peca')
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CarConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'car'
+
+    def ready(self):
+        # Registrar os sinais de invalidação do cache do catálogo
+        from . import signals  # noqa: F401
+
+        # PRAGMAs do SQLite em cada conexão nova
+        from django.db.backends.signals import connection_created
+        from .db import aplicar_pragmas
+        connection_created.connect(aplicar_pragmas, dispatch_uid='car.db.aplicar_pragmas')
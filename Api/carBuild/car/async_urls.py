@@ -0,0 +1,25 @@
+from django.urls import path
+from . import async_views
+
+# Variante assíncrona do gateway: mesmas rotas de car/urls.py, servidas por views async
+urlpatterns = [
+    # ========== ENDPOINTS - CARROS (Microsserviço A) ==========
+    path('cars/', async_views.car_list, name='async_car_list'),
+    path('cars/<int:car_id>/', async_views.car_detail, name='async_car_detail'),
+    path('cars/<int:car_id>/pecas/', async_views.car_pecas, name='async_car_pecas'),
+    
+    # ========== ENDPOINTS - PEÇAS (Microsserviço A) ==========
+    path('pecas/', async_views.peca_list, name='async_peca_list'),
+    path('pecas/<int:peca_id>/', async_views.peca_detail, name='async_peca_detail'),
+    path('search/pecas/', async_views.search_pecas, name='async_search_pecas'),
+    
+    # ========== ENDPOINTS - CÁLCULOS E PEDIDOS (Microsserviço B) ==========
+    path('calculate-price/', async_views.calculate_price, name='async_calculate_price'),
+    path('orders/', async_views.orders, name='async_orders'),
+    path('orders/batch/', async_views.create_orders_batch, name='async_create_orders_batch'),
+    path('orders/<str:order_id>/report/', async_views.order_report, name='async_order_report'),
+    path('generate-order-id/', async_views.generate_order_id, name='async_generate_order_id'),
+    
+    # ========== ENDPOINTS - UTILITÁRIOS ==========
+    path('health/', async_views.health_check, name='async_health_check'),
+]
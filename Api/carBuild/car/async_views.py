@@ -0,0 +1,268 @@
+"""
+Variante assíncrona do gateway (para execução em ASGI: carBuild.asgi)
+Mesmos contratos de car/views.py, montados em /api/async/.
+
+As views são funções async nativas do Django (o DRF não suporta views async),
+então métodos HTTP e CSRF são tratados pelo decorator async_api_view.
+"""
+
+import functools
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+
+from microservices.async_clients import async_microservice_a, async_microservice_b
+from microservices.health import health_checker
+from microservices.metrics import PEDIDOS_CRIADOS, TAMANHO_CARRINHO
+
+from .idempotency import idempotent
+
+
+def async_api_view(methods):
+    """Equivalente async de @api_view: restringe métodos e isenta de CSRF"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({
+                    'detail': f'Método "{request.method}" não permitido.'
+                }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                return await view(request, *args, **kwargs)
+            except Exception as e:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'Erro no gateway: {str(e)}'
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def gateway_response(result, success_status=status.HTTP_200_OK, error_status=status.HTTP_500_INTERNAL_SERVER_ERROR):
+    """Mapeia o 'status' retornado pelos clientes para o status HTTP"""
+    http_status = success_status if result['status'] == 'success' else error_status
+    return JsonResponse(result, status=http_status)
+
+
+# ========== GATEWAY VIEWS - CARROS (via Microsserviço A) ==========
+
+@async_api_view(['GET'])
+async def car_list(request):
+    """GET /api/async/cars/?cursor=&limit="""
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    validation = async_microservice_a.validate_pagination(cursor, limit)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_a.get_cars(cursor=cursor, limit=limit)
+    return gateway_response(result)
+
+
+@async_api_view(['GET'])
+async def car_detail(request, car_id):
+    """GET /api/async/cars/{id}/"""
+    result = await async_microservice_a.get_car_by_id(car_id)
+    return gateway_response(result, error_status=status.HTTP_404_NOT_FOUND)
+
+
+@async_api_view(['GET'])
+async def car_pecas(request, car_id):
+    """GET /api/async/cars/{id}/pecas/"""
+    result = await async_microservice_a.get_car_parts(car_id)
+    return gateway_response(result, error_status=status.HTTP_404_NOT_FOUND)
+
+
+# ========== GATEWAY VIEWS - PEÇAS (via Microsserviço A) ==========
+
+@async_api_view(['GET'])
+async def peca_list(request):
+    """GET /api/async/pecas/?nome=&car_id=&min_valor=&max_valor=&cursor=&limit="""
+    filters = {
+        'nome': request.GET.get('nome'),
+        'car_id': request.GET.get('car_id'),
+        'min_valor': request.GET.get('min_valor'),
+        'max_valor': request.GET.get('max_valor'),
+    }
+    filters = {k: v for k, v in filters.items() if v is not None}
+
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    validation = async_microservice_a.validate_pagination(cursor, limit)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_a.get_parts(filters, cursor=cursor, limit=limit)
+    return gateway_response(result)
+
+
+@async_api_view(['GET'])
+async def peca_detail(request, peca_id):
+    """GET /api/async/pecas/{id}/"""
+    result = await async_microservice_a.get_part_by_id(peca_id)
+    return gateway_response(result, error_status=status.HTTP_404_NOT_FOUND)
+
+
+@async_api_view(['GET'])
+async def search_pecas(request):
+    """GET /api/async/search/pecas/?q=&limit="""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Parâmetro q é obrigatório'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    limit = request.GET.get('limit')
+    validation = async_microservice_a.validate_pagination(limit=limit)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_a.search_parts(query, limit=limit)
+    return gateway_response(result)
+
+
+# ========== GATEWAY VIEWS - CÁLCULOS E PEDIDOS (via Microsserviço B) ==========
+
+def _json_body(request):
+    return json.loads(request.body) if request.body else {}
+
+
+@async_api_view(['POST'])
+async def calculate_price(request):
+    """POST /api/async/calculate-price/"""
+    try:
+        items = _json_body(request).get('items', [])
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not items:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Lista de itens é obrigatória'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    TAMANHO_CARRINHO.observe(len(items))
+    result = await async_microservice_b.calculate_price(items)
+    return gateway_response(result, error_status=status.HTTP_400_BAD_REQUEST)
+
+
+async def orders(request):
+    """Rota /api/async/orders/: GET lista pedidos, os demais métodos vão para create_order"""
+    if request.method == 'GET':
+        return await order_list(request)
+    return await create_order(request)
+
+orders.csrf_exempt = True
+
+
+@async_api_view(['GET'])
+async def order_list(request):
+    """GET /api/async/orders/?data_inicio=&data_fim=&min_valor=&max_valor=&cursor=&limit="""
+    filters = {
+        'data_inicio': request.GET.get('data_inicio'),
+        'data_fim': request.GET.get('data_fim'),
+        'min_valor': request.GET.get('min_valor'),
+        'max_valor': request.GET.get('max_valor'),
+    }
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    validation = async_microservice_b.validate_order_list(filters, cursor, limit)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_b.list_orders(validation['filters'], cursor=cursor, limit=limit)
+    return gateway_response(result)
+
+
+@idempotent('orders')
+@async_api_view(['POST'])
+async def create_order(request):
+    """POST /api/async/orders/ (Idempotency-Key opcional, como em /api/orders/)"""
+    try:
+        data = _json_body(request)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    validation = async_microservice_b.validate_order_data(data)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_b.create_order(data)
+    if result['status'] == 'success':
+        PEDIDOS_CRIADOS.inc()
+    # Falha transitória (circuito aberto, rede, banco ocupado): 503, como no gateway síncrono
+    error_status = status.HTTP_503_SERVICE_UNAVAILABLE if result.get('retryable') else status.HTTP_400_BAD_REQUEST
+    return gateway_response(result, success_status=status.HTTP_201_CREATED, error_status=error_status)
+
+
+@idempotent('orders_batch')
+@async_api_view(['POST'])
+async def create_orders_batch(request):
+    """POST /api/async/orders/batch/ (201 todos criados, 207 parte, 400 nenhum)"""
+    try:
+        data = _json_body(request)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    validation = async_microservice_b.validate_orders_batch(data)
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_b.create_orders_bulk(data['orders'])
+    if result['status'] != 'success':
+        http_status = status.HTTP_400_BAD_REQUEST if 'data' in result else status.HTTP_500_INTERNAL_SERVER_ERROR
+    elif result['data']['failed']:
+        http_status = status.HTTP_207_MULTI_STATUS
+    else:
+        http_status = status.HTTP_201_CREATED
+    if result['status'] == 'success':
+        PEDIDOS_CRIADOS.inc(result['data']['created'])
+    return JsonResponse(result, status=http_status)
+
+
+@async_api_view(['GET'])
+async def order_report(request, order_id):
+    """GET /api/async/orders/{order_id}/report/"""
+    result = await async_microservice_b.get_order_report(order_id)
+    return gateway_response(result, error_status=status.HTTP_404_NOT_FOUND)
+
+
+@async_api_view(['POST'])
+async def generate_order_id(request):
+    """POST /api/async/generate-order-id/ (body opcional: {"count": N})"""
+    try:
+        data = _json_body(request)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    validation = async_microservice_b.validate_order_id_count(data.get('count', 1))
+    if validation['status'] != 'success':
+        return JsonResponse(validation, status=status.HTTP_400_BAD_REQUEST)
+
+    result = await async_microservice_b.generate_order_id(validation['count'])
+    return gateway_response(result)
+
+
+# ========== GATEWAY VIEWS - UTILITÁRIAS ==========
+
+@async_api_view(['GET'])
+async def health_check(request):
+    """GET /api/async/health/ (mesmos probes em paralelo e cache do gateway síncrono)"""
+    report = await sync_to_async(health_checker.check, thread_sensitive=False)()
+    dependencias = report['dependencies']
+    overall_status = report['healthy']
+
+    return JsonResponse({
+        'status': 'success' if overall_status else 'warning',
+        'gateway': 'online',
+        'mode': 'async',
+        'microservices': {nome: dependencia['status'] for nome, dependencia in dependencias.items()},
+        'latency_ms': {nome: dependencia['latency_ms'] for nome, dependencia in dependencias.items()},
+        'checked_at': report['checked_at'],
+        'cached': report['cached'],
+        'timestamp': str(timezone.now())
+    }, status=status.HTTP_200_OK if overall_status else status.HTTP_503_SERVICE_UNAVAILABLE)
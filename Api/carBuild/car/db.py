@@ -0,0 +1,54 @@
+"""
+Perfil de conexão do SQLite
+Responsável por: aplicar os PRAGMAs de SQLITE_PRAGMAS em cada conexão nova
+
+Ligado ao sinal connection_created em CarConfig.ready(). Com CONN_MAX_AGE as
+conexões são reaproveitadas entre requisições, então o custo dos PRAGMAs é
+pago uma vez por conexão, não por requisição.
+
+journal_mode=WAL fica gravado no arquivo; os demais valem só para a conexão.
+"""
+
+import logging
+import re
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs montados por interpolação: nome e valor precisam ser identificadores ou números
+_TOKEN = re.compile(r'^-?\w+$')
+
+# Sem efeito (ou sem sentido) em bancos em memória, como o dos testes
+_SO_ARQUIVO = frozenset({'journal_mode', 'mmap_size'})
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    """Handler de connection_created: executa SQLITE_PRAGMAS na ordem definida"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    em_memoria = connection.is_in_memory_db()
+
+    # Direto na conexão sqlite3: não passa pelos execute_wrappers nem conta como
+    # consulta da requisição que abriu a conexão
+    db = connection.connection
+    for nome, valor in pragmas.items():
+        if em_memoria and nome in _SO_ARQUIVO:
+            continue
+        if not _TOKEN.match(str(nome)) or not _TOKEN.match(str(valor)):
+            raise ImproperlyConfigured(f'SQLITE_PRAGMAS inválido: {nome} = {valor!r}')
+        resultado = db.execute(f'PRAGMA {nome} = {valor}').fetchone()
+        if nome == 'journal_mode' and resultado and str(resultado[0]).lower() != str(valor).lower():
+            # Ex.: WAL não é suportado no sistema de arquivos (rede, somente leitura)
+            logger.warning(f'SQLite manteve journal_mode={resultado[0]} (pedido: {valor})')
+
+
+def pragmas_atuais(connection, nomes=None):
+    """Valores em vigor na conexão (diagnóstico e testes)"""
+    connection.ensure_connection()
+    nomes = nomes or getattr(settings, 'SQLITE_PRAGMAS', {}).keys()
+    return {
+        nome: connection.connection.execute(f'PRAGMA {nome}').fetchone()[0]
+        for nome in nomes if _TOKEN.match(str(nome))
+    }
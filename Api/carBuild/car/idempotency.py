@@ -0,0 +1,284 @@
+"""
+Idempotency-Key para criação de pedidos
+Responsável por: devolver a resposta original em retries do cliente, sem gravar de novo
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+
+from .models import ChaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+class IdempotencyStore:
+    """
+    Registro de chaves na tabela ChaveIdempotencia (endpoint + chave únicos).
+
+    A primeira requisição grava a chave com status_code nulo antes de executar
+    a view; a unicidade no banco garante que só uma delas execute. Enquanto a
+    view executa, RenovacaoReserva renova criado_em: uma reserva só é tratada
+    como abandonada (processo morto) depois de IDEMPOTENCY_LOCK_TIMEOUT
+    segundos sem renovação. Duplicatas concorrentes esperam a resposta ser
+    gravada por até IDEMPOTENCY_LOCK_TIMEOUT segundos. Chaves expiram após
+    IDEMPOTENCY_KEY_TTL segundos (ver o comando purge_idempotency_keys).
+    """
+
+    POLL_INTERVAL = 0.05
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)
+
+    @property
+    def lock_timeout(self):
+        return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 30)
+
+    def _expirada(self, registro):
+        idade = (timezone.now() - registro.criado_em).total_seconds()
+        if registro.status_code is None:
+            return idade > self.lock_timeout
+        return idade > self.ttl
+
+    def buscar(self, endpoint, chave):
+        """Registro válido da chave; registros expirados são apagados"""
+        while True:
+            registro = ChaveIdempotencia.objects.filter(endpoint=endpoint, chave=chave).first()
+            if registro is None or not self._expirada(registro):
+                return registro
+            # Só apaga se ninguém renovou a reserva desde a leitura
+            apagados, _ = ChaveIdempotencia.objects.filter(
+                pk=registro.pk, criado_em=registro.criado_em
+            ).delete()
+            if apagados:
+                return None
+
+    def reservar(self, endpoint, chave, hash_requisicao):
+        """Retorna (registro, reservada); reservada=False se a chave já existia"""
+        while True:
+            registro = self.buscar(endpoint, chave)
+            if registro is not None:
+                return registro, False
+            try:
+                with transaction.atomic():
+                    registro = ChaveIdempotencia.objects.create(
+                        endpoint=endpoint, chave=chave, hash_requisicao=hash_requisicao
+                    )
+                return registro, True
+            except IntegrityError:
+                # Outra requisição reservou a mesma chave entre o SELECT e o INSERT
+                continue
+
+    def aguardar(self, registro):
+        """Espera a requisição original gravar a resposta; None se não gravar a tempo"""
+        limite = time.monotonic() + self.lock_timeout
+        while time.monotonic() < limite:
+            registro = ChaveIdempotencia.objects.filter(pk=registro.pk).first()
+            if registro is None:
+                # A original falhou e liberou a chave
+                return None
+            if registro.status_code is not None:
+                return registro
+            time.sleep(self.POLL_INTERVAL)
+        return None
+
+    async def aaguardar(self, registro):
+        """aguardar() para as views async, sem bloquear o event loop"""
+        limite = time.monotonic() + self.lock_timeout
+        while time.monotonic() < limite:
+            registro = await ChaveIdempotencia.objects.filter(pk=registro.pk).afirst()
+            if registro is None:
+                return None
+            if registro.status_code is not None:
+                return registro
+            await asyncio.sleep(self.POLL_INTERVAL)
+        return None
+
+    def renovar(self, registro):
+        """Marca a reserva como viva (a view ainda está executando)"""
+        ChaveIdempotencia.objects.filter(pk=registro.pk, status_code__isnull=True).update(
+            criado_em=timezone.now()
+        )
+
+    def concluir(self, registro, status_code, resposta):
+        atualizados = ChaveIdempotencia.objects.filter(pk=registro.pk, status_code__isnull=True).update(
+            status_code=status_code, resposta=resposta
+        )
+        if not atualizados:
+            # Reserva removida durante a execução (ex.: purge manual); o pedido já
+            # foi gravado, então a resposta segue para o cliente sem ser guardada
+            logger.warning(f'Idempotency-Key {registro.endpoint} {registro.chave} removida antes da resposta')
+
+    def liberar(self, registro):
+        ChaveIdempotencia.objects.filter(pk=registro.pk).delete()
+
+    def purge(self):
+        """Remove chaves expiradas e reservas abandonadas; retorna quantas"""
+        agora = timezone.now()
+        expiradas = ChaveIdempotencia.objects.filter(
+            criado_em__lt=agora - timedelta(seconds=self.ttl)
+        ).delete()[0]
+        abandonadas = ChaveIdempotencia.objects.filter(
+            status_code__isnull=True,
+            criado_em__lt=agora - timedelta(seconds=self.lock_timeout)
+        ).delete()[0]
+        return expiradas + abandonadas
+
+
+idempotency_store = IdempotencyStore()
+
+
+class RenovacaoReserva:
+    """
+    Renova a reserva a cada terço de IDEMPOTENCY_LOCK_TIMEOUT enquanto a view
+    executa, em uma thread própria (a view pode passar do timeout esperando
+    o microsserviço sem que uma duplicata assuma a chave)
+    """
+
+    def __init__(self, store, registro):
+        self.store = store
+        self.registro = registro
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='idempotency-renovacao', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._parar.set()
+        self._thread.join()
+        return False
+
+    def _executar(self):
+        try:
+            while not self._parar.wait(self.store.lock_timeout / 3):
+                try:
+                    self.store.renovar(self.registro)
+                except DatabaseError as e:
+                    logger.warning(f'Falha ao renovar Idempotency-Key {self.registro.chave}: {e}')
+        finally:
+            # Conexão desta thread (se chegou a abrir uma)
+            connection.close()
+
+
+def _erro(mensagem, status_code):
+    return JsonResponse({'status': 'error', 'message': mensagem}, status=status_code)
+
+
+def _chave_invalida(chave):
+    if len(chave) > 255:
+        return _erro('Idempotency-Key deve ter no máximo 255 caracteres', status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+def _replay(registro, hash_requisicao):
+    """Resposta para uma chave já reservada; None se a original ainda está executando"""
+    if registro is None:
+        return _erro('Requisição com esta Idempotency-Key ainda em processamento', status.HTTP_409_CONFLICT)
+    if registro.hash_requisicao != hash_requisicao:
+        return _erro('Idempotency-Key já usada com outro corpo de requisição', status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if registro.status_code is None:
+        return None
+    return JsonResponse(registro.resposta, status=registro.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _finalizar(registro, response):
+    """Guarda a resposta da view; 5xx e respostas sem JSON liberam a chave"""
+    if response.status_code >= 500:
+        corpo = None
+    elif hasattr(response, 'data'):
+        corpo = response.data  # Response do DRF, ainda não renderizada
+    elif isinstance(response, JsonResponse):
+        corpo = json.loads(response.content)  # Views async (car/async_views.py)
+    else:
+        corpo = None
+    if corpo is None:
+        idempotency_store.liberar(registro)
+    else:
+        idempotency_store.concluir(registro, response.status_code, corpo)
+
+
+def idempotent(endpoint):
+    """
+    Decorator para views POST que aceitam o cabeçalho Idempotency-Key.
+    Deve ficar acima de @api_view (ou de @async_api_view, nas views async).
+    Sem o cabeçalho, a view roda normalmente.
+
+    - Mesma chave e mesmo corpo: devolve a resposta original (Idempotent-Replayed: true)
+    - Mesma chave e corpo diferente: 422
+    - Original ainda em processamento além do tempo de espera: 409
+    - Respostas 5xx e exceções liberam a chave para um novo retry
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                chave = request.META.get(IDEMPOTENCY_HEADER)
+                if not chave or request.method != 'POST':
+                    return await view(request, *args, **kwargs)
+                invalida = _chave_invalida(chave)
+                if invalida is not None:
+                    return invalida
+
+                hash_requisicao = hashlib.sha256(request.body).hexdigest()
+                registro, reservada = await sync_to_async(idempotency_store.reservar)(
+                    endpoint, chave, hash_requisicao
+                )
+                if not reservada:
+                    resposta = _replay(registro, hash_requisicao)
+                    if resposta is None:
+                        resposta = _replay(await idempotency_store.aaguardar(registro), hash_requisicao)
+                    return resposta
+
+                try:
+                    with RenovacaoReserva(idempotency_store, registro):
+                        response = await view(request, *args, **kwargs)
+                except Exception:
+                    await sync_to_async(idempotency_store.liberar)(registro)
+                    raise
+                await sync_to_async(_finalizar)(registro, response)
+                return response
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            chave = request.META.get(IDEMPOTENCY_HEADER)
+            if not chave or request.method != 'POST':
+                return view(request, *args, **kwargs)
+            invalida = _chave_invalida(chave)
+            if invalida is not None:
+                return invalida
+
+            hash_requisicao = hashlib.sha256(request.body).hexdigest()
+            registro, reservada = idempotency_store.reservar(endpoint, chave, hash_requisicao)
+            if not reservada:
+                resposta = _replay(registro, hash_requisicao)
+                if resposta is None:
+                    resposta = _replay(idempotency_store.aguardar(registro), hash_requisicao)
+                return resposta
+
+            try:
+                with RenovacaoReserva(idempotency_store, registro):
+                    response = view(request, *args, **kwargs)
+            except Exception:
+                idempotency_store.liberar(registro)
+                raise
+            _finalizar(registro, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,417 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.utils import timezone
+from wsgiref.simple_server import make_server
+from .loadtest_async import PooledWSGIServer, QuietWSGIRequestHandler, porta_livre
+import argparse
+import asyncio
+import django
+import json
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Peso de cada operação no tráfego (sobrescrito por --mix)
+MIX_PADRAO = {
+    'cars_list': 10,
+    'parts_list': 20,
+    'car_parts': 20,
+    'calculate_price': 25,
+    'create_order': 10,
+    'order_report': 15,
+}
+
+# db;dur=3.10;desc="5 queries" (car/middleware.py)
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def parse_mix(texto):
+    """'cars_list=10,create_order=5' -> {'cars_list': 10, 'create_order': 5}"""
+    mix = {}
+    for parte in filter(None, (p.strip() for p in texto.split(','))):
+        nome, _, peso = parte.partition('=')
+        if nome not in MIX_PADRAO:
+            raise CommandError(f'Operação desconhecida em --mix: {nome} (use {", ".join(MIX_PADRAO)})')
+        try:
+            mix[nome] = int(peso)
+        except ValueError:
+            raise CommandError(f'Peso inválido em --mix: {parte}')
+        if mix[nome] < 0:
+            raise CommandError(f'Peso negativo em --mix: {parte}')
+    if not any(mix.values()):
+        raise CommandError('--mix precisa de ao menos uma operação com peso positivo')
+    return mix
+
+
+def _ordem_endpoint(nome):
+    # calculate_price[5] antes de calculate_price[20]
+    base, _, tamanho = nome.partition('[')
+    return base, int(tamanho.rstrip(']') or 0)
+
+
+def percentil(ordenados, p):
+    """Percentil por posição mais próxima sobre uma lista já ordenada"""
+    if not ordenados:
+        return None
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def resumir(amostras, duracao):
+    """
+    Estatísticas de um endpoint a partir das amostras
+    (latência em ms, erro, consultas SQL e ms no banco do Server-Timing)
+    """
+    latencias = sorted(amostra['ms'] for amostra in amostras)
+    consultas = [amostra['queries'] for amostra in amostras if amostra['queries'] is not None]
+    db_ms = [amostra['db_ms'] for amostra in amostras if amostra['db_ms'] is not None]
+    arredondar = lambda valor: round(valor, 2) if valor is not None else None  # noqa: E731
+    return {
+        'requests': len(amostras),
+        'errors': sum(amostra['erro'] for amostra in amostras),
+        'rps': round(len(amostras) / duracao, 1) if duracao else None,
+        'mean_ms': arredondar(sum(latencias) / len(latencias)) if latencias else None,
+        'p50_ms': arredondar(percentil(latencias, 50)),
+        'p95_ms': arredondar(percentil(latencias, 95)),
+        'p99_ms': arredondar(percentil(latencias, 99)),
+        'queries_mean': arredondar(sum(consultas) / len(consultas)) if consultas else None,
+        'queries_max': max(consultas) if consultas else None,
+        'db_ms_mean': arredondar(sum(db_ms) / len(db_ms)) if db_ms else None,
+    }
+
+
+def comparar(anterior, atual, limite_pct):
+    """
+    Compara dois resultados por endpoint; devolve (linhas, regressões).
+    Regressão: p95 mais de limite_pct% acima do anterior ou mais consultas SQL no pior caso
+    (a média oscila com os acertos do cache do catálogo; o máximo denuncia um N+1).
+    """
+    linhas, regressoes = [], []
+    for nome, novo in atual['endpoints'].items():
+        velho = anterior.get('endpoints', {}).get(nome)
+        if not velho or not velho.get('p95_ms') or novo['p95_ms'] is None:
+            continue
+        delta_pct = (novo['p95_ms'] - velho['p95_ms']) / velho['p95_ms'] * 100
+        delta_queries = (novo['queries_max'] or 0) - (velho['queries_max'] or 0)
+        linhas.append((nome, velho['p95_ms'], novo['p95_ms'], delta_pct, delta_queries))
+        if (limite_pct is not None and delta_pct > limite_pct) or delta_queries > 0:
+            regressoes.append(nome)
+    return linhas, regressoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark ponta a ponta da API: sobe o gateway (WSGI) sobre um banco semeado, '
+        'aplica uma mistura de tráfego realista e grava p50/p95/p99, vazão e consultas SQL '
+        'por endpoint em JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requisições medidas (padrão: 2000)')
+        parser.add_argument('--warmup', type=int, default=100, help='Requisições de aquecimento, não medidas (padrão: 100)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requisições simultâneas (padrão: 8)')
+        parser.add_argument('--wsgi-threads', type=int, default=4, help='Threads do servidor WSGI (padrão: 4)')
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{nome}={peso}' for nome, peso in MIX_PADRAO.items()),
+            help='Pesos das operações (padrão: %(default)s)',
+        )
+        parser.add_argument(
+            '--cart-sizes',
+            default='1,5,20,100',
+            help='Tamanhos de carrinho do calculate-price, um endpoint por tamanho (padrão: 1,5,20,100)',
+        )
+        parser.add_argument('--cars', type=int, default=200, help='Banco semeado: carros (padrão: 200)')
+        parser.add_argument('--parts', type=int, default=20000, help='Banco semeado: peças (padrão: 20000)')
+        parser.add_argument('--orders', type=int, default=20000, help='Banco semeado: pedidos (padrão: 20000)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados e do tráfego (padrão: 42)')
+        parser.add_argument(
+            '--database',
+            help='Banco SQLite já populado a usar no lugar do semeado (é copiado; o original não muda)',
+        )
+        parser.add_argument('--no-cache', action='store_true', help='Desliga o cache do catálogo no servidor')
+        parser.add_argument(
+            '--output',
+            default='benchmark_results.json',
+            help='Arquivo JSON de resultados (padrão: benchmark_results.json)',
+        )
+        parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+        parser.add_argument(
+            '--fail-on-regression',
+            type=float,
+            default=None,
+            help='Com --compare: erro se o p95 de algum endpoint piorar mais que este percentual '
+                 'ou se o máximo de consultas SQL aumentar',
+        )
+        # Uso interno: processo do gateway WSGI disparado pelo próprio comando
+        parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            return self.serve(options['serve'], options['wsgi_threads'])
+
+        try:
+            import httpx  # noqa: F401
+        except ImportError as e:
+            raise CommandError(f'Dependência ausente para o benchmark: {e.name}')
+
+        mix = parse_mix(options['mix'])
+        cart_sizes = [int(size) for size in options['cart_sizes'].split(',') if size.strip()]
+        if mix.get('calculate_price') and not cart_sizes:
+            raise CommandError('--cart-sizes vazio com calculate_price no mix')
+        anterior = self.carregar(options['compare']) if options['compare'] else None
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'benchmark.sqlite3')
+            env = {
+                **os.environ,
+                'SQLITE_PATH': caminho,
+                'MICROSERVICE_A_URL': 'internal',
+                'MICROSERVICE_B_URL': 'internal',
+                'CATALOG_CACHE_ENABLED': '0' if options['no_cache'] else '1',
+            }
+            self.preparar_banco(caminho, env, options)
+            amostra = self.amostrar_ids(caminho)
+            self.stdout.write(
+                f'📦 Banco: {amostra["cars"]} carros, {amostra["parts"]} peças, {amostra["orders"]} pedidos'
+            )
+            operacoes = self.planejar(mix, cart_sizes, amostra, options)
+
+            port = porta_livre()
+            manage = os.path.join(settings.BASE_DIR, 'manage.py')
+            processo = subprocess.Popen(
+                [sys.executable, manage, 'benchmark_api', '--serve', str(port),
+                 '--wsgi-threads', str(options['wsgi_threads'])],
+                cwd=settings.BASE_DIR, env=env
+            )
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                self.aguardar(f'{base_url}/api/health/live/')
+                aquecimento, medidas = operacoes[:options['warmup']], operacoes[options['warmup']:]
+                asyncio.run(self.carga(base_url, aquecimento, options['concurrency']))
+                amostras, duracao = asyncio.run(self.carga(base_url, medidas, options['concurrency']))
+            finally:
+                processo.terminate()
+                processo.wait(timeout=10)
+
+        resultado = self.montar_resultado(amostras, duracao, amostra, options)
+        self.imprimir(resultado)
+        with open(options['output'], 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f'💾 Resultados em {options["output"]}')
+
+        if anterior is not None:
+            self.imprimir_comparacao(anterior, resultado, options['fail_on_regression'])
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def serve(self, port, threads):
+        from carBuild.wsgi import application
+        PooledWSGIServer.threads = threads
+        server = make_server('127.0.0.1', port, application,
+                             server_class=PooledWSGIServer, handler_class=QuietWSGIRequestHandler)
+        server.serve_forever()
+
+    # ========== BANCO ==========
+
+    def preparar_banco(self, caminho, env, options):
+        """Copia o banco informado ou cria um novo com populate_db --scale (processos separados)"""
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+
+        def rodar(*argumentos):
+            subprocess.run(
+                [sys.executable, manage, *argumentos], cwd=settings.BASE_DIR, env=env,
+                check=True, stdout=subprocess.DEVNULL
+            )
+
+        inicio = time.perf_counter()
+        if options['database']:
+            shutil.copyfile(options['database'], caminho)
+            rodar('migrate', '--verbosity', '0')
+        else:
+            rodar('migrate', '--verbosity', '0')
+            rodar(
+                'populate_db', '--scale', '--cars', str(options['cars']), '--parts', str(options['parts']),
+                '--orders', str(options['orders']), '--seed', str(options['seed'])
+            )
+        self.stdout.write(f'🔧 Banco pronto em {time.perf_counter() - inicio:.1f}s')
+
+    def amostrar_ids(self, caminho, maximo=5000):
+        """Ids reais para montar as requisições (amostra regular, determinística)"""
+        db = sqlite3.connect(caminho)
+        try:
+            def amostra(tabela, coluna):
+                total = db.execute(f'SELECT COUNT(*) FROM {tabela}').fetchone()[0]
+                passo = max(total // maximo, 1)
+                ids = [linha[0] for linha in db.execute(
+                    f'SELECT {coluna} FROM {tabela} WHERE id % ? = 0 ORDER BY id', [passo]
+                )]
+                return total, ids
+
+            cars, car_ids = amostra('car_car', 'id')
+            parts, peca_ids = amostra('car_peca', 'id')
+            orders, pedido_ids = amostra('car_pedido', 'id_unico')
+            valores = db.execute('SELECT MIN(valor), MAX(valor) FROM car_peca').fetchone()
+        finally:
+            db.close()
+        if not car_ids or not peca_ids:
+            raise CommandError('O banco precisa de carros e peças para o benchmark')
+        return {
+            'cars': cars, 'parts': parts, 'orders': orders,
+            'car_ids': car_ids, 'peca_ids': peca_ids, 'pedido_ids': pedido_ids,
+            'valor_min': float(valores[0]), 'valor_max': float(valores[1]),
+        }
+
+    # ========== TRÁFEGO ==========
+
+    def planejar(self, mix, cart_sizes, amostra, options):
+        """Sequência determinística de (endpoint, método, path, corpo) para aquecimento + medição"""
+        rng = random.Random(options['seed'])
+        if not amostra['pedido_ids']:
+            mix = {**mix, 'order_report': 0}
+        nomes = [nome for nome, peso in mix.items() if peso > 0]
+        pesos = [mix[nome] for nome in nomes]
+
+        def carrinho(tamanho):
+            tamanho = min(tamanho, len(amostra['peca_ids']))
+            return [
+                {'peca_id': peca_id, 'quantidade': rng.randint(1, 3)}
+                for peca_id in rng.sample(amostra['peca_ids'], tamanho)
+            ]
+
+        operacoes = []
+        for nome in rng.choices(nomes, pesos, k=options['warmup'] + options['requests']):
+            if nome == 'cars_list':
+                operacoes.append((nome, 'GET', '/api/cars/?limit=50', None))
+            elif nome == 'parts_list':
+                minimo = rng.uniform(amostra['valor_min'], amostra['valor_max'])
+                maximo = min(minimo + 100, amostra['valor_max'])
+                operacoes.append((nome, 'GET', f'/api/pecas/?limit=50&min_valor={minimo:.2f}&max_valor={maximo:.2f}', None))
+            elif nome == 'car_parts':
+                operacoes.append((nome, 'GET', f'/api/cars/{rng.choice(amostra["car_ids"])}/pecas/', None))
+            elif nome == 'calculate_price':
+                tamanho = rng.choice(cart_sizes)
+                operacoes.append((
+                    f'calculate_price[{tamanho}]', 'POST', '/api/calculate-price/', {'items': carrinho(tamanho)}
+                ))
+            elif nome == 'create_order':
+                operacoes.append((nome, 'POST', '/api/orders/', {'items': carrinho(rng.randint(1, 5))}))
+            else:
+                operacoes.append((nome, 'GET', f'/api/orders/{rng.choice(amostra["pedido_ids"])}/report/', None))
+        return operacoes
+
+    def aguardar(self, url, timeout=30):
+        import httpx
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                if httpx.get(url, timeout=5).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f'Servidor não respondeu em {url}')
+
+    async def carga(self, base_url, operacoes, concurrency):
+        """Executa as operações com no máximo `concurrency` em voo; devolve (amostras, duração)"""
+        import httpx
+        amostras = []
+        fila = iter(operacoes)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            async def trabalhador():
+                for nome, metodo, path, corpo in fila:
+                    inicio = time.perf_counter()
+                    try:
+                        response = await client.request(metodo, path, json=corpo)
+                        erro = response.status_code >= 400
+                        db = _SERVER_TIMING_DB.search(response.headers.get('Server-Timing', ''))
+                    except httpx.HTTPError:
+                        erro, db = True, None
+                    amostras.append({
+                        'endpoint': nome,
+                        'ms': (time.perf_counter() - inicio) * 1000,
+                        'erro': erro,
+                        'queries': int(db.group(2)) if db else None,
+                        'db_ms': float(db.group(1)) if db else None,
+                    })
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(trabalhador() for _ in range(max(concurrency, 1))))
+            duracao = time.perf_counter() - inicio
+        return amostras, duracao
+
+    # ========== RESULTADOS ==========
+
+    def montar_resultado(self, amostras, duracao, amostra, options):
+        por_endpoint = {}
+        for registro in amostras:
+            por_endpoint.setdefault(registro['endpoint'], []).append(registro)
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': self.commit_atual(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'options': {
+                    chave: options[chave] for chave in (
+                        'requests', 'warmup', 'concurrency', 'wsgi_threads', 'mix', 'cart_sizes',
+                        'seed', 'no_cache'
+                    )
+                },
+                'dataset': {chave: amostra[chave] for chave in ('cars', 'parts', 'orders')},
+            },
+            'overall': {**resumir(amostras, duracao), 'duration_s': round(duracao, 3)},
+            'endpoints': {
+                nome: resumir(registros, duracao) for nome, registros in sorted(por_endpoint.items(), key=lambda par: _ordem_endpoint(par[0]))
+            },
+        }
+
+    def commit_atual(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def carregar(self, caminho):
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Não foi possível ler {caminho}: {e}')
+
+    def imprimir(self, resultado):
+        formatar = lambda valor: f'{valor:.1f}' if valor is not None else '-'  # noqa: E731
+        self.stdout.write(
+            f'{"endpoint":>22} | {"req":>6} | {"req/s":>7} | {"p50 ms":>7} | {"p95 ms":>7} | '
+            f'{"p99 ms":>7} | {"SQL":>5} | {"erros":>5}'
+        )
+        linhas = list(resultado['endpoints'].items()) + [('TOTAL', resultado['overall'])]
+        for nome, dados in linhas:
+            self.stdout.write(
+                f'{nome:>22} | {dados["requests"]:>6} | {formatar(dados["rps"]):>7} | '
+                f'{formatar(dados["p50_ms"]):>7} | {formatar(dados["p95_ms"]):>7} | '
+                f'{formatar(dados["p99_ms"]):>7} | {formatar(dados["queries_mean"]):>5} | {dados["errors"]:>5}'
+            )
+
+    def imprimir_comparacao(self, anterior, atual, limite_pct):
+        linhas, regressoes = comparar(anterior, atual, limite_pct)
+        commit = anterior.get('meta', {}).get('commit') or 'anterior'
+        self.stdout.write(f'📊 Comparação com {commit}')
+        self.stdout.write(f'{"endpoint":>22} | {"p95 antes":>9} | {"p95 agora":>9} | {"Δ p95":>7} | {"Δ SQL máx":>9}')
+        for nome, antes, agora, delta_pct, delta_queries in linhas:
+            self.stdout.write(
+                f'{nome:>22} | {antes:>9.1f} | {agora:>9.1f} | {delta_pct:>+6.1f}% | {delta_queries:>+9d}'
+            )
+        if regressoes and limite_pct is not None:
+            raise CommandError(f'Regressão em: {", ".join(regressoes)}')
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand
+from car.order_ids import gerar_id_pedido
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de INSERT em uma tabela como car_pedido (índice único em id_unico) '
+        'com ids aleatórios (UUID4) e ordenados no tempo (UUIDv7)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500000,
+            help='Pedidos inseridos por cenário (padrão: 500000)',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=100,
+            help='Pedidos por transação (padrão: 100)',
+        )
+        parser.add_argument(
+            '--cache-kb',
+            type=int,
+            default=2000,
+            help='cache_size do SQLite em KiB; menor que o índice simula uma tabela grande (padrão: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        cenarios = [
+            ('uuid4 (aleatório)', lambda: uuid.uuid4().hex),
+            ('uuid7 (ordenado)', lambda: gerar_id_pedido().hex),
+        ]
+
+        self.stdout.write(
+            f'🔧 {options["rows"]} pedidos em lotes de {options["batch"]}, cache de {options["cache_kb"]} KiB'
+        )
+        self.stdout.write(
+            f'{"cenário":>18} | {"pedidos/s":>10} | {"últimos 10% /s":>14} | {"arquivo MiB":>11}'
+        )
+        for nome, gerar in cenarios:
+            with tempfile.TemporaryDirectory() as diretorio:
+                resultado = self.medir(os.path.join(diretorio, 'bench.sqlite3'), gerar, options)
+            self.stdout.write(
+                f'{nome:>18} | {resultado["rps"]:>10.0f} | {resultado["rps_final"]:>14.0f} | '
+                f'{resultado["mib"]:>11.1f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def medir(self, caminho, gerar, options):
+        """Insere os pedidos em um banco novo; retorna vazão total, vazão no fim e tamanho"""
+        rows, batch = options['rows'], max(options['batch'], 1)
+        db = sqlite3.connect(caminho, isolation_level=None)
+        db.execute(f'PRAGMA cache_size = -{options["cache_kb"]}')
+        # Mesmo esquema de car_pedido (UUIDField no SQLite é char(32))
+        db.execute(
+            'CREATE TABLE car_pedido ('
+            'id integer NOT NULL PRIMARY KEY AUTOINCREMENT, '
+            'id_unico char(32) NOT NULL UNIQUE, '
+            'valor_total decimal NOT NULL, '
+            'data_pedido datetime NOT NULL)'
+        )
+
+        sql = 'INSERT INTO car_pedido (id_unico, valor_total, data_pedido) VALUES (?, ?, ?)'
+        marco_final = rows - rows // 10
+        inicio = time.perf_counter()
+        inicio_final = None
+        inseridos = 0
+        while inseridos < rows:
+            if inicio_final is None and inseridos >= marco_final:
+                inicio_final = time.perf_counter()
+            n = min(batch, rows - inseridos)
+            db.execute('BEGIN')
+            db.executemany(sql, [(gerar(), '100.00', '2025-01-01 00:00:00') for _ in range(n)])
+            db.execute('COMMIT')
+            inseridos += n
+        fim = time.perf_counter()
+        db.close()
+
+        return {
+            'rps': rows / (fim - inicio),
+            'rps_final': (rows - marco_final) / (fim - (inicio_final or inicio)),
+            'mib': os.path.getsize(caminho) / (1024 * 1024),
+        }
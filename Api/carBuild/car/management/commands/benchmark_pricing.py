@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from car.models import Peca
+from microservices.service_b import microservice_b
+from decimal import Decimal
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = 'Mede consultas SQL e latência do cálculo de preço por tamanho de carrinho'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1,10,50,100,500',
+            help='Tamanhos de carrinho separados por vírgula (padrão: 1,10,50,100,500)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Repetições por tamanho de carrinho (padrão: 20)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente do gerador aleatório',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        repeat = max(options['repeat'], 1)
+        rng = random.Random(options['seed'])
+
+        # Tudo roda dentro de uma transação desfeita ao final,
+        # então o banco de desenvolvimento não é alterado
+        with transaction.atomic():
+            pecas = Peca.objects.bulk_create([
+                Peca(nome=f'Peça Benchmark {i}', valor=Decimal(rng.randint(1000, 50000)) / 100)
+                for i in range(max(sizes))
+            ])
+            peca_ids = [peca.id for peca in pecas]
+
+            self.stdout.write(
+                f'{"itens":>6} | {"consultas (linha a linha)":>25} | {"consultas (lote)":>16} | '
+                f'{"ms (linha a linha)":>18} | {"ms (lote)":>10}'
+            )
+            for size in sizes:
+                items = [
+                    {'peca_id': peca_id, 'quantidade': rng.randint(1, 5)}
+                    for peca_id in rng.sample(peca_ids, size)
+                ]
+                legado_consultas, legado_ms = self.medir(self.calcular_linha_a_linha, items, repeat)
+                lote_consultas, lote_ms = self.medir(microservice_b.calculate_price, items, repeat)
+                self.stdout.write(
+                    f'{size:>6} | {legado_consultas:>25} | {lote_consultas:>16} | '
+                    f'{legado_ms:>18.3f} | {lote_ms:>10.3f}'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def medir(self, func, items, repeat):
+        """Retorna (consultas por chamada, latência média em ms)"""
+        with CaptureQueriesContext(connection) as ctx:
+            func(items)
+        consultas = len(ctx.captured_queries)
+
+        inicio = time.perf_counter()
+        for _ in range(repeat):
+            func(items)
+        return consultas, (time.perf_counter() - inicio) * 1000 / repeat
+
+    def calcular_linha_a_linha(self, items):
+        """Referência: uma consulta por linha do carrinho (implementação anterior)"""
+        total = Decimal('0.00')
+        for item in items:
+            peca = Peca.objects.get(id=item['peca_id'])
+            total += peca.valor * int(item['quantidade'])
+        return total
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from car.models import Car, Peca
+from microservices.search import buscar_ids_contains, buscar_ids_fts
+from decimal import Decimal
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compara a busca FTS5 de peças com o caminho nome__icontains'
+
+    NOMES = [
+        'Filtro de Ar', 'Filtro de Óleo', 'Pastilha de Freio Dianteira', 'Disco de Freio Traseiro',
+        'Vela de Ignição', 'Correia Dentada', 'Bomba de Combustível', 'Radiador', 'Alternador',
+        'Amortecedor Dianteiro', 'Óleo Motor 5W30', 'Fluído de Freio', 'Aditivo Radiador', 'Bateria',
+    ]
+    MODELOS = ['Civic', 'Corolla', 'Fusca', 'Gol', 'Onix', 'HB20', 'Polo', 'Fiesta', 'Uno', 'Palio']
+    TERMOS = ['oleo', 'freio', 'pastilha dia', 'bomba comb', 'radiador', 'inexistente']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pecas',
+            type=int,
+            default=50000,
+            help='Número de peças geradas para o benchmark (padrão: 50000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Repetições por termo (padrão: 20)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Resultados por busca (padrão: 20)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        repeat = max(options['repeat'], 1)
+        limit = options['limit']
+
+        # Dados gerados dentro de uma transação desfeita ao final
+        with transaction.atomic():
+            cars = Car.objects.bulk_create([Car(modelo=modelo, ano=2020) for modelo in self.MODELOS])
+            self.stdout.write(f'🔧 Gerando {options["pecas"]} peças...')
+            Peca.objects.bulk_create([
+                Peca(
+                    nome=f'{rng.choice(self.NOMES)} {i}',
+                    valor=Decimal(rng.randint(1000, 50000)) / 100,
+                    owner=rng.choice(cars)
+                )
+                for i in range(options['pecas'])
+            ], batch_size=1000)
+
+            self.stdout.write(
+                f'{"termo":>14} | {"fts ms":>8} | {"fts n":>5} | {"icontains ms":>12} | '
+                f'{"icontains n":>11} | {"normalizado ms":>14} | {"normalizado n":>13}'
+            )
+            for termo in self.TERMOS:
+                fts_ms, fts_n = self.medir(lambda: buscar_ids_fts(termo, limit), repeat)
+                icontains_ms, icontains_n = self.medir(
+                    lambda: list(Peca.objects.filter(nome__icontains=termo).values_list('id', flat=True)[:limit]),
+                    repeat
+                )
+                norm_ms, norm_n = self.medir(lambda: buscar_ids_contains(termo, limit), repeat)
+                self.stdout.write(
+                    f'{termo:>14} | {fts_ms:>8.3f} | {fts_n:>5} | {icontains_ms:>12.3f} | '
+                    f'{icontains_n:>11} | {norm_ms:>14.3f} | {norm_n:>13}'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def medir(self, func, repeat):
+        """Retorna (latência média em ms, resultados)"""
+        resultado = func()
+        inicio = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - inicio) * 1000 / repeat, len(resultado)
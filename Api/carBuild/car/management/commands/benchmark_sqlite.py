@@ -0,0 +1,161 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import override_settings
+from car.models import Car, Peca
+from microservices.service_b import microservice_b
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+# Como era antes de car/db.py: rollback journal e fsync completo
+PRAGMAS_LEGADO = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def _p95(valores):
+    valores = sorted(valores)
+    return valores[int(len(valores) * 0.95)] if valores else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Leituras do catálogo concorrendo com criação de pedidos em um SQLite temporário: '
+        'compara rollback journal com conexão por requisição e o perfil de SQLITE_PRAGMAS '
+        '(WAL) com conexões persistentes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Threads lendo o catálogo (padrão: 8)')
+        parser.add_argument('--writers', type=int, default=2, help='Threads criando pedidos (padrão: 2)')
+        parser.add_argument('--duration', type=float, default=5, help='Segundos por cenário (padrão: 5)')
+        parser.add_argument('--parts', type=int, default=20000, help='Peças no banco de teste (padrão: 20000)')
+        parser.add_argument('--orders', type=int, default=20000, help='Pedidos no banco de teste (padrão: 20000)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados e das operações (padrão: 42)')
+
+    def handle(self, *args, **options):
+        cenarios = [
+            ('rollback journal, conexão/req', PRAGMAS_LEGADO, False),
+            ('WAL + pragmas, conexão/req', settings.SQLITE_PRAGMAS, False),
+            ('WAL + pragmas, persistente', settings.SQLITE_PRAGMAS, True),
+        ]
+
+        # Nada aqui toca o banco configurado: tudo roda em cópias de um banco temporário
+        connections.close_all()
+        nome_original = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as diretorio:
+            modelo = os.path.join(diretorio, 'modelo.sqlite3')
+            try:
+                self.semear(modelo, options)
+                self.stdout.write(
+                    f'🔧 {options["readers"]} leitores x {options["writers"]} escritores, '
+                    f'{options["duration"]:.0f}s por cenário'
+                )
+                self.stdout.write(
+                    f'{"cenário":>30} | {"leituras/s":>10} | {"escritas/s":>10} | '
+                    f'{"p95 leitura":>11} | {"p95 escrita":>11} | {"erros":>5}'
+                )
+                for nome, pragmas, persistente in cenarios:
+                    caminho = os.path.join(diretorio, 'cenario.sqlite3')
+                    shutil.copyfile(modelo, caminho)
+                    with override_settings(SQLITE_PRAGMAS=pragmas):
+                        self.usar_banco(caminho)
+                        resultado = self.medir(options, persistente)
+                    self.stdout.write(
+                        f'{nome:>30} | {resultado["leituras"]:>10.0f} | {resultado["escritas"]:>10.0f} | '
+                        f'{resultado["p95_leitura"]:>9.1f}ms | {resultado["p95_escrita"]:>9.1f}ms | '
+                        f'{resultado["erros"]:>5}'
+                    )
+                    for sufixo in ('', '-wal', '-shm'):
+                        if os.path.exists(caminho + sufixo):
+                            os.remove(caminho + sufixo)
+            finally:
+                self.usar_banco(nome_original)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
+
+    def usar_banco(self, caminho):
+        connections.close_all()
+        # Mesmo dicionário usado pelas conexões criadas nas outras threads
+        connection.settings_dict['NAME'] = caminho
+
+    def semear(self, caminho, options):
+        with override_settings(SQLITE_PRAGMAS=PRAGMAS_LEGADO):
+            self.usar_banco(caminho)
+            call_command('migrate', verbosity=0)
+            call_command(
+                'populate_db', scale=True, cars=200, parts=options['parts'], orders=options['orders'],
+                seed=options['seed'], stdout=io.StringIO()
+            )
+            self.car_ids = list(Car.objects.values_list('id', flat=True))
+            self.peca_ids = list(Peca.objects.values_list('id', flat=True))
+            connections.close_all()
+
+    def medir(self, options, persistente):
+        fim = time.perf_counter() + options['duration']
+        lock = threading.Lock()
+        totais = {'leituras': [], 'escritas': [], 'erros': 0}
+
+        def ler(rng):
+            # Mesmas consultas de /api/cars/{id}/pecas/ e /api/pecas/?min_valor=&max_valor=
+            list(Peca.objects.filter(owner_id=rng.choice(self.car_ids)).order_by('id')[:100])
+            minimo = rng.uniform(10, 700)
+            list(Peca.objects.filter(valor__gte=minimo, valor__lte=minimo + 50).order_by('id')[:50])
+            return True
+
+        def escrever(rng):
+            itens = [
+                {'peca_id': peca_id, 'quantidade': rng.randint(1, 3)}
+                for peca_id in rng.sample(self.peca_ids, rng.randint(1, 5))
+            ]
+            return microservice_b.create_order({'items': itens})['status'] == 'success'
+
+        def trabalhador(operacao, chave, semente):
+            rng = random.Random(semente)
+            latencias, erros = [], 0
+            try:
+                while time.perf_counter() < fim:
+                    inicio = time.perf_counter()
+                    try:
+                        ok = operacao(rng)
+                    except Exception:
+                        ok = False
+                    finally:
+                        if not persistente:
+                            # CONN_MAX_AGE = 0: cada requisição abre (e configura) a própria conexão
+                            connection.close()
+                    if ok:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                    else:
+                        erros += 1
+            finally:
+                connections.close_all()
+            with lock:
+                totais[chave].extend(latencias)
+                totais['erros'] += erros
+
+        threads = [
+            threading.Thread(target=trabalhador, args=(ler, 'leituras', f'{options["seed"]}:l{i}'))
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(target=trabalhador, args=(escrever, 'escritas', f'{options["seed"]}:e{i}'))
+            for i in range(options['writers'])
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        return {
+            'leituras': len(totais['leituras']) / duracao,
+            'escritas': len(totais['escritas']) / duracao,
+            'p95_leitura': _p95(totais['leituras']),
+            'p95_escrita': _p95(totais['escritas']),
+            'erros': totais['erros'],
+        }
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from microservices.stub import StubMicroservice
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+class PooledWSGIServer(WSGIServer):
+    """Servidor WSGI com número fixo de threads (como workers síncronos do gunicorn)"""
+    threads = 4
+    request_queue_size = 1024
+
+    def server_activate(self):
+        super().server_activate()
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga do gateway em modo externo: compara views síncronas em WSGI '
+        '(threads fixas) com views async em ASGI (1 worker uvicorn) contra um microsserviço falso local'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delay', type=int, default=100, help='Latência do microsserviço falso em ms (padrão: 100)')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requisições simultâneas (padrão: 100)')
+        parser.add_argument('--requests', type=int, default=1000, help='Total de requisições por cenário (padrão: 1000)')
+        parser.add_argument('--wsgi-threads', type=int, default=4, help='Threads do servidor WSGI (padrão: 4)')
+        parser.add_argument('--serve-wsgi', type=int, help=None)
+
+    def handle(self, *args, **options):
+        if options['serve_wsgi']:
+            return self.serve_wsgi(options['serve_wsgi'], options['wsgi_threads'])
+
+        try:
+            import httpx  # noqa: F401
+            import uvicorn  # noqa: F401
+        except ImportError as e:
+            raise CommandError(f'Dependência ausente para o teste de carga: {e.name}')
+
+        stub = StubMicroservice(delay=options['delay'] / 1000).start()
+        stub_url = stub.url
+        self.stdout.write(f'🧪 Microsserviço falso em {stub_url} (atraso {options["delay"]} ms)')
+
+        env = {
+            **os.environ,
+            'MICROSERVICE_A_URL': stub_url,
+            'MICROSERVICE_B_URL': stub_url,
+            # Sem cache, para que toda requisição chegue ao microsserviço
+            'CATALOG_CACHE_ENABLED': '0',
+        }
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+
+        cenarios = [
+            (
+                f'WSGI ({options["wsgi_threads"]} threads)', '/api/cars/',
+                lambda port: [sys.executable, manage, 'loadtest_async', '--serve-wsgi', str(port),
+                              '--wsgi-threads', str(options['wsgi_threads'])],
+            ),
+            (
+                'ASGI (1 worker)', '/api/async/cars/',
+                lambda port: [sys.executable, '-m', 'uvicorn', 'carBuild.asgi:application',
+                              '--port', str(port), '--workers', '1', '--log-level', 'warning'],
+            ),
+        ]
+
+        self.stdout.write(f'{"cenário":>20} | {"req/s":>8} | {"p50 ms":>8} | {"p95 ms":>8} | {"p99 ms":>8} | {"erros":>5}')
+        try:
+            for nome, path, comando in cenarios:
+                port = porta_livre()
+                processo = subprocess.Popen(comando(port), cwd=settings.BASE_DIR, env=env)
+                try:
+                    url = f'http://127.0.0.1:{port}{path}'
+                    self.aguardar(url)
+                    resultado = asyncio.run(self.carga(url, options['requests'], options['concurrency']))
+                finally:
+                    processo.terminate()
+                    processo.wait(timeout=10)
+                self.stdout.write(
+                    f'{nome:>20} | {resultado["rps"]:>8.1f} | {resultado["p50"]:>8.1f} | '
+                    f'{resultado["p95"]:>8.1f} | {resultado["p99"]:>8.1f} | {resultado["erros"]:>5}'
+                )
+        finally:
+            stub.stop()
+
+        self.stdout.write(self.style.SUCCESS('✅ Teste de carga concluído'))
+
+    def serve_wsgi(self, port, threads):
+        from carBuild.wsgi import application
+        PooledWSGIServer.threads = threads
+        server = make_server('127.0.0.1', port, application,
+                             server_class=PooledWSGIServer, handler_class=QuietWSGIRequestHandler)
+        server.serve_forever()
+
+    def aguardar(self, url, timeout=30):
+        import httpx
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                if httpx.get(url, timeout=5).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f'Servidor não respondeu em {url}')
+
+    async def carga(self, url, total, concurrency):
+        import httpx
+        latencias = []
+        erros = 0
+        semaforo = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            async def uma():
+                nonlocal erros
+                async with semaforo:
+                    inicio = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        if response.status_code != 200:
+                            erros += 1
+                    except httpx.HTTPError:
+                        erros += 1
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(uma() for _ in range(total)))
+            duracao = time.perf_counter() - inicio
+
+        quantis = statistics.quantiles(latencias, n=100)
+        return {
+            'rps': total / duracao,
+            'p50': quantis[49],
+            'p95': quantis[94],
+            'p99': quantis[98],
+            'erros': erros,
+        }
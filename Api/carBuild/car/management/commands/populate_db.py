@@ -1,8 +1,179 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
 from car.models import Car, Peca, Pedido, ItemPedido
+from car.order_ids import montar_id_pedido
+from microservices.cache import catalog_cache
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
+import math
+import multiprocessing
+import os
 import random
+import tempfile
+import time
+
+CARROS_EXEMPLO = [
+    {'modelo': 'Civic', 'ano': 2020},
+    {'modelo': 'Corolla', 'ano': 2019},
+    {'modelo': 'Fusca', 'ano': 1970},
+    {'modelo': 'Gol', 'ano': 2018},
+    {'modelo': 'Onix', 'ano': 2021},
+    {'modelo': 'HB20', 'ano': 2020},
+    {'modelo': 'Polo', 'ano': 2019},
+    {'modelo': 'Fiesta', 'ano': 2017},
+    {'modelo': 'Uno', 'ano': 2016},
+    {'modelo': 'Palio', 'ano': 2015},
+]
+
+PECAS_GENERICAS = [
+    {'nome': 'Filtro de Ar', 'valor_min': 25.00, 'valor_max': 60.00},
+    {'nome': 'Filtro de Óleo', 'valor_min': 15.00, 'valor_max': 40.00},
+    {'nome': 'Filtro de Combustível', 'valor_min': 30.00, 'valor_max': 80.00},
+    {'nome': 'Pastilha de Freio Dianteira', 'valor_min': 80.00, 'valor_max': 200.00},
+    {'nome': 'Pastilha de Freio Traseira', 'valor_min': 60.00, 'valor_max': 150.00},
+    {'nome': 'Disco de Freio Dianteiro', 'valor_min': 120.00, 'valor_max': 300.00},
+    {'nome': 'Disco de Freio Traseiro', 'valor_min': 100.00, 'valor_max': 250.00},
+    {'nome': 'Vela de Ignição', 'valor_min': 20.00, 'valor_max': 50.00},
+    {'nome': 'Correia Dentada', 'valor_min': 40.00, 'valor_max': 120.00},
+    {'nome': 'Bomba de Combustível', 'valor_min': 200.00, 'valor_max': 500.00},
+    {'nome': 'Radiador', 'valor_min': 300.00, 'valor_max': 800.00},
+    {'nome': 'Alternador', 'valor_min': 250.00, 'valor_max': 600.00},
+    {'nome': 'Motor de Arranque', 'valor_min': 200.00, 'valor_max': 500.00},
+    {'nome': 'Amortecedor Dianteiro', 'valor_min': 150.00, 'valor_max': 400.00},
+    {'nome': 'Amortecedor Traseiro', 'valor_min': 120.00, 'valor_max': 350.00},
+    {'nome': 'Pneu', 'valor_min': 200.00, 'valor_max': 600.00},
+    {'nome': 'Bateria', 'valor_min': 180.00, 'valor_max': 400.00},
+    {'nome': 'Óleo Motor 5W30', 'valor_min': 35.00, 'valor_max': 80.00},
+    {'nome': 'Fluido de Freio', 'valor_min': 15.00, 'valor_max': 35.00},
+    {'nome': 'Aditivo Radiador', 'valor_min': 12.00, 'valor_max': 30.00},
+]
+
+
+# ========== MODO --scale (DADOS SINTÉTICOS EM VOLUME) ==========
+
+_MASCARA_64 = (1 << 64) - 1
+
+
+def _mistura(seed, n):
+    """splitmix64: inteiro pseudoaleatório de 64 bits, função pura de (seed, n)"""
+    x = (n * 0x9E3779B97F4A7C15 + seed) & _MASCARA_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASCARA_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASCARA_64
+    return x ^ (x >> 31)
+
+
+def _peca_sintetica(seed, peca_id):
+    """
+    (nome, valor, hash) da peça sintética. Depende só do id, então qualquer
+    processo sabe o preço de qualquer peça ao montar itens, sem consultar o banco
+    """
+    h = _mistura(seed, peca_id)
+    modelo = PECAS_GENERICAS[h % len(PECAS_GENERICAS)]
+    minimo, maximo = round(modelo['valor_min'] * 100), round(modelo['valor_max'] * 100)
+    centavos = minimo + (h >> 16) % (maximo - minimo + 1)
+    return modelo['nome'], Decimal(centavos).scaleb(-2), h
+
+
+@contextmanager
+def _data_pedido_livre():
+    """Desliga o auto_now_add de Pedido.data_pedido para gravar datas espalhadas no tempo"""
+    campo = Pedido._meta.get_field('data_pedido')
+    campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        campo.auto_now_add = True
+
+
+def _faixa(chunk, tamanho, total):
+    inicio = chunk * tamanho
+    return range(inicio, min(inicio + tamanho, total))
+
+
+def _gerar_pecas(plano, chunk, using):
+    """Um bloco de peças com ids fixos, em uma transação"""
+    pecas = []
+    for i in _faixa(chunk, plano['chunk_size'], plano['parts']):
+        peca_id = plano['peca_base'] + i
+        nome, valor, h = _peca_sintetica(plano['seed'], peca_id)
+        # ~3% das peças são universais (sem carro)
+        owner_id = None
+        if plano['cars'] and (h >> 40) % 100 >= 3:
+            owner_id = plano['car_base'] + (h >> 48) % plano['cars']
+        pecas.append(Peca(id=peca_id, nome=nome, valor=valor, owner_id=owner_id))
+    with transaction.atomic(using=using):
+        Peca.objects.using(using).bulk_create(pecas, batch_size=plano['batch_size'])
+    return len(pecas)
+
+
+def _gerar_pedidos(plano, chunk, using):
+    """
+    Um bloco de pedidos (e seus itens) em uma transação. O gerador aleatório é
+    semeado por (seed, bloco): o resultado não depende de quantos processos rodam.
+    """
+    rng = random.Random(f"{plano['seed']}:pedidos:{chunk}")
+    passo_ms = plano['passo_ms']
+    pedidos, itens = [], []
+    for i in _faixa(chunk, plano['chunk_size'], plano['orders']):
+        pedido_id = plano['pedido_base'] + i
+        # Datas crescentes com o id, como em produção, com variação dentro do passo
+        ms = plano['fim_ms'] - (plano['orders'] - i) * passo_ms + rng.randrange(passo_ms)
+        total = Decimal('0.00')
+        quantidade_itens = min(rng.randint(1, plano['max_items']), plano['parts'])
+        for indice in rng.sample(range(plano['parts']), quantidade_itens):
+            peca_id = plano['peca_base'] + indice
+            item = ItemPedido(
+                pedido_id=pedido_id,
+                peca_id=peca_id,
+                quantidade=rng.randint(1, 3),
+                valor_unitario=_peca_sintetica(plano['seed'], peca_id)[1]
+            ).congelar_valores()
+            total += item.subtotal
+            itens.append(item)
+        pedidos.append(Pedido(
+            id=pedido_id,
+            id_unico=montar_id_pedido(ms, rng.getrandbits(12), rng.getrandbits(30)),
+            valor_total=total,
+            data_pedido=datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc)
+        ))
+    with _data_pedido_livre(), transaction.atomic(using=using):
+        Pedido.objects.using(using).bulk_create(pedidos, batch_size=plano['batch_size'])
+        ItemPedido.objects.using(using).bulk_create(itens, batch_size=plano['batch_size'])
+    return len(pedidos), len(itens)
+
+
+def _gerar_shard(plano, chunks_pecas, chunks_pedidos, caminho):
+    """Processo filho: gera seus blocos em um arquivo SQLite próprio (criado por _criar_shard)"""
+    alias = f'shard_{os.getpid()}'
+    connections.settings[alias] = {**connections['default'].settings_dict, 'NAME': caminho}
+    totais = {'pecas': 0, 'pedidos': 0, 'itens': 0}
+    try:
+        for chunk in chunks_pecas:
+            totais['pecas'] += _gerar_pecas(plano, chunk, alias)
+        for chunk in chunks_pedidos:
+            pedidos, itens = _gerar_pedidos(plano, chunk, alias)
+            totais['pedidos'] += pedidos
+            totais['itens'] += itens
+    finally:
+        connections[alias].close()
+    return totais
+
+
+def _colunas(model):
+    # Itens entram sem id: o banco principal numera na ordem dos shards
+    return [
+        campo.column for campo in model._meta.concrete_fields
+        if not (model is ItemPedido and campo.primary_key)
+    ]
+
+
+def _dividir(total, partes):
+    """Divide range(total) em `partes` faixas contíguas (a ordem dos blocos se mantém no merge)"""
+    return [range(total * k // partes, total * (k + 1) // partes) for k in range(partes)]
+
 
 class Command(BaseCommand):
     help = 'Popula o banco de dados com dados de exemplo para carros, peças e pedidos'
@@ -18,6 +189,46 @@ class Command(BaseCommand):
             action='store_true',
             help='Popula apenas carros e peças (sem pedidos)',
         )
+        parser.add_argument(
+            '--scale',
+            action='store_true',
+            help='Gera dados sintéticos em volume (bulk_create em blocos) em vez dos dados de exemplo',
+        )
+        parser.add_argument('--cars', type=int, default=1000, help='--scale: carros (padrão: 1000)')
+        parser.add_argument('--parts', type=int, default=1000000, help='--scale: peças (padrão: 1000000)')
+        parser.add_argument('--orders', type=int, default=1000000, help='--scale: pedidos (padrão: 1000000)')
+        parser.add_argument('--max-items', type=int, default=5, help='--scale: máximo de itens por pedido (padrão: 5)')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='--scale: dias cobertos pelas datas dos pedidos (padrão: 365)',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=date.fromisoformat,
+            default=None,
+            help='--scale: último dia dos pedidos, AAAA-MM-DD (padrão: hoje)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='--scale: semente dos dados (padrão: 42)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='--scale: linhas por transação (padrão: 50000)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='--scale: linhas por INSERT do bulk_create (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='--scale: processos; cada um gera em um arquivo SQLite próprio, depois mesclado (padrão: 1)',
+        )
 
     def handle(self, *args, **options):
         if options['clear']:
@@ -28,6 +239,9 @@ class Command(BaseCommand):
             Car.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('✅ Dados limpos com sucesso!'))
 
+        if options['scale']:
+            return self.handle_scale(options)
+
         try:
             with transaction.atomic():
                 # Criar carros
@@ -52,23 +266,191 @@ class Command(BaseCommand):
                 self.style.ERROR(f'❌ Erro ao popular banco: {str(e)}')
             )
 
-    def create_cars(self):
-        """Cria carros de exemplo"""
-        cars_data = [
-            {'modelo': 'Civic', 'ano': 2020},
-            {'modelo': 'Corolla', 'ano': 2019},
-            {'modelo': 'Fusca', 'ano': 1970},
-            {'modelo': 'Gol', 'ano': 2018},
-            {'modelo': 'Onix', 'ano': 2021},
-            {'modelo': 'HB20', 'ano': 2020},
-            {'modelo': 'Polo', 'ano': 2019},
-            {'modelo': 'Fiesta', 'ano': 2017},
-            {'modelo': 'Uno', 'ano': 2016},
-            {'modelo': 'Palio', 'ano': 2015},
+    # ========== MODO --scale ==========
+
+    def handle_scale(self, options):
+        plano = self.planejar(options)
+        workers = options['workers']
+        chunks_pecas = math.ceil(plano['parts'] / plano['chunk_size'])
+        chunks_pedidos = math.ceil(plano['orders'] / plano['chunk_size'])
+        self.stdout.write(
+            f"🔧 Gerando {plano['cars']} carros, {plano['parts']} peças e {plano['orders']} pedidos "
+            f"(seed {plano['seed']}, blocos de {plano['chunk_size']}, {workers} processo(s))"
+        )
+
+        inicio = time.perf_counter()
+        linhas = self.criar_carros_sinteticos(plano)
+        if workers == 1:
+            linhas += self.gerar_local(plano, chunks_pecas, chunks_pedidos)
+        else:
+            linhas += self.gerar_em_shards(plano, chunks_pecas, chunks_pedidos, workers)
+
+        with connection.cursor() as cursor:
+            # Ids explícitos: bancos com sequência (PostgreSQL) precisam reposicioná-la
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Car, Peca, Pedido]):
+                cursor.execute(sql)
+        # bulk_create não dispara os sinais que invalidam o cache do catálogo. A
+        # versão nova só chega a um gateway já em execução com backend compartilhado
+        catalog_cache.invalidate()
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'🎉 {linhas} linhas em {duracao:.1f}s ({linhas / duracao:.0f} linhas/s)'
+        ))
+        if catalog_cache.process_local:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  Cache do catálogo local ao processo (locmem): reinicie o gateway em execução '
+                'para não servir o catálogo anterior até o TIMEOUT'
+            ))
+
+    def planejar(self, options):
+        """Parâmetros da geração, comuns a todos os processos"""
+        for opcao in ('cars', 'parts', 'orders', 'days'):
+            if options[opcao] < 0:
+                raise CommandError(f'--{opcao} não pode ser negativo')
+        for opcao in ('max_items', 'chunk_size', 'batch_size', 'workers'):
+            if options[opcao] < 1:
+                raise CommandError(f'--{opcao.replace("_", "-")} deve ser maior que zero')
+        if options['orders'] and not options['parts']:
+            raise CommandError('--orders exige --parts maior que zero')
+        if options['workers'] > 1 and connection.vendor != 'sqlite':
+            raise CommandError('--workers > 1 só é suportado com SQLite (merge via ATTACH)')
+
+        fim = options['end_date'] or timezone.now().date()
+        fim_ms = int((datetime(fim.year, fim.month, fim.day, tzinfo=dt_timezone.utc)
+                      + timedelta(days=1)).timestamp() * 1000)
+        periodo_ms = max(options['days'], 1) * 86400 * 1000
+
+        def proximo_id(model):
+            ultimo = model.objects.order_by('-id').values_list('id', flat=True).first()
+            return (ultimo or 0) + 1
+
+        return {
+            'seed': options['seed'],
+            'cars': options['cars'],
+            'parts': options['parts'],
+            'orders': options['orders'],
+            'max_items': options['max_items'],
+            'chunk_size': options['chunk_size'],
+            'batch_size': options['batch_size'],
+            'car_base': proximo_id(Car),
+            'peca_base': proximo_id(Peca),
+            'pedido_base': proximo_id(Pedido),
+            'fim_ms': fim_ms,
+            'passo_ms': max(periodo_ms // max(options['orders'], 1), 1),
+        }
+
+    def criar_carros_sinteticos(self, plano):
+        rng = random.Random(f"{plano['seed']}:carros")
+        carros = [
+            Car(
+                id=plano['car_base'] + i,
+                modelo=CARROS_EXEMPLO[i % len(CARROS_EXEMPLO)]['modelo'],
+                ano=rng.randint(1970, 2025)
+            )
+            for i in range(plano['cars'])
         ]
+        with transaction.atomic():
+            Car.objects.bulk_create(carros, batch_size=plano['batch_size'])
+        self.stdout.write(f'🚗 Criados {len(carros)} carros')
+        return len(carros)
+
+    def gerar_local(self, plano, chunks_pecas, chunks_pedidos):
+        """Um processo, direto no banco configurado"""
+        linhas = 0
+        inicio = time.perf_counter()
+        pecas = 0
+        for chunk in range(chunks_pecas):
+            pecas += _gerar_pecas(plano, chunk, 'default')
+            self.progresso('peças', pecas, plano['parts'], inicio)
+        linhas += pecas
+
+        inicio = time.perf_counter()
+        pedidos = itens = 0
+        for chunk in range(chunks_pedidos):
+            criados, itens_criados = _gerar_pedidos(plano, chunk, 'default')
+            pedidos += criados
+            itens += itens_criados
+            self.progresso('pedidos', pedidos, plano['orders'], inicio, itens)
+        return linhas + pedidos + itens
+
+    def progresso(self, tabela, feitos, total, inicio, itens=0):
+        duracao = time.perf_counter() - inicio
+        extra = f' + {itens} itens' if itens else ''
+        self.stdout.write(
+            f'  ✓ {tabela} {feitos}/{total}{extra} ({(feitos + itens) / duracao:.0f} linhas/s)'
+        )
+
+    def gerar_em_shards(self, plano, chunks_pecas, chunks_pedidos, workers):
+        """
+        Cada processo gera uma faixa contígua de blocos em um arquivo SQLite
+        próprio (sem disputar o lock de escrita do banco principal); depois os
+        arquivos são mesclados em ordem com INSERT ... SELECT via ATTACH.
+        """
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminhos = [os.path.join(diretorio, f'shard_{k}.sqlite3') for k in range(workers)]
+            for caminho in caminhos:
+                self.criar_shard(caminho)
+
+            inicio = time.perf_counter()
+            tarefas = zip(_dividir(chunks_pecas, workers), _dividir(chunks_pedidos, workers), caminhos)
+            # fork: os filhos herdam o Django configurado; nenhuma conexão aberta atravessa o fork
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                pendentes = [
+                    pool.apply_async(_gerar_shard, (plano, list(pecas), list(pedidos), caminho))
+                    for pecas, pedidos, caminho in tarefas
+                ]
+                linhas = 0
+                for k, pendente in enumerate(pendentes):
+                    totais = pendente.get()
+                    linhas += sum(totais.values())
+                    self.stdout.write(
+                        f"  ✓ shard {k}: {totais['pecas']} peças, {totais['pedidos']} pedidos, "
+                        f"{totais['itens']} itens"
+                    )
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(f'⚙️  Geração: {linhas} linhas em {duracao:.1f}s ({linhas / duracao:.0f} linhas/s)')
+
+            inicio = time.perf_counter()
+            self.mesclar(caminhos)
+            duracao = time.perf_counter() - inicio
+            self.stdout.write(f'🔗 Merge: {linhas} linhas em {duracao:.1f}s ({linhas / duracao:.0f} linhas/s)')
+        return linhas
+
+    def criar_shard(self, caminho):
+        """Arquivo com as tabelas de destino sem índices, gatilhos nem chaves estrangeiras"""
+        with connection.cursor() as cursor:
+            cursor.execute('ATTACH DATABASE %s AS shard', [caminho])
+            try:
+                for model in (Peca, Pedido, ItemPedido):
+                    tabela = model._meta.db_table
+                    cursor.execute(f'CREATE TABLE shard.{tabela} AS SELECT * FROM main.{tabela} WHERE 0')
+            finally:
+                cursor.execute('DETACH DATABASE shard')
+
+    def mesclar(self, caminhos):
+        """Tabela por tabela (peças antes dos itens que as referenciam), shard por shard"""
+        for model in (Peca, Pedido, ItemPedido):
+            tabela = model._meta.db_table
+            colunas = ', '.join(_colunas(model))
+            for caminho in caminhos:
+                with connection.cursor() as cursor:
+                    # ATTACH não é permitido dentro de uma transação
+                    cursor.execute('ATTACH DATABASE %s AS shard', [caminho])
+                    try:
+                        with transaction.atomic():
+                            cursor.execute(
+                                f'INSERT INTO main.{tabela} ({colunas}) '
+                                f'SELECT {colunas} FROM shard.{tabela} ORDER BY rowid'
+                            )
+                    finally:
+                        cursor.execute('DETACH DATABASE shard')
 
+    def create_cars(self):
+        """Cria carros de exemplo"""
         cars = []
-        for car_data in cars_data:
+        for car_data in CARROS_EXEMPLO:
             car, created = Car.objects.get_or_create(
                 modelo=car_data['modelo'],
                 ano=car_data['ano']
@@ -81,29 +463,6 @@ class Command(BaseCommand):
 
     def create_pecas(self, cars):
         """Cria peças de exemplo para os carros"""
-        pecas_genericas = [
-            {'nome': 'Filtro de Ar', 'valor_min': 25.00, 'valor_max': 60.00},
-            {'nome': 'Filtro de Óleo', 'valor_min': 15.00, 'valor_max': 40.00},
-            {'nome': 'Filtro de Combustível', 'valor_min': 30.00, 'valor_max': 80.00},
-            {'nome': 'Pastilha de Freio Dianteira', 'valor_min': 80.00, 'valor_max': 200.00},
-            {'nome': 'Pastilha de Freio Traseira', 'valor_min': 60.00, 'valor_max': 150.00},
-            {'nome': 'Disco de Freio Dianteiro', 'valor_min': 120.00, 'valor_max': 300.00},
-            {'nome': 'Disco de Freio Traseiro', 'valor_min': 100.00, 'valor_max': 250.00},
-            {'nome': 'Vela de Ignição', 'valor_min': 20.00, 'valor_max': 50.00},
-            {'nome': 'Correia Dentada', 'valor_min': 40.00, 'valor_max': 120.00},
-            {'nome': 'Bomba de Combustível', 'valor_min': 200.00, 'valor_max': 500.00},
-            {'nome': 'Radiador', 'valor_min': 300.00, 'valor_max': 800.00},
-            {'nome': 'Alternador', 'valor_min': 250.00, 'valor_max': 600.00},
-            {'nome': 'Motor de Arranque', 'valor_min': 200.00, 'valor_max': 500.00},
-            {'nome': 'Amortecedor Dianteiro', 'valor_min': 150.00, 'valor_max': 400.00},
-            {'nome': 'Amortecedor Traseiro', 'valor_min': 120.00, 'valor_max': 350.00},
-            {'nome': 'Pneu', 'valor_min': 200.00, 'valor_max': 600.00},
-            {'nome': 'Bateria', 'valor_min': 180.00, 'valor_max': 400.00},
-            {'nome': 'Óleo Motor 5W30', 'valor_min': 35.00, 'valor_max': 80.00},
-            {'nome': 'Fluido de Freio', 'valor_min': 15.00, 'valor_max': 35.00},
-            {'nome': 'Aditivo Radiador', 'valor_min': 12.00, 'valor_max': 30.00},
-        ]
-
         pecas_especiais = {
             'Fusca': [
                 {'nome': 'Carburador Weber', 'valor_min': 400.00, 'valor_max': 800.00},
@@ -123,7 +482,7 @@ class Command(BaseCommand):
         for car in cars:
             # Escolher aleatoriamente 8-12 peças genéricas por carro
             num_pecas = random.randint(8, 12)
-            pecas_selecionadas = random.sample(pecas_genericas, num_pecas)
+            pecas_selecionadas = random.sample(PECAS_GENERICAS, num_pecas)
             
             for peca_data in pecas_selecionadas:
                 valor = Decimal(str(random.uniform(
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from car.idempotency import idempotency_store
+
+
+class Command(BaseCommand):
+    help = 'Remove Idempotency-Keys expiradas (IDEMPOTENCY_KEY_TTL) e reservas abandonadas'
+
+    def handle(self, *args, **options):
+        removidas = idempotency_store.purge()
+        self.stdout.write(self.style.SUCCESS(f'✅ {removidas} chaves de idempotência removidas'))
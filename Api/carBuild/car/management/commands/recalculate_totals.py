@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from car.models import Pedido
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recalcula valor_total de todos os pedidos a partir dos subtotais dos itens, em blocos de ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Pedidos por UPDATE/transação (padrão: 10000)',
+        )
+
+    def handle(self, *args, **options):
+        chunk = max(options['chunk_size'], 1)
+        limites = Pedido.objects.aggregate(inicio=Min('id'), fim=Max('id'))
+        if limites['inicio'] is None:
+            self.stdout.write('Nenhum pedido para recalcular')
+            return
+
+        total = Pedido.objects.count()
+        self.stdout.write(f'🔄 Recalculando {total} pedidos em blocos de {chunk} ids...')
+
+        # Blocos por faixa de id: cada UPDATE usa a chave primária e a transação fica curta
+        inicio = time.perf_counter()
+        atualizados = 0
+        for primeiro in range(limites['inicio'], limites['fim'] + 1, chunk):
+            with transaction.atomic():
+                atualizados += Pedido.objects.filter(
+                    id__gte=primeiro, id__lt=primeiro + chunk
+                ).recalcular_totais()
+            decorrido = time.perf_counter() - inicio
+            self.stdout.write(
+                f'  {atualizados}/{total} pedidos ({atualizados / total:.0%}) - '
+                f'{atualizados / decorrido:.0f} pedidos/s'
+            )
+
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {atualizados} pedidos recalculados em {decorrido:.2f}s '
+            f'({atualizados / decorrido:.0f} pedidos/s)'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ImproperlyConfigured
+from car.replica import snapshot_replica
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco principal para a réplica de leitura (alias 'replica') com a API de "
+        'backup do SQLite; com --interval, repete periodicamente'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Segundos entre snapshots; 0 faz um só (padrão: 0)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                duracao, tamanho = snapshot_replica()
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                f'📸 Réplica atualizada: {tamanho / (1024 * 1024):.1f} MiB em {duracao * 1000:.0f} ms'
+            )
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,174 @@
+"""
+Middleware de instrumentação do gateway
+Responsável por: Server-Timing, log estruturado por requisição, dump de requisições lentas
+e métricas HTTP por view (microservices/metrics.py); estado do roteamento para a réplica
+"""
+
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from microservices.instrumentation import (
+    encerrar_perfil,
+    iniciar_perfil,
+    instalar_em_conexoes,
+    perfil_atual,
+)
+from microservices.metrics import DURACAO_REQUISICAO, REQUISICOES_EM_ANDAMENTO, REQUISICOES_HTTP
+
+from .routers import (
+    COOKIE_ESCRITA,
+    COOKIE_SALT,
+    encerrar_requisicao,
+    estado_atual,
+    iniciar_requisicao,
+    janela_escrita,
+)
+
+logger = logging.getLogger('carbuild.requests')
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Mede cada requisição: consultas SQL (quantidade e tempo), tempo em cada
+    método dos clientes dos microsserviços e renderização da resposta.
+
+    - Cabeçalho Server-Timing (SERVER_TIMING_ENABLED), visível no DevTools
+    - Uma linha JSON por requisição no logger 'carbuild.requests' (nível INFO)
+    - Com SLOW_REQUEST_THRESHOLD_MS definido, requisições mais lentas que o limite
+      geram um WARNING com o SQL executado (até SLOW_REQUEST_MAX_QUERIES consultas)
+    - Métricas carbuild_http_* por view (nome da rota; 'unmatched' sem rota)
+
+    Deve ficar no início de MIDDLEWARE para que o total inclua os demais.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+        self.slow_threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        self.slow_max_queries = getattr(settings, 'SLOW_REQUEST_MAX_QUERIES', 100)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        perfil, token = self._iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            encerrar_perfil(token)
+            REQUISICOES_EM_ANDAMENTO.dec()
+        return self._finalizar(request, response, perfil)
+
+    async def __acall__(self, request):
+        perfil, token = self._iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            encerrar_perfil(token)
+            REQUISICOES_EM_ANDAMENTO.dec()
+        return self._finalizar(request, response, perfil)
+
+    def _iniciar(self):
+        instalar_em_conexoes()
+        REQUISICOES_EM_ANDAMENTO.inc()
+        return iniciar_perfil(
+            capturar_sql=self.slow_threshold_ms is not None,
+            max_sql=self.slow_max_queries
+        )
+
+    def process_template_response(self, request, response):
+        # Respostas do DRF são renderizadas logo depois deste hook
+        perfil = perfil_atual()
+        if perfil is not None:
+            inicio = time.perf_counter()
+
+            def fim_render(response):
+                perfil.render_ms += (time.perf_counter() - inicio) * 1000
+
+            response.add_post_render_callback(fim_render)
+        return response
+
+    def _finalizar(self, request, response, perfil):
+        total_ms = perfil.total_ms()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        REQUISICOES_HTTP.inc(view=view, method=request.method, status=response.status_code)
+        DURACAO_REQUISICAO.observe(total_ms / 1000, view=view)
+        if self.server_timing:
+            response['Server-Timing'] = perfil.server_timing(total_ms)
+
+        lenta = self.slow_threshold_ms is not None and total_ms >= self.slow_threshold_ms
+        if lenta or logger.isEnabledFor(logging.INFO):
+            registro = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **perfil.resumo(total_ms),
+            }
+            logger.info(json.dumps(registro))
+            if lenta:
+                logger.warning(json.dumps({**registro, 'slow': True, 'sql': perfil.sql}))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Abre o estado de car/routers.py para cada requisição: só dentro dele as
+    leituras de Car/Peca podem ir para a réplica. Uma escrita no catálogo grava
+    o cookie assinado COOKIE_ESCRITA, e as requisições seguintes do mesmo
+    cliente leem do principal até DATABASE_REPLICA_STICKY_SECONDS depois dela.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self._iniciar(request)
+        try:
+            response = self.get_response(request)
+            return self._finalizar(response)
+        finally:
+            encerrar_requisicao(token)
+
+    async def __acall__(self, request):
+        token = self._iniciar(request)
+        try:
+            response = await self.get_response(request)
+            return self._finalizar(response)
+        finally:
+            encerrar_requisicao(token)
+
+    def _iniciar(self, request):
+        ultima_escrita = request.get_signed_cookie(
+            COOKIE_ESCRITA, default=None, salt=COOKIE_SALT, max_age=janela_escrita()
+        )
+        try:
+            ultima_escrita = float(ultima_escrita) if ultima_escrita else None
+        except ValueError:
+            ultima_escrita = None
+        return iniciar_requisicao(ultima_escrita)
+
+    def _finalizar(self, response):
+        estado = estado_atual()
+        if estado.escreveu:
+            response.set_signed_cookie(
+                COOKIE_ESCRITA, str(estado.ultima_escrita), salt=COOKIE_SALT,
+                max_age=janela_escrita(), httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:03
+
+from django.db import migrations, models
+import unicodedata
+
+
+def preencher_nome_normalizado(apps, schema_editor):
+    Peca = apps.get_model('car', 'Peca')
+    pecas = list(Peca.objects.only('id', 'nome'))
+    for peca in pecas:
+        decomposto = unicodedata.normalize('NFKD', peca.nome or '')
+        peca.nome_normalizado = ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+    Peca.objects.bulk_update(pecas, ['nome_normalizado'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='peca',
+            name='nome_normalizado',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(preencher_nome_normalizado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='peca',
+            index=models.Index(fields=['owner', 'valor'], name='car_peca_owner_valor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peca',
+            index=models.Index(fields=['valor'], name='car_peca_valor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peca',
+            index=models.Index(fields=['nome_normalizado'], name='car_peca_nome_norm_idx'),
+        ),
+    ]
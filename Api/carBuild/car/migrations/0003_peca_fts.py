@@ -0,0 +1,74 @@
+from django.db import migrations
+
+
+# Índice FTS5 espelhando Peca.nome e o modelo do carro dono (SQLite apenas).
+# remove_diacritics 2 faz "oleo" casar com "Óleo" e "fluido" com "Fluído".
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS car_peca_fts USING fts5(
+        nome, modelo, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_fts_ai AFTER INSERT ON car_peca BEGIN
+        INSERT INTO car_peca_fts(rowid, nome, modelo)
+        VALUES (new.id, new.nome, (SELECT modelo FROM car_car WHERE id = new.owner_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_fts_au AFTER UPDATE OF nome, owner_id ON car_peca BEGIN
+        DELETE FROM car_peca_fts WHERE rowid = old.id;
+        INSERT INTO car_peca_fts(rowid, nome, modelo)
+        VALUES (new.id, new.nome, (SELECT modelo FROM car_car WHERE id = new.owner_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_fts_ad AFTER DELETE ON car_peca BEGIN
+        DELETE FROM car_peca_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_car_fts_au AFTER UPDATE OF modelo ON car_car BEGIN
+        UPDATE car_peca_fts SET modelo = new.modelo
+        WHERE rowid IN (SELECT id FROM car_peca WHERE owner_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO car_peca_fts(rowid, nome, modelo)
+    SELECT car_peca.id, car_peca.nome, car_car.modelo
+    FROM car_peca LEFT JOIN car_car ON car_car.id = car_peca.owner_id
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS car_car_fts_au',
+    'DROP TRIGGER IF EXISTS car_peca_fts_ad',
+    'DROP TRIGGER IF EXISTS car_peca_fts_au',
+    'DROP TRIGGER IF EXISTS car_peca_fts_ai',
+    'DROP TABLE IF EXISTS car_peca_fts',
+]
+
+
+def criar_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def remover_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0002_peca_nome_normalizado_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_fts, remover_fts),
+    ]
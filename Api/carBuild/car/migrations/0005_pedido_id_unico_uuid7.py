@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:21
+
+import car.order_ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0004_idempotencia'),
+    ]
+
+    # O default é aplicado pelo Python, não pelo banco: só o estado muda.
+    # Sem isso o SQLite recriaria a tabela car_pedido inteira.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='pedido',
+                    name='id_unico',
+                    field=models.UUIDField(default=car.order_ids.gerar_id_pedido, editable=False, unique=True),
+                ),
+            ],
+        ),
+    ]
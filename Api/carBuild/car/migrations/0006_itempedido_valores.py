@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:40
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+
+def preencher_valores(apps, schema_editor):
+    """Copia o preço atual das peças para os itens existentes (dois UPDATEs, sem carregar linhas)"""
+    ItemPedido = apps.get_model('car', 'ItemPedido')
+    Peca = apps.get_model('car', 'Peca')
+    ItemPedido.objects.update(
+        valor_unitario=Subquery(Peca.objects.filter(pk=OuterRef('peca_id')).values('valor')[:1])
+    )
+    ItemPedido.objects.update(
+        subtotal=ExpressionWrapper(
+            F('quantidade') * F('valor_unitario'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0005_pedido_id_unico_uuid7'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itempedido',
+            name='valor_unitario',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='itempedido',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(preencher_valores, migrations.RunPython.noop),
+    ]
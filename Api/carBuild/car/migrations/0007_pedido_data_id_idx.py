@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0006_itempedido_valores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['data_pedido', 'id'], name='car_pedido_data_id_idx'),
+        ),
+    ]
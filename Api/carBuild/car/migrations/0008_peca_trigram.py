@@ -0,0 +1,71 @@
+from django.db import OperationalError, migrations
+
+
+# Índice FTS5 trigram sobre Peca.nome_normalizado (SQLite 3.34+ apenas).
+# Permite o filtro ?nome= por substring (LIKE '%x%') sem varrer a tabela ou o
+# índice car_peca_nome_norm_idx inteiros: um termo de 3+ caracteres vira uma
+# frase de trigramas no MATCH (microservices/search.py: filtro_substring_nome).
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS car_peca_trgm USING fts5(
+        nome_normalizado, tokenize = 'trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_trgm_ai AFTER INSERT ON car_peca BEGIN
+        INSERT INTO car_peca_trgm(rowid, nome_normalizado) VALUES (new.id, new.nome_normalizado);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_trgm_au AFTER UPDATE OF nome_normalizado ON car_peca BEGIN
+        DELETE FROM car_peca_trgm WHERE rowid = old.id;
+        INSERT INTO car_peca_trgm(rowid, nome_normalizado) VALUES (new.id, new.nome_normalizado);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS car_peca_trgm_ad AFTER DELETE ON car_peca BEGIN
+        DELETE FROM car_peca_trgm WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO car_peca_trgm(rowid, nome_normalizado)
+    SELECT id, nome_normalizado FROM car_peca
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS car_peca_trgm_ad',
+    'DROP TRIGGER IF EXISTS car_peca_trgm_au',
+    'DROP TRIGGER IF EXISTS car_peca_trgm_ai',
+    'DROP TABLE IF EXISTS car_peca_trgm',
+]
+
+
+def criar_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL[0])
+    except OperationalError:
+        # SQLite sem o tokenizer trigram: o filtro continua no índice car_peca_nome_norm_idx
+        return
+    for sql in CREATE_SQL[1:]:
+        schema_editor.execute(sql)
+
+
+def remover_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car', '0007_pedido_data_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_trigram, remover_trigram),
+    ]
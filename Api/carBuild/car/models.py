@@ -1,6 +1,17 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+import unicodedata
+
+from .order_ids import gerar_id_pedido
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ("Óleo" -> "oleo"), para buscas insensíveis a caixa e acento"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
 
 class Car(models.Model):
     modelo = models.CharField(max_length=30)
@@ -9,27 +20,129 @@ class Car(models.Model):
     def __str__(self):
         return f"{self.modelo} ({self.ano})"
 
+class PecaQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create não chama save(); preencher a coluna normalizada aqui
+        objs = list(objs)
+        for peca in objs:
+            peca.nome_normalizado = normalizar_texto(peca.nome)
+        return super().bulk_create(objs, *args, **kwargs)
+
 class Peca(models.Model):
     nome = models.CharField(max_length=50)
+    nome_normalizado = models.CharField(max_length=50, editable=False, default='')
     valor = models.DecimalField(max_digits=10, decimal_places=2)
     owner = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='pecas', blank=True, null=True)
     
+    objects = PecaQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Filtro por carro + faixa de valor (/api/pecas/?car_id=&min_valor=&max_valor=)
+            models.Index(fields=['owner', 'valor'], name='car_peca_owner_valor_idx'),
+            # Faixa de valor sem carro
+            models.Index(fields=['valor'], name='car_peca_valor_idx'),
+            # Busca por nome (insensível a caixa e acento)
+            models.Index(fields=['nome_normalizado'], name='car_peca_nome_norm_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.nome_normalizado = normalizar_texto(self.nome)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'nome_normalizado'}
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return self.nome
 
+def _prefetch_itens():
+    """Prefetch dos itens do pedido já com peça e carro (JOIN), evitando N+1"""
+    return Prefetch('itens', queryset=ItemPedido.objects.select_related('peca__owner'))
+
+class PedidoQuerySet(models.QuerySet):
+    def com_itens(self):
+        """Pré-carrega itens, peças e carros em consultas fixas, independente do número de itens"""
+        return self.prefetch_related(_prefetch_itens())
+    
+    def com_itens_relatorio(self):
+        """
+        Pré-carrega só o que gerar_relatorio usa: valores gravados no item e o nome da peça.
+        Sem o JOIN com carro e sem ler o preço atual da peça.
+        """
+        return self.prefetch_related(Prefetch(
+            'itens',
+            queryset=ItemPedido.objects.select_related('peca').only(
+                'pedido', 'quantidade', 'valor_unitario', 'subtotal', 'peca__nome'
+            )
+        ))
+    
+    def com_totais_itens(self):
+        """
+        Anota total_itens (linhas) e quantidade_total (peças) na mesma consulta, com
+        subconsultas correlacionadas pelo índice de pedido_id. Diferente de JOIN + GROUP BY,
+        só são calculadas para as linhas da página, sem agrupar a tabela inteira antes do LIMIT.
+        """
+        itens = ItemPedido.objects.filter(pedido=OuterRef('pk')).values('pedido')
+        return self.annotate(
+            total_itens=Coalesce(Subquery(itens.annotate(n=Count('id')).values('n')), 0),
+            quantidade_total=Coalesce(Subquery(itens.annotate(q=Sum('quantidade')).values('q')), 0),
+        )
+    
+    def recalcular_totais(self):
+        """
+        Recalcula valor_total dos pedidos do queryset a partir dos subtotais dos itens,
+        em um único UPDATE (sem carregar pedidos nem itens). Retorna quantos pedidos foram gravados.
+        """
+        soma_itens = (
+            ItemPedido.objects.filter(pedido=OuterRef('pk'))
+            .values('pedido')
+            .annotate(total=Sum('subtotal'))
+            .values('total')
+        )
+        return self.update(valor_total=Coalesce(
+            Subquery(soma_itens), Value(Decimal('0.00')), output_field=models.DecimalField()
+        ))
+
 class Pedido(models.Model):
-    id_unico = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # UUIDv7: ids crescentes no tempo mantêm as inserções no fim do índice único
+    id_unico = models.UUIDField(default=gerar_id_pedido, editable=False, unique=True)
     valor_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     data_pedido = models.DateTimeField(auto_now_add=True)
     
-    def gerar_relatorio(self):
-        """Gera um relatório com nome das peças e quantidades"""
+    objects = PedidoQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Listagem mais recentes primeiro e filtro por período (/api/orders/?data_inicio=&data_fim=)
+            models.Index(fields=['data_pedido', 'id'], name='car_pedido_data_id_idx'),
+        ]
+    
+    def itens_com_pecas(self):
+        """
+        Lista materializada dos itens com peça e carro carregados.
+        Reaproveita o prefetch de com_itens(); se não houver, faz o prefetch uma única vez
+        e o deixa em cache na instância, de forma que self.itens.all() (usado pelos
+        serializers) compartilhe a mesma lista.
+        """
+        if 'itens' not in getattr(self, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([self], _prefetch_itens())
+        return list(self.itens.all())
+    
+    def gerar_relatorio(self, itens=None):
+        """
+        Gera um relatório com nome das peças e quantidades
+        itens: lista de ItemPedido já carregada (com peça); se omitida, busca do banco
+        Valores vêm do item (preço no momento do pedido), não do preço atual da peça
+        """
+        if itens is None:
+            itens = self.itens_com_pecas()
         relatorio = []
-        for item in self.itens.all():
+        for item in itens:
             relatorio.append({
                 'nome_peca': item.peca.nome,
                 'quantidade': item.quantidade,
-                'valor_unitario': float(item.peca.valor),
+                'valor_unitario': float(item.valor_unitario),
                 'subtotal': float(item.subtotal)
             })
         return {
@@ -40,24 +153,74 @@ class Pedido(models.Model):
         }
     
     def calcular_total(self):
-        """Calcula o valor total do pedido baseado nos itens"""
-        total = sum(item.subtotal for item in self.itens.all())
+        """Soma os subtotais dos itens no banco e grava só valor_total"""
+        total = self.itens.aggregate(total=Sum('subtotal'))['total'] or Decimal('0.00')
         self.valor_total = total
-        self.save()
+        self.save(update_fields=['valor_total'])
         return total
     
     def __str__(self):
         return f"Pedido #{self.id_unico}"
 
+class ItemPedidoQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create não chama save(); congelar os valores aqui, com uma consulta
+        # para as peças que não vieram carregadas nos itens
+        objs = list(objs)
+        sem_preco = {
+            item.peca_id for item in objs
+            if item.valor_unitario is None and not ItemPedido.peca.is_cached(item)
+        }
+        pecas = Peca.objects.in_bulk(list(sem_preco)) if sem_preco else {}
+        for item in objs:
+            if item.valor_unitario is None and item.peca_id in pecas:
+                item.peca = pecas[item.peca_id]
+            item.congelar_valores()
+        return super().bulk_create(objs, *args, **kwargs)
+
 class ItemPedido(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='itens')
     peca = models.ForeignKey(Peca, on_delete=models.CASCADE)
     quantidade = models.PositiveIntegerField()
+    # Preço da peça no momento do pedido; mudanças de preço não alteram pedidos antigos
+    valor_unitario = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+    
+    objects = ItemPedidoQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.quantidade}x {self.peca.nome}"
     
-    @property
-    def subtotal(self):
-        return self.quantidade * self.peca.valor
-    
\ No newline at end of file
+    def congelar_valores(self):
+        """Copia o preço atual da peça (se ainda não copiado) e recalcula o subtotal"""
+        if self.valor_unitario is None:
+            self.valor_unitario = self.peca.valor
+        self.subtotal = self.quantidade * self.valor_unitario
+        return self
+    
+    def save(self, *args, **kwargs):
+        self.congelar_valores()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'quantidade' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'valor_unitario', 'subtotal'}
+        super().save(*args, **kwargs)
+    
+class ChaveIdempotencia(models.Model):
+    """
+    Requisição já processada com um cabeçalho Idempotency-Key.
+    status_code nulo indica que a primeira requisição ainda está em processamento.
+    """
+    endpoint = models.CharField(max_length=100)
+    chave = models.CharField(max_length=255)
+    hash_requisicao = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    resposta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'chave'], name='car_idempotencia_endpoint_chave_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.chave}"
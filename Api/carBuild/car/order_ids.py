@@ -0,0 +1,98 @@
+"""
+IDs de pedido ordenados no tempo (UUIDv7, RFC 9562)
+Responsável por: gerar, reservar em bloco e validar ids de pedido
+
+Layout dos 128 bits:
+    48 bits  timestamp Unix em ms     -> ids novos vão para o fim do índice único
+     4 bits  versão (7)
+    12 bits  sequência dentro do mesmo ms (monotônica por processo)
+     2 bits  variante RFC
+    30 bits  aleatórios
+    32 bits  assinatura HMAC (SECRET_KEY) dos 96 bits anteriores
+
+A assinatura permite aceitar em create_order um id reservado antes pelo cliente
+sem guardar as reservas: basta conferir a assinatura e a idade do timestamp.
+Um id reservado só pode ser usado uma vez (índice único de Pedido.id_unico).
+"""
+
+import secrets
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+_KEY_SALT = 'carbuild.order_ids'
+_lock = threading.Lock()
+_ultimo_ms = 0
+_sequencia = 0
+
+
+def _assinatura(prefixo):
+    """32 bits de HMAC-SHA256 sobre os 12 primeiros bytes do id"""
+    return int.from_bytes(salted_hmac(_KEY_SALT, prefixo, algorithm='sha256').digest()[:4], 'big')
+
+
+def _proximo_timestamp():
+    """(ms, sequência) estritamente crescentes dentro do processo"""
+    global _ultimo_ms, _sequencia
+    with _lock:
+        agora = time.time_ns() // 1_000_000
+        if agora > _ultimo_ms:
+            _ultimo_ms = agora
+            # Começa em um ponto aleatório da metade inferior para sobrar espaço no mesmo ms
+            _sequencia = secrets.randbits(11)
+        else:
+            _sequencia += 1
+            if _sequencia > 0xFFF:
+                # Sequência esgotada no mesmo ms: avança o relógio lógico
+                _ultimo_ms += 1
+                _sequencia = secrets.randbits(11)
+        return _ultimo_ms, _sequencia
+
+
+def montar_id_pedido(ms, sequencia, aleatorio):
+    """UUIDv7 assinado a partir das partes (timestamp em ms, sequência de 12 bits, 30 bits aleatórios)"""
+    valor = (ms & 0xFFFFFFFFFFFF) << 80
+    valor |= 0x7 << 76
+    valor |= (sequencia & 0xFFF) << 64
+    valor |= 0b10 << 62
+    valor |= (aleatorio & 0x3FFFFFFF) << 32
+    prefixo = valor.to_bytes(16, 'big')[:12]
+    return uuid.UUID(int=valor | _assinatura(prefixo))
+
+
+def gerar_id_pedido():
+    """Novo UUIDv7 assinado"""
+    ms, sequencia = _proximo_timestamp()
+    return montar_id_pedido(ms, sequencia, secrets.randbits(30))
+
+
+def reservar_ids_pedido(quantidade):
+    """Bloco de ids em ordem crescente, válidos por ORDER_ID_RESERVATION_TTL segundos"""
+    return [gerar_id_pedido() for _ in range(quantidade)]
+
+
+def timestamp_ms(id_pedido):
+    return id_pedido.int >> 80
+
+
+def validar_id_reservado(valor):
+    """
+    Converte e valida um id reservado; levanta ValueError com a mensagem
+    para o cliente se não for um id emitido por este gateway ou se expirou
+    """
+    try:
+        id_pedido = valor if isinstance(valor, uuid.UUID) else uuid.UUID(str(valor))
+    except (TypeError, ValueError):
+        raise ValueError(f'id_unico inválido: {valor}')
+
+    prefixo = id_pedido.bytes[:12]
+    if id_pedido.version != 7 or (id_pedido.int & 0xFFFFFFFF) != _assinatura(prefixo):
+        raise ValueError(f'id_unico {id_pedido} não foi reservado por este serviço')
+
+    ttl = getattr(settings, 'ORDER_ID_RESERVATION_TTL', 86400)
+    idade = time.time() - timestamp_ms(id_pedido) / 1000
+    if idade > ttl:
+        raise ValueError(f'Reserva do id_unico {id_pedido} expirou')
+    return id_pedido
@@ -0,0 +1,72 @@
+"""
+Réplica de leitura em SQLite para desenvolvimento e CI
+Responsável por: copiar o banco principal para o arquivo da réplica com a API de backup
+e identificar o snapshot em uso (geração) para as chaves do cache do catálogo
+
+A cópia é feita em um passo só: o principal só precisa de um lock de leitura
+(em WAL, escritores não esperam), e quem lê a réplica espera o fim da cópia
+por busy_timeout e depois vê o snapshot novo. Em produção, troque o alias
+'replica' por uma réplica real do banco e dispense o snapshot.
+"""
+
+import os
+import sqlite3
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from .routers import REPLICA_ALIAS, banco_leitura_catalogo
+
+
+def _arquivo(alias):
+    banco = connections[alias]
+    if banco.vendor != 'sqlite':
+        raise ImproperlyConfigured(f"Snapshot da réplica exige SQLite (alias '{alias}' é {banco.vendor})")
+    return str(banco.settings_dict['NAME'])
+
+
+def copiar_sqlite(caminho_origem, caminho_destino):
+    """Backup online de um arquivo SQLite sobre outro; devolve (segundos, bytes)"""
+    espera = getattr(settings, 'SQLITE_PRAGMAS', {}).get('busy_timeout', 5000) / 1000
+    inicio = time.perf_counter()
+    fonte = sqlite3.connect(caminho_origem, uri=caminho_origem.startswith('file:'))
+    try:
+        copia = sqlite3.connect(caminho_destino, timeout=espera)
+        try:
+            fonte.backup(copia)
+        finally:
+            copia.close()
+    finally:
+        fonte.close()
+    return time.perf_counter() - inicio, os.path.getsize(caminho_destino)
+
+
+def snapshot_replica(origem=DEFAULT_DB_ALIAS, destino=REPLICA_ALIAS):
+    """Copia o banco `origem` sobre o arquivo de `destino`; devolve (segundos, bytes)"""
+    caminho_origem, caminho_destino = _arquivo(origem), _arquivo(destino)
+    if caminho_origem == caminho_destino:
+        raise ImproperlyConfigured('Réplica e banco principal apontam para o mesmo arquivo')
+    resultado = copiar_sqlite(caminho_origem, caminho_destino)
+    # Nova geração: em WAL a cópia pode ficar só no -wal, sem tocar o arquivo principal
+    os.utime(caminho_destino)
+    return resultado
+
+
+def geracao_replica():
+    """Geração do snapshot (mtime do arquivo da réplica); 0 se não houver arquivo"""
+    try:
+        return os.stat(connections[REPLICA_ALIAS].settings_dict['NAME']).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def origem_catalogo():
+    """
+    De onde vêm as leituras do catálogo agora, para as chaves do cache:
+    '' no principal, 'r<geração>' na réplica. Assim o cache nunca mistura dados
+    da réplica com os do principal, e cada snapshot novo invalida o que foi
+    lido do anterior, inclusive quando o snapshot roda em outro processo.
+    """
+    if banco_leitura_catalogo() != REPLICA_ALIAS:
+        return ''
+    return f'r{geracao_replica()}'
@@ -0,0 +1,132 @@
+"""
+Roteamento entre o banco principal e a réplica de leitura do catálogo
+Responsável por: mandar leituras de Car/Peca para a réplica e o resto (escritas,
+pedidos) para o principal, voltando ao principal depois de uma escrita
+
+A réplica é um snapshot do principal (car/replica.py, snapshot_replica), então
+pode estar atrasada. Por isso só leituras feitas durante uma requisição vão para
+ela (comandos e shell continuam no principal), e dentro da requisição:
+- depois de uma escrita em Car/Peca, as leituras do mesmo cliente ficam no
+  principal por DATABASE_REPLICA_STICKY_SECONDS (cookie assinado COOKIE_ESCRITA)
+- dentro de transaction.atomic() e de primario() as leituras ficam no principal
+
+O estado da requisição é aberto por car.middleware.ReplicaRoutingMiddleware.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+MODELOS_CATALOGO = frozenset({'car.Car', 'car.Peca'})
+
+# Cookie com o horário da última escrita do cliente no catálogo
+COOKIE_ESCRITA = 'carbuild_catalog_write'
+COOKIE_SALT = 'car.routers'
+
+
+class EstadoRequisicao:
+    """Mutável e compartilhado pelas cópias do contexto (sync_to_async, fan-out)"""
+
+    __slots__ = ('ultima_escrita', 'escreveu', 'primario')
+
+    def __init__(self, ultima_escrita=None):
+        self.ultima_escrita = ultima_escrita  # time.time(); pode vir do cookie do cliente
+        self.escreveu = False
+        self.primario = 0
+
+
+_estado = contextvars.ContextVar('carbuild_replica_state', default=None)
+
+
+def janela_escrita():
+    return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5)
+
+
+def iniciar_requisicao(ultima_escrita=None):
+    """Abre o estado de roteamento da requisição; devolve o token para encerrar_requisicao"""
+    return _estado.set(EstadoRequisicao(ultima_escrita))
+
+
+def estado_atual():
+    return _estado.get()
+
+
+def encerrar_requisicao(token):
+    _estado.reset(token)
+
+
+@contextmanager
+def primario():
+    """Leituras do bloco vão para o principal (ex.: preços usados para criar um pedido)"""
+    estado = _estado.get()
+    if estado is not None:
+        estado.primario += 1
+    try:
+        yield
+    finally:
+        if estado is not None:
+            estado.primario -= 1
+
+
+_replica_pronta = False
+
+
+def replica_habilitada():
+    """Ligada nas settings e com o primeiro snapshot já gravado"""
+    global _replica_pronta
+    if not getattr(settings, 'DATABASE_REPLICA_ENABLED', False) or REPLICA_ALIAS not in settings.DATABASES:
+        return False
+    if not _replica_pronta:
+        # Sem snapshot, o SQLite criaria um arquivo vazio e as consultas falhariam
+        banco = connections[REPLICA_ALIAS]
+        _replica_pronta = banco.is_in_memory_db() or os.path.exists(banco.settings_dict['NAME'])
+    return _replica_pronta
+
+
+def banco_leitura_catalogo():
+    """Banco das leituras de Car/Peca neste momento; None fora do roteamento (padrão)"""
+    estado = _estado.get()
+    if estado is None or not replica_habilitada():
+        return None
+    if estado.primario or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if estado.ultima_escrita is not None and time.time() - estado.ultima_escrita < janela_escrita():
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+class ReadReplicaRouter:
+    """Router do Django (DATABASE_ROUTERS); None deixa a decisão para o padrão"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label not in MODELOS_CATALOGO:
+            return None
+        banco = banco_leitura_catalogo()
+        instance = hints.get('instance')
+        if banco is not None and instance is not None and instance._state.db:
+            # Relacionados vêm do mesmo banco do objeto de origem
+            return instance._state.db
+        return banco
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None and model._meta.label in MODELOS_CATALOGO:
+            # Só escritas no catálogo mudam o que a réplica devolveria
+            estado.ultima_escrita = time.time()
+            estado.escreveu = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A réplica é cópia do principal: objetos dos dois bancos podem se relacionar
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # O esquema chega à réplica junto com os dados, pelo snapshot
+        if db == REPLICA_ALIAS:
+            return False
+        return None
@@ -1,3 +1,6 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
 from rest_framework import serializers
 from .models import Car, Peca, Pedido, ItemPedido
 
@@ -21,12 +24,13 @@ class PecaSerializer(serializers.ModelSerializer):
 class ItemPedidoSerializer(serializers.ModelSerializer):
     """Serializer para o modelo ItemPedido"""
     peca_details = PecaSerializer(source='peca', read_only=True)
+    valor_unitario = serializers.ReadOnlyField()
     subtotal = serializers.ReadOnlyField()
     
     class Meta:
         model = ItemPedido
-        fields = ['id', 'peca', 'peca_details', 'quantidade', 'subtotal']
-        read_only_fields = ['id', 'subtotal']
+        fields = ['id', 'peca', 'peca_details', 'quantidade', 'valor_unitario', 'subtotal']
+        read_only_fields = ['id', 'valor_unitario', 'subtotal']
 
 class PedidoSerializer(serializers.ModelSerializer):
     """Serializer para o modelo Pedido"""
@@ -40,6 +44,11 @@ class PedidoSerializer(serializers.ModelSerializer):
         fields = ['id', 'id_unico', 'valor_total', 'data_pedido', 'itens', 'relatorio']
         read_only_fields = ['id', 'id_unico', 'data_pedido']
     
+    def to_representation(self, instance):
+        # Materializa os itens uma única vez; 'itens' e 'relatorio' leem do mesmo cache
+        instance.itens_com_pecas()
+        return super().to_representation(instance)
+    
     def get_relatorio(self, obj):
         """Retorna o relatório do pedido"""
         return obj.gerar_relatorio()
@@ -53,28 +62,43 @@ class PedidoCreateSerializer(serializers.ModelSerializer):
         fields = ['valor_total', 'itens']
         read_only_fields = ['valor_total']
     
+    @transaction.atomic
     def create(self, validated_data):
         itens_data = validated_data.pop('itens')
-        pedido = Pedido.objects.create(**validated_data)
+        itens = [ItemPedido(**item_data).congelar_valores() for item_data in itens_data]
         
-        for item_data in itens_data:
-            ItemPedido.objects.create(pedido=pedido, **item_data)
+        # Valor total calculado em memória a partir das peças já carregadas
+        validated_data['valor_total'] = sum((item.subtotal for item in itens), Decimal('0.00'))
+        pedido = Pedido.objects.create(**validated_data)
         
-        # Recalcular valor total
-        pedido.calcular_total()
+        for item in itens:
+            item.pedido = pedido
+        ItemPedido.objects.bulk_create(itens)
         return pedido
 
 class PedidoListSerializer(serializers.ModelSerializer):
-    """Serializer simplificado para listagem de pedidos"""
+    """
+    Serializer simplificado para listagem de pedidos
+    Use com Pedido.objects.com_totais_itens(), que já traz as contagens na mesma consulta
+    """
     total_itens = serializers.SerializerMethodField()
+    quantidade_total = serializers.SerializerMethodField()
     
     class Meta:
         model = Pedido
-        fields = ['id', 'id_unico', 'valor_total', 'data_pedido', 'total_itens']
+        fields = ['id', 'id_unico', 'valor_total', 'data_pedido', 'total_itens', 'quantidade_total']
         read_only_fields = ['id', 'id_unico', 'data_pedido', 'valor_total']
     
     def get_total_itens(self, obj):
         """Retorna o número total de itens no pedido"""
+        if hasattr(obj, 'total_itens'):
+            return obj.total_itens
         return obj.itens.count()
+    
+    def get_quantidade_total(self, obj):
+        """Retorna a soma das quantidades dos itens do pedido"""
+        if hasattr(obj, 'quantidade_total'):
+            return obj.quantidade_total
+        return obj.itens.aggregate(total=Sum('quantidade'))['total'] or 0
 
 
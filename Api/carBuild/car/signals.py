@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from microservices.cache import catalog_cache
+from .models import Car, Peca
+
+
+@receiver([post_save, post_delete], sender=Car)
+@receiver([post_save, post_delete], sender=Peca)
+def invalidar_cache_catalogo(sender, **kwargs):
+    """
+    Qualquer escrita em Car/Peca invalida o cache do catálogo.
+    Observação: bulk_create e QuerySet.update() não disparam sinais; quem
+    usá-los deve chamar catalog_cache.invalidate() explicitamente.
+    """
+    catalog_cache.invalidate()
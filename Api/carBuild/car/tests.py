@@ -1,3 +1,1578 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .db import pragmas_atuais
+from .idempotency import RenovacaoReserva, idempotency_store
+from .middleware import ReplicaRoutingMiddleware
+from .management.commands.benchmark_api import comparar, parse_mix, resumir
+from .models import Car, ChaveIdempotencia, Peca, Pedido, ItemPedido, normalizar_texto
+from .order_ids import gerar_id_pedido
+from .replica import copiar_sqlite, snapshot_replica
+from .routers import COOKIE_ESCRITA, ReadReplicaRouter, encerrar_requisicao, iniciar_requisicao, primario
+from .serializers import PedidoSerializer
+from microservices.async_clients import AsyncServiceClient
+from microservices.service_a import MicroserviceAClient, microservice_a
+from microservices.service_b import MicroserviceBClient, microservice_b
+from microservices.pagination import date_keyset_queryset, encode_cursor, keyset_queryset
+from microservices.cache import CatalogCache
+from microservices.fanout import fan_out
+from microservices.health import HealthChecker, health_checker
+from microservices.circuit_breaker import CircuitOpenError
+from microservices.http_client import backoff_delay, resposta_erro
+from microservices.metrics import (
+    CHAMADAS_CLIENTE, DURACAO_CHAMADA_CLIENTE, DURACAO_REQUISICAO, PEDIDOS_CRIADOS,
+    REQUISICOES_HTTP, TAMANHO_CARRINHO, MetricsRegistry, registry,
+)
+from microservices.stub import StubMicroservice
 
-# Create your tests here.
+
+class CalculatePriceTests(TestCase):
+    """Cálculo de preço em lote do Microsserviço B"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(modelo='Civic', ano=2020)
+        cls.pecas = Peca.objects.bulk_create([
+            Peca(nome=f'Peça {i}', valor=Decimal('10.00') * (i + 1), owner=cls.car)
+            for i in range(50)
+        ])
+
+    def test_consulta_unica_independente_do_tamanho(self):
+        items = [{'peca_id': peca.id, 'quantidade': 1} for peca in self.pecas]
+        with self.assertNumQueries(1):
+            result = microservice_b.calculate_price(items)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(result['data']['items']), 50)
+
+    def test_linhas_repetidas_sao_agrupadas(self):
+        peca = self.pecas[0]
+        result = microservice_b.calculate_price([
+            {'peca_id': peca.id, 'quantidade': 2},
+            {'peca_id': str(peca.id), 'quantidade': 3},
+        ])
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(result['data']['items']), 1)
+        self.assertEqual(result['data']['items'][0]['quantidade'], 5)
+        self.assertEqual(result['data']['subtotal'], 50.0)
+
+    def test_todas_as_pecas_faltantes_sao_reportadas(self):
+        result = microservice_b.calculate_price([
+            {'peca_id': 999998, 'quantidade': 1},
+            {'peca_id': self.pecas[0].id, 'quantidade': 1},
+            {'peca_id': 999999, 'quantidade': 1},
+        ])
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['missing_ids'], [999998, 999999])
+
+
+class CreateOrderTests(TestCase):
+    """Criação de pedidos em lote do Microsserviço B"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pecas = Peca.objects.bulk_create([
+            Peca(nome=f'Peça {i}', valor=Decimal('2.50') * (i + 1)) for i in range(100)
+        ])
+
+    def criar(self, n):
+        items = [{'peca_id': peca.id, 'quantidade': 2} for peca in self.pecas[:n]]
+        return microservice_b.create_order({'items': items})
+
+    def test_numero_constante_de_consultas(self):
+        # SELECT das peças, SAVEPOINT, INSERT do pedido, INSERT dos itens, RELEASE
+        for n in (1, 10, 100):
+            with self.subTest(itens=n), self.assertNumQueries(5):
+                result = self.criar(n)
+            self.assertEqual(result['status'], 'success')
+
+    def test_total_e_relatorio(self):
+        result = self.criar(3)
+        esperado = float(sum(peca.valor * 2 for peca in self.pecas[:3]))
+        self.assertEqual(result['data']['valor_total'], esperado)
+        self.assertEqual(len(result['data']['relatorio']['itens']), 3)
+        pedido = Pedido.objects.get(id_unico=result['data']['pedido_id'])
+        self.assertEqual(float(pedido.valor_total), esperado)
+        self.assertEqual(pedido.itens.count(), 3)
+
+    def test_peca_inexistente_nao_cria_pedido(self):
+        result = microservice_b.create_order({'items': [{'peca_id': 999999, 'quantidade': 1}]})
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['missing_ids'], [999999])
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(ItemPedido.objects.exists())
+
+
+class CreateOrdersBulkTests(TestCase):
+    """Lote de pedidos: validação única, dois INSERTs e resultado por pedido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pecas = Peca.objects.bulk_create([
+            Peca(nome=f'Peça {i}', valor=Decimal('10.00') * (i + 1)) for i in range(10)
+        ])
+
+    def pedido(self, *indices, quantidade=1):
+        return {'items': [{'peca_id': self.pecas[i].id, 'quantidade': quantidade} for i in indices]}
+
+    def test_numero_constante_de_consultas(self):
+        # SELECT das peças, SAVEPOINT, INSERT dos pedidos, INSERT dos itens, RELEASE
+        # (até 999 parâmetros por INSERT no SQLite: 60 pedidos x 3 itens x 5 colunas cabem em um)
+        for n in (1, 20, 60):
+            orders = [self.pedido(i % 10, (i + 1) % 10, (i + 2) % 10) for i in range(n)]
+            with self.subTest(pedidos=n), self.assertNumQueries(5):
+                result = microservice_b.create_orders_bulk(orders)
+            self.assertEqual(result['data']['created'], n)
+
+        pedido_id = result['data']['results'][0]['pedido_id']
+        pedido = Pedido.objects.get(id_unico=pedido_id)
+        self.assertEqual(pedido.itens.count(), 3)
+        self.assertEqual(pedido.valor_total, Decimal('60.00'))
+
+    def test_erros_por_pedido(self):
+        result = microservice_b.create_orders_bulk([
+            self.pedido(0, 1),
+            {'items': []},
+            {'items': [{'peca_id': 999999, 'quantidade': 1}]},
+            {'items': [{'peca_id': 'x', 'quantidade': 1}]},
+            self.pedido(2, quantidade=3),
+        ])
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['data']['created'], 2)
+        self.assertEqual(result['data']['failed'], 3)
+        statuses = [r['status'] for r in result['data']['results']]
+        self.assertEqual(statuses, ['success', 'error', 'error', 'error', 'success'])
+        self.assertEqual(result['data']['results'][2]['missing_ids'], [999999])
+        self.assertEqual(result['data']['results'][4]['valor_total'], 90.0)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    def test_endpoint(self):
+        url = '/api/orders/batch/'
+        response = self.client.post(url, {'orders': [self.pedido(0), self.pedido(1)]}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {'orders': [self.pedido(0), {'items': []}]}, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        response = self.client.post(url, {'orders': [{'items': []}]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'orders': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        with self.settings(ORDERS_BATCH_MAX=1):
+            client = MicroserviceBClient()
+        self.assertEqual(client.validate_orders_batch({'orders': [{}, {}]})['status'], 'error')
+
+    def test_endpoint_async(self):
+        response = self.client.post(
+            '/api/async/orders/batch/', {'orders': [self.pedido(0), {'items': []}]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 207)
+
+class IdempotencyKeyTests(TestCase):
+    """Idempotency-Key em POST /api/orders/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.peca = Peca.objects.create(nome='Filtro', valor=Decimal('30.00'))
+
+    def post(self, body, chave='pedido-1', url='/api/orders/'):
+        return self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY=chave)
+
+    def body(self, quantidade=1):
+        return {'items': [{'peca_id': self.peca.id, 'quantidade': quantidade}]}
+
+    def test_replay_devolve_resposta_original(self):
+        original = self.post(self.body())
+        self.assertEqual(original.status_code, 201)
+
+        with CaptureQueriesContext(connection) as queries:
+            replay = self.post(self.body())
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), original.json())
+        # Só a leitura da chave; pedidos e itens não são tocados
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('car_itempedido', queries[0]['sql'])
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(ItemPedido.objects.count(), 1)
+
+    def test_chaves_distintas_e_sem_chave(self):
+        self.post(self.body(), chave='a')
+        self.post(self.body(), chave='b')
+        self.client.post('/api/orders/', self.body(), content_type='application/json')
+        self.assertEqual(Pedido.objects.count(), 3)
+
+    def test_corpo_diferente_com_mesma_chave(self):
+        self.post(self.body(1))
+        self.assertEqual(self.post(self.body(2)).status_code, 422)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0.2)
+    def test_duplicata_concorrente_recebe_conflito(self):
+        # Reserva de uma requisição ainda em processamento
+        ChaveIdempotencia.objects.create(
+            endpoint='orders', chave='pedido-1',
+            hash_requisicao=hashlib.sha256(json.dumps(self.body()).encode()).hexdigest()
+        )
+        self.assertEqual(self.post(self.body()).status_code, 409)
+        self.assertEqual(Pedido.objects.count(), 0)
+        # Reserva abandonada (além do timeout) é retomada
+        time.sleep(0.25)
+        self.assertEqual(self.post(self.body()).status_code, 201)
+
+    @override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0.2)
+    def test_reserva_renovada_nao_e_retomada(self):
+        registro = ChaveIdempotencia.objects.create(
+            endpoint='orders', chave='pedido-1',
+            hash_requisicao=hashlib.sha256(json.dumps(self.body()).encode()).hexdigest()
+        )
+        time.sleep(0.25)
+        # View original ainda executando: a renovação mantém a reserva
+        idempotency_store.renovar(registro)
+        self.assertEqual(self.post(self.body()).status_code, 409)
+        self.assertEqual(Pedido.objects.count(), 0)
+
+    def test_renovacao_periodica_durante_a_view(self):
+        store = mock.Mock(lock_timeout=0.03)
+        with RenovacaoReserva(store, mock.Mock()):
+            time.sleep(0.1)
+        self.assertGreaterEqual(store.renovar.call_count, 2)
+
+    def test_concluir_reserva_removida_nao_falha(self):
+        registro = ChaveIdempotencia.objects.create(endpoint='orders', chave='x', hash_requisicao='h')
+        registro.delete()
+        with self.assertLogs('car.idempotency', level='WARNING'):
+            idempotency_store.concluir(registro, 201, {'status': 'success'})
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=0)
+    def test_chave_expirada_e_purge(self):
+        self.post(self.body())
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+        self.assertEqual(self.post(self.body()).status_code, 201)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    def test_falha_transitoria_libera_a_chave(self):
+        falha = resposta_erro(CircuitOpenError('POST /create-order/', 5))
+        with mock.patch.object(microservice_b, 'create_order', return_value=falha):
+            self.assertEqual(self.post(self.body()).status_code, 503)
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+        retry = self.post(self.body())
+        self.assertEqual(retry.status_code, 201)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_peca_id_invalido_e_definitivo(self):
+        for url in ('/api/orders/', '/api/async/orders/'):
+            with self.subTest(url=url):
+                response = self.post({'items': [{'peca_id': 'abc', 'quantidade': 1}]}, chave=url, url=url)
+                self.assertEqual(response.status_code, 400)
+                self.assertNotIn('retryable', response.json())
+                self.assertEqual(self.post({'items': [{'peca_id': 'abc', 'quantidade': 1}]}, chave=url,
+                                           url=url)['Idempotent-Replayed'], 'true')
+
+    def test_apenas_falhas_transitorias_sao_retryable(self):
+        for erro in (CircuitOpenError('POST /create-order/', 5), requests.ConnectionError('reset'),
+                     httpx.ReadTimeout('timeout'), OperationalError('database is locked')):
+            with self.subTest(erro=erro):
+                self.assertTrue(resposta_erro(erro)['retryable'])
+        resposta_http = requests.Response()
+        resposta_http.status_code = 500
+        self.assertTrue(resposta_erro(requests.HTTPError(response=resposta_http))['retryable'])
+        resposta_http.status_code = 404
+        self.assertNotIn('retryable', resposta_erro(requests.HTTPError(response=resposta_http)))
+        for erro in (ValueError('abc'), KeyError('items'), TypeError('x')):
+            with self.subTest(erro=erro):
+                self.assertNotIn('retryable', resposta_erro(erro))
+
+    def test_erro_de_validacao_tambem_e_guardado(self):
+        self.assertEqual(self.post({'items': []}).status_code, 400)
+        self.assertEqual(self.post({'items': []})['Idempotent-Replayed'], 'true')
+
+    def test_gateway_async(self):
+        original = self.post(self.body(), url='/api/async/orders/')
+        self.assertEqual(original.status_code, 201)
+        replay = self.post(self.body(), url='/api/async/orders/')
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), original.json())
+        self.assertEqual(self.post(self.body(2), url='/api/async/orders/').status_code, 422)
+        body = {'orders': [self.body()]}
+        self.post(body, chave='lote', url='/api/async/orders/batch/')
+        self.assertEqual(self.post(body, chave='lote', url='/api/async/orders/batch/')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0.1)
+    def test_gateway_async_duplicata_concorrente(self):
+        ChaveIdempotencia.objects.create(
+            endpoint='orders', chave='pedido-1',
+            hash_requisicao=hashlib.sha256(json.dumps(self.body()).encode()).hexdigest()
+        )
+        self.assertEqual(self.post(self.body(), url='/api/async/orders/').status_code, 409)
+        self.assertEqual(Pedido.objects.count(), 0)
+
+    def test_lote(self):
+        body = {'orders': [self.body(), self.body(2)]}
+        self.assertEqual(self.post(body, url='/api/orders/batch/').status_code, 201)
+        self.assertEqual(self.post(body, url='/api/orders/batch/').status_code, 201)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+
+class OrderIdTests(TestCase):
+    """IDs de pedido UUIDv7 assinados e reserva em bloco"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.peca = Peca.objects.create(nome='Vela', valor=Decimal('15.00'))
+
+    def reservar(self, count=None):
+        body = {} if count is None else {'count': count}
+        return self.client.post('/api/generate-order-id/', body, content_type='application/json')
+
+    def items(self):
+        return [{'peca_id': self.peca.id, 'quantidade': 1}]
+
+    def test_ids_ordenados_versao_7(self):
+        ids = [gerar_id_pedido() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 5000)
+        self.assertTrue(all(id_pedido.version == 7 for id_pedido in ids))
+        # Pedido criado sem id reservado também recebe um UUIDv7
+        self.assertEqual(Pedido.objects.create(valor_total=0).id_unico.version, 7)
+
+    def test_reserva_em_bloco(self):
+        response = self.reservar(50)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(len(data['order_ids']), 50)
+        self.assertEqual(data['order_id'], data['order_ids'][0])
+        self.assertEqual(len(self.reservar().json()['data']['order_ids']), 1)
+        for count in (0, -1, 'x', 1001):
+            with self.subTest(count=count):
+                self.assertEqual(self.reservar(count).status_code, 400)
+
+    def test_pedido_com_id_reservado(self):
+        id_unico = self.reservar().json()['data']['order_id']
+        result = microservice_b.create_order({'items': self.items(), 'id_unico': id_unico})
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['data']['pedido_id'], id_unico)
+
+        repetido = microservice_b.create_order({'items': self.items(), 'id_unico': id_unico})
+        self.assertEqual(repetido['status'], 'error')
+        self.assertEqual(repetido['duplicate_ids'], [id_unico])
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_id_nao_emitido_pelo_gateway(self):
+        forjado = gerar_id_pedido().int ^ 1
+        for id_unico in (str(uuid.uuid4()), str(uuid.UUID(int=forjado)), 'abc'):
+            with self.subTest(id_unico=id_unico):
+                result = microservice_b.create_order({'items': self.items(), 'id_unico': id_unico})
+                self.assertEqual(result['status'], 'error')
+        self.assertFalse(Pedido.objects.exists())
+
+    @override_settings(ORDER_ID_RESERVATION_TTL=0)
+    def test_reserva_expirada(self):
+        id_unico = str(gerar_id_pedido())
+        time.sleep(0.01)
+        result = microservice_b.create_order({'items': self.items(), 'id_unico': id_unico})
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('expirou', result['message'])
+
+    def test_lote_com_ids_reservados(self):
+        ids = self.reservar(2).json()['data']['order_ids']
+        Pedido.objects.create(valor_total=0, id_unico=ids[1])
+        result = microservice_b.create_orders_bulk([
+            {'items': self.items(), 'id_unico': ids[0]},
+            {'items': self.items(), 'id_unico': ids[0]},
+            {'items': self.items(), 'id_unico': ids[1]},
+            {'items': self.items()},
+        ])
+        statuses = [r['status'] for r in result['data']['results']]
+        self.assertEqual(statuses, ['success', 'error', 'error', 'success'])
+        self.assertEqual(result['data']['results'][0]['pedido_id'], ids[0])
+        self.assertEqual(result['data']['results'][2]['duplicate_ids'], [ids[1]])
+
+    def test_lote_com_id_gravado_durante_o_lote(self):
+        ids = self.reservar(2).json()['data']['order_ids']
+        in_bulk = Peca.objects.in_bulk
+
+        def concorrente(*args, **kwargs):
+            # Outra requisição grava ids[1] depois da checagem de ids em uso
+            Pedido.objects.create(valor_total=0, id_unico=ids[1])
+            return in_bulk(*args, **kwargs)
+
+        with mock.patch.object(Peca.objects, 'in_bulk', side_effect=concorrente):
+            result = microservice_b.create_orders_bulk([
+                {'items': self.items(), 'id_unico': ids[0]},
+                {'items': self.items(), 'id_unico': ids[1]},
+                {'items': self.items()},
+            ])
+        statuses = [r['status'] for r in result['data']['results']]
+        self.assertEqual(statuses, ['success', 'error', 'success'])
+        self.assertEqual(result['data']['results'][1]['duplicate_ids'], [ids[1]])
+        self.assertEqual(Pedido.objects.count(), 3)
+        self.assertEqual(ItemPedido.objects.count(), 2)
+
+
+class PedidoRelatorioQueryTests(TestCase):
+    """Relatório e serializer de pedido com número fixo de consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        car = Car.objects.create(modelo='Gol', ano=2018)
+        pecas = Peca.objects.bulk_create([
+            Peca(nome=f'Peça {i}', valor=Decimal('5.00'), owner=car) for i in range(100)
+        ])
+        cls.pedidos = {}
+        for n in (1, 10, 100):
+            pedido = Pedido.objects.create(valor_total=Decimal('10.00') * n)
+            ItemPedido.objects.bulk_create([
+                ItemPedido(pedido=pedido, peca=peca, quantidade=2) for peca in pecas[:n]
+            ])
+            cls.pedidos[n] = pedido.id_unico
+
+    def test_relatorio(self):
+        for n, id_unico in self.pedidos.items():
+            # Pedido + itens (JOIN com peça e carro)
+            with self.subTest(itens=n), self.assertNumQueries(2):
+                relatorio = Pedido.objects.com_itens().get(id_unico=id_unico).gerar_relatorio()
+            self.assertEqual(len(relatorio['itens']), n)
+
+    def test_relatorio_sem_prefetch(self):
+        for n, id_unico in self.pedidos.items():
+            pedido = Pedido.objects.get(id_unico=id_unico)
+            with self.subTest(itens=n), self.assertNumQueries(1):
+                pedido.gerar_relatorio()
+
+    def test_serializer(self):
+        for n, id_unico in self.pedidos.items():
+            pedido = Pedido.objects.get(id_unico=id_unico)
+            with self.subTest(itens=n), self.assertNumQueries(1):
+                data = PedidoSerializer(pedido).data
+            self.assertEqual(len(data['itens']), n)
+            self.assertEqual(len(data['relatorio']['itens']), n)
+            self.assertEqual(data['itens'][0]['peca_details']['owner_details']['modelo'], 'Gol')
+
+    def test_serializer_lista(self):
+        with self.assertNumQueries(2):
+            data = PedidoSerializer(Pedido.objects.com_itens(), many=True).data
+        self.assertEqual(sorted(len(pedido['itens']) for pedido in data), [1, 10, 100])
+
+    def test_relatorio_sem_join_com_carro(self):
+        with CaptureQueriesContext(connection) as queries:
+            relatorio = Pedido.objects.com_itens_relatorio().get(id_unico=self.pedidos[10]).gerar_relatorio()
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('car_car', queries[1]['sql'])
+        self.assertEqual(relatorio['itens'][0]['subtotal'], 10.0)
+
+
+class ItemPedidoValoresTests(TestCase):
+    """Preço e subtotal gravados no item no momento do pedido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.peca = Peca.objects.create(nome='Pneu', valor=Decimal('100.00'))
+
+    def test_mudanca_de_preco_nao_altera_pedido(self):
+        result = microservice_b.create_order({'items': [{'peca_id': self.peca.id, 'quantidade': 3}]})
+        self.assertEqual(result['data']['valor_total'], 300.0)
+
+        Peca.objects.filter(pk=self.peca.pk).update(valor=Decimal('150.00'))
+        pedido = Pedido.objects.get(id_unico=result['data']['pedido_id'])
+        relatorio = pedido.gerar_relatorio()
+        self.assertEqual(relatorio['itens'][0]['valor_unitario'], 100.0)
+        self.assertEqual(relatorio['itens'][0]['subtotal'], 300.0)
+        self.assertEqual(pedido.calcular_total(), Decimal('300.00'))
+
+    def test_save_e_bulk_create_preenchem_valores(self):
+        pedido = Pedido.objects.create()
+        item = ItemPedido.objects.create(pedido=pedido, peca=self.peca, quantidade=2)
+        self.assertEqual(item.subtotal, Decimal('200.00'))
+
+        item.quantidade = 5
+        item.save(update_fields=['quantidade'])
+        item.refresh_from_db()
+        self.assertEqual((item.valor_unitario, item.subtotal), (Decimal('100.00'), Decimal('500.00')))
+
+        # Itens só com peca_id: uma consulta para as peças, independente do número de itens
+        with self.assertNumQueries(2):
+            itens = ItemPedido.objects.bulk_create([
+                ItemPedido(pedido=pedido, peca_id=self.peca.id, quantidade=i) for i in range(1, 6)
+            ])
+        self.assertEqual([item.subtotal for item in itens], [Decimal('100.00') * i for i in range(1, 6)])
+
+
+class OrderListTests(TestCase):
+    """GET /api/orders/: contagens anotadas, keyset por data e filtros"""
+
+    URL = '/api/orders/'
+
+    @classmethod
+    def setUpTestData(cls):
+        peca = Peca.objects.create(nome='Amortecedor', valor=Decimal('10.00'))
+        cls.pedidos = Pedido.objects.bulk_create([
+            Pedido(valor_total=Decimal(i * 10)) for i in range(30)
+        ])
+        # Dois pedidos por dia a partir de 01/01/2025: datas repetidas testam o desempate por id
+        inicio = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        for i, pedido in enumerate(cls.pedidos):
+            pedido.data_pedido = inicio + timedelta(days=i // 2)
+        Pedido.objects.bulk_update(cls.pedidos, ['data_pedido'])
+        ItemPedido.objects.bulk_create([
+            ItemPedido(pedido=pedido, peca=peca, quantidade=q)
+            for i, pedido in enumerate(cls.pedidos) for q in range(1, i % 4 + 1)
+        ])
+
+    def listar(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_paginas_percorrem_todos_os_pedidos(self):
+        vistos, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                data = self.listar(limit=7, **({'cursor': cursor} if cursor else {}))
+            vistos += [pedido['id'] for pedido in data['data']]
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                break
+        esperado = sorted(self.pedidos, key=lambda pedido: (pedido.data_pedido, pedido.id), reverse=True)
+        self.assertEqual(vistos, [pedido.id for pedido in esperado])
+
+    def test_contagens_anotadas(self):
+        for limit in (1, 10, 30):
+            with self.subTest(limit=limit), self.assertNumQueries(1):
+                data = self.listar(limit=limit)
+            self.assertEqual(data['count'], limit)
+        por_id = {pedido['id']: pedido for pedido in data['data']}
+        for i, pedido in enumerate(self.pedidos):
+            self.assertEqual(por_id[pedido.id]['total_itens'], i % 4)
+            self.assertEqual(por_id[pedido.id]['quantidade_total'], sum(range(1, i % 4 + 1)))
+
+    def test_filtros(self):
+        data = self.listar(data_inicio='2025-01-03', data_fim='2025-01-04')
+        self.assertEqual(data['count'], 4)
+        data = self.listar(data_fim='2025-01-01T12:00:00Z')
+        self.assertEqual(data['count'], 2)
+        data = self.listar(min_valor='100', max_valor='150')
+        self.assertEqual(sorted(float(pedido['valor_total']) for pedido in data['data']), [100, 110, 120, 130, 140, 150])
+
+    def test_parametros_invalidos(self):
+        for params in ({'data_inicio': '2025-13-01'}, {'min_valor': 'x'}, {'min_valor': 'NaN'}, {'max_valor': 'Infinity'},
+                       {'cursor': 'abc'}, {'limit': '0'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.URL, params).status_code, 400)
+
+    def test_plano_usa_indice(self):
+        data = self.listar(limit=5)
+        queryset = date_keyset_queryset(
+            microservice_b._filtrar_pedidos({'data_inicio': '2025-01-01'}).com_totais_itens(),
+            'data_pedido', data['next_cursor'], 5
+        )
+        plano = queryset.explain()
+        self.assertIn('car_pedido_data_id_idx', plano)
+        self.assertNotIn('USE TEMP B-TREE', plano)
+
+    def test_post_na_mesma_rota(self):
+        peca = Peca.objects.first()
+        response = self.client.post(
+            self.URL, {'items': [{'peca_id': peca.id, 'quantidade': 1}]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.put(self.URL).status_code, 405)
+
+    def test_endpoint_async(self):
+        response = self.client.get('/api/async/orders/', {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']), 3)
+
+
+class RecalcularTotaisTests(TestCase):
+    """Total do pedido somado no banco: calcular_total e recalculate_totals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        peca = Peca.objects.create(nome='Farol', valor=Decimal('40.00'))
+        cls.pedidos = Pedido.objects.bulk_create([Pedido(valor_total=Decimal('1.00')) for _ in range(25)])
+        ItemPedido.objects.bulk_create([
+            ItemPedido(pedido=pedido, peca=peca, quantidade=q)
+            for pedido in cls.pedidos[:20] for q in (1, 2)
+        ])
+
+    def test_calcular_total_agrega_e_grava_so_o_total(self):
+        pedido = self.pedidos[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(pedido.calcular_total(), Decimal('120.00'))
+        self.assertEqual(len(queries), 2)
+        self.assertIn('SUM', queries[0]['sql'])
+        self.assertIn('SET "valor_total"', queries[1]['sql'])
+        self.assertNotIn('data_pedido', queries[1]['sql'])
+        self.assertEqual(self.pedidos[24].calcular_total(), Decimal('0.00'))
+
+    def test_comando_em_blocos(self):
+        saida = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('recalculate_totals', chunk_size=10, stdout=saida)
+        # 3 UPDATEs (um por bloco de 10 ids) além de MIN/MAX e COUNT
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in queries), 3)
+        self.assertIn('25 pedidos recalculados', saida.getvalue())
+        totais = Pedido.objects.values_list('valor_total', flat=True)
+        self.assertEqual(sorted(set(totais)), [Decimal('0.00'), Decimal('120.00')])
+
+
+class PopulateScaleTests(TransactionTestCase):
+    """populate_db --scale: dados sintéticos determinísticos, em um processo ou em shards"""
+
+    def gerar(self, **opcoes):
+        saida = io.StringIO()
+        call_command(
+            'populate_db', scale=True, cars=5, parts=300, orders=200, chunk_size=64,
+            end_date=date(2025, 6, 30), stdout=saida, **opcoes
+        )
+        return saida.getvalue(), (
+            list(Peca.objects.order_by('id').values_list('id', 'nome', 'valor', 'owner_id')),
+            list(Pedido.objects.order_by('id').values_list('id', 'id_unico', 'valor_total', 'data_pedido')),
+            # ids dos itens seguem o AUTOINCREMENT; a ordem deles é que precisa bater
+            list(ItemPedido.objects.order_by('id').values_list('pedido_id', 'peca_id', 'quantidade', 'subtotal')),
+        )
+
+    def test_gera_pedidos_consistentes(self):
+        saida, (pecas, pedidos, itens) = self.gerar(days=30)
+        self.assertIn('linhas/s', saida)
+        # Cache locmem nos testes: o comando avisa que a invalidação não sai do processo
+        self.assertIn('reinicie o gateway', saida)
+        self.assertEqual((len(pecas), len(pedidos), Car.objects.count()), (300, 200, 5))
+        self.assertTrue(200 <= len(itens) <= 1000)
+        # valor_total já sai igual à soma dos itens
+        self.assertEqual(Pedido.objects.recalcular_totais(), 200)
+        self.assertEqual(list(Pedido.objects.order_by('id').values_list('valor_total', flat=True)),
+                         [total for _, _, total, _ in pedidos])
+        datas = [data for _, _, _, data in pedidos]
+        self.assertEqual(datas, sorted(datas))
+        self.assertGreaterEqual(datas[0], datetime(2025, 6, 1, tzinfo=dt_timezone.utc))
+        self.assertLess(datas[-1], datetime(2025, 7, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(Peca.objects.filter(nome_normalizado='').count(), 0)
+
+    def test_shards_geram_os_mesmos_dados(self):
+        _, local = self.gerar()
+        ItemPedido.objects.all().delete()
+        Pedido.objects.all().delete()
+        Peca.objects.all().delete()
+        Car.objects.all().delete()
+        saida, shards = self.gerar(workers=2)
+        self.assertIn('shard 1', saida)
+        self.assertEqual(shards, local)
+
+
+class BenchmarkApiTests(SimpleTestCase):
+    """Estatísticas e comparação do benchmark_api (sem subir servidor)"""
+
+    def resultado(self, p95, queries_max):
+        return {'endpoints': {'create_order': {'p95_ms': p95, 'queries_mean': 4.0, 'queries_max': queries_max}}}
+
+    def test_resumo_por_endpoint(self):
+        amostras = [
+            {'ms': float(ms), 'erro': ms == 100, 'queries': 4, 'db_ms': 1.5} for ms in range(1, 101)
+        ]
+        resumo = resumir(amostras, duracao=2.0)
+        self.assertEqual((resumo['requests'], resumo['errors'], resumo['rps']), (100, 1, 50.0))
+        self.assertEqual((resumo['p50_ms'], resumo['p95_ms'], resumo['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual((resumo['queries_mean'], resumo['queries_max'], resumo['db_ms_mean']), (4.0, 4, 1.5))
+
+    def test_mix_invalido(self):
+        self.assertEqual(parse_mix('cars_list=3, create_order=1'), {'cars_list': 3, 'create_order': 1})
+        with self.assertRaises(CommandError):
+            parse_mix('checkout=1')
+        with self.assertRaises(CommandError):
+            parse_mix('cars_list=0')
+        with self.assertRaises(CommandError):
+            parse_mix('cars_list=5,create_order=-1')
+
+    def test_regressao_de_latencia_e_de_consultas(self):
+        _, regressoes = comparar(self.resultado(10.0, 4), self.resultado(11.0, 4), limite_pct=20)
+        self.assertEqual(regressoes, [])
+        _, regressoes = comparar(self.resultado(10.0, 4), self.resultado(13.0, 4), limite_pct=20)
+        self.assertEqual(regressoes, ['create_order'])
+        linhas, regressoes = comparar(self.resultado(10.0, 4), self.resultado(9.0, 12), limite_pct=20)
+        self.assertEqual(regressoes, ['create_order'])
+        self.assertEqual(linhas[0][4], 8)
+
+
+class CatalogCacheTests(TestCase):
+    """Cache read-through do catálogo no Microsserviço A"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(modelo='Onix', ano=2021)
+        Peca.objects.create(nome='Filtro de Ar', valor=Decimal('30.00'), owner=cls.car)
+
+    def setUp(self):
+        microservice_a.cache.clear()
+
+    def test_segunda_leitura_nao_consulta_o_banco(self):
+        with self.assertNumQueries(1):
+            primeira = microservice_a.get_cars()
+        with self.assertNumQueries(0):
+            segunda = microservice_a.get_cars()
+        self.assertEqual(primeira, segunda)
+        stats = microservice_a.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_filtros_equivalentes_compartilham_entrada(self):
+        microservice_a.get_parts({'nome': 'Filtro', 'car_id': None})
+        with self.assertNumQueries(0):
+            result = microservice_a.get_parts({'car_id': '', 'nome': ' Filtro '})
+        self.assertEqual(result['count'], 1)
+
+    def test_escrita_invalida_o_cache(self):
+        self.assertEqual(microservice_a.get_car_parts(self.car.id)['count'], 1)
+        Peca.objects.create(nome='Vela de Ignição', valor=Decimal('20.00'), owner=self.car)
+        self.assertEqual(microservice_a.get_car_parts(self.car.id)['count'], 2)
+
+        self.car.modelo = 'Onix Plus'
+        self.car.save()
+        self.assertEqual(microservice_a.get_car_by_id(self.car.id)['data']['modelo'], 'Onix Plus')
+
+        Peca.objects.filter(owner=self.car).first().delete()
+        self.assertEqual(microservice_a.get_car_parts(self.car.id)['count'], 1)
+
+    def test_erros_nao_sao_cacheados(self):
+        microservice_a.get_car_by_id(999999)
+        with self.assertNumQueries(1):
+            result = microservice_a.get_car_by_id(999999)
+        self.assertEqual(result['status'], 'error')
+
+
+class CatalogSnapshotTests(TestCase):
+    """Snapshot pré-renderizado com ETag/304 nas views do catálogo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(modelo='Polo', ano=2019)
+        cls.peca = Peca.objects.create(nome='Bateria', valor=Decimal('300.00'), owner=cls.car)
+
+    def setUp(self):
+        microservice_a.cache.clear()
+
+    def test_if_none_match_responde_304_sem_consultas(self):
+        for url in ('/api/cars/', f'/api/cars/{self.car.id}/pecas/', '/api/pecas/?nome=Bat',
+                    f'/api/pecas/{self.peca.id}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_snapshot_reaproveita_bytes(self):
+        primeira = self.client.get('/api/cars/')
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/api/cars/')
+        self.assertEqual(primeira.content, segunda.content)
+        self.assertEqual(segunda['Content-Type'], 'application/json')
+
+    def test_escrita_muda_o_etag(self):
+        etag = self.client.get('/api/cars/')['ETag']
+        Car.objects.create(modelo='Uno', ano=2016)
+        response = self.client.get('/api/cars/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_erro_nao_gera_snapshot(self):
+        response = self.client.get('/api/cars/999999/pecas/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CatalogPaginationTests(TestCase):
+    """Paginação por cursor e streaming NDJSON do catálogo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(modelo='Fiesta', ano=2017)
+        Peca.objects.bulk_create([
+            Peca(nome=f'Peça {i}', valor=Decimal('10.00') + i, owner=cls.car) for i in range(25)
+        ])
+
+    def setUp(self):
+        microservice_a.cache.clear()
+
+    def test_percorre_todas_as_paginas(self):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 10, 'car_id': self.car.id}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get('/api/pecas/', params).json()
+            ids += [peca['id'] for peca in body['data']]
+            cursor = body['next_cursor']
+            self.assertEqual(body['has_more'], cursor is not None)
+            if not cursor:
+                break
+        self.assertEqual(ids, sorted(Peca.objects.values_list('id', flat=True)))
+
+    def test_consultas_constantes_por_pagina(self):
+        # Uma consulta com JOIN no carro, sem N+1 em owner_details
+        with self.assertNumQueries(1):
+            body = microservice_a.get_parts(limit=20)
+        self.assertEqual(body['count'], 20)
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/cars/', {'cursor': '!!'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/pecas/', {'limit': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_ndjson(self):
+        response = self.client.get('/api/pecas/', {'stream': 'ndjson', 'min_valor': 30})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        linhas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(linhas), 5)
+        self.assertEqual(json.loads(linhas[0])['owner_details']['modelo'], 'Fiesta')
+
+
+class PecaQueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN de todas as combinações de filtros do gateway.
+    Falha se alguma tabela ou índice for percorrido por inteiro (SCAN, inclusive
+    USING COVERING INDEX). A única varredura aceita é a primeira página keyset
+    sem filtros: ela percorre car_peca na ordem da chave primária e para no LIMIT
+    (sem 'USE TEMP B-TREE FOR ORDER BY').
+    """
+
+    FILTROS = {'nome': 'óleo', 'car_id': '1', 'min_valor': '10', 'max_valor': '100'}
+    # SCAN t, SCAN t USING INDEX i e SCAN t USING COVERING INDEX i; não pega
+    # "SCAN t VIRTUAL TABLE INDEX", o MATCH servido pelo índice FTS5
+    VARREDURA = re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$', re.MULTILINE)
+
+    def plano(self, queryset):
+        return queryset.explain()
+
+    def assertSemVarreduraCompleta(self, queryset, primeira_pagina=False):
+        plano = self.plano(queryset)
+        varreduras = self.VARREDURA.findall(plano)
+        if primeira_pagina and 'USE TEMP B-TREE FOR ORDER BY' not in plano:
+            varreduras.remove('car_peca')
+        self.assertEqual(varreduras, [], plano)
+
+    def test_combinacoes_de_filtros(self):
+        for n in range(len(self.FILTROS) + 1):
+            for chaves in itertools.combinations(self.FILTROS, n):
+                filtros = {chave: self.FILTROS[chave] for chave in chaves}
+                for cursor in (None, encode_cursor(5)):
+                    queryset = keyset_queryset(microservice_a._filtrar_pecas(filtros), cursor, 100)
+                    with self.subTest(filtros=filtros, cursor=cursor):
+                        self.assertSemVarreduraCompleta(queryset, primeira_pagina=not filtros and cursor is None)
+
+    def test_varredura_de_indice_e_detectada(self):
+        # Termo curto demais para o trigram: LIKE '%x%' percorre o índice inteiro
+        plano = self.plano(keyset_queryset(microservice_a._filtrar_pecas({'nome': 'ol'})))
+        self.assertIn('car_peca_nome_norm_idx', self.VARREDURA.search(plano).group(0))
+
+    def test_filtros_seletivos_usam_indice(self):
+        pagina = (None, encode_cursor(5))
+        casos = [
+            ('car_peca_trgm', {'nome': 'filtro'}, pagina),
+            # Com cursor o SQLite prefere owner_id + rowid>? (também SEARCH)
+            ('car_peca_owner_valor_idx', {'car_id': '1', 'min_valor': '10', 'max_valor': '100'}, (None,)),
+            ('car_peca_valor_idx', {'min_valor': '10', 'max_valor': '100'}, pagina),
+            ('car_peca_valor_idx', {'min_valor': '10'}, pagina),
+            ('car_peca_valor_idx', {'max_valor': '100'}, pagina),
+        ]
+        for indice, filtros, cursores in casos:
+            for cursor in cursores:
+                with self.subTest(filtros=filtros, cursor=cursor):
+                    plano = self.plano(keyset_queryset(microservice_a._filtrar_pecas(filtros), cursor))
+                    self.assertIn(indice, plano)
+
+    def test_pecas_do_carro(self):
+        car = Car.objects.create(modelo='Civic', ano=2020)
+        self.assertSemVarreduraCompleta(car.pecas.select_related('owner'))
+
+    def test_busca_por_nome_ignora_caixa_e_acento(self):
+        Peca.objects.create(nome='Óleo Motor 5W30', valor=Decimal('50.00'))
+        Peca.objects.bulk_create([Peca(nome='Fluído de Freio', valor=Decimal('20.00'))])
+        self.assertEqual(normalizar_texto('Fluído de Freio'), 'fluido de freio')
+        for termo, esperado in (('oleo', 'Óleo Motor 5W30'), ('ÓLEO', 'Óleo Motor 5W30'),
+                                ('fluido', 'Fluído de Freio'), ('DE FRE', 'Fluído de Freio'),
+                                ('ol', 'Óleo Motor 5W30')):
+            with self.subTest(termo=termo):
+                nomes = [peca.nome for peca in microservice_a._filtrar_pecas({'nome': termo})]
+                self.assertEqual(nomes, [esperado])
+
+
+class SearchPecasTests(TestCase):
+    """Busca FTS5 de peças (/api/search/pecas/)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.civic = Car.objects.create(modelo='Civic', ano=2020)
+        cls.gol = Car.objects.create(modelo='Gol', ano=2018)
+        cls.oleo = Peca.objects.create(nome='Óleo Motor 5W30', valor=Decimal('50.00'), owner=cls.civic)
+        cls.fluido = Peca.objects.create(nome='Fluído de Freio', valor=Decimal('20.00'), owner=cls.gol)
+        Peca.objects.bulk_create([
+            Peca(nome='Pastilha de Freio Dianteira', valor=Decimal('90.00'), owner=cls.gol),
+            Peca(nome='Filtro de Óleo', valor=Decimal('25.00'), owner=cls.civic),
+        ])
+
+    def setUp(self):
+        microservice_a.cache.clear()
+
+    def buscar(self, q):
+        return [peca['nome'] for peca in microservice_a.search_parts(q)['data']]
+
+    def test_prefixo_sem_acento(self):
+        self.assertEqual(set(self.buscar('oleo')), {'Óleo Motor 5W30', 'Filtro de Óleo'})
+        self.assertEqual(self.buscar('FLUIDO'), ['Fluído de Freio'])
+        self.assertEqual(set(self.buscar('fre')), {'Fluído de Freio', 'Pastilha de Freio Dianteira'})
+        self.assertEqual(self.buscar('pastilha fre'), ['Pastilha de Freio Dianteira'])
+
+    def test_busca_pelo_modelo_do_carro(self):
+        self.assertEqual(set(self.buscar('civic')), {'Óleo Motor 5W30', 'Filtro de Óleo'})
+
+    def test_nome_pesa_mais_que_modelo(self):
+        peca = Peca.objects.create(nome='Gol Emblema', valor=Decimal('10.00'), owner=self.civic)
+        self.assertEqual(self.buscar('gol')[0], peca.nome)
+
+    def test_indice_sincronizado(self):
+        self.oleo.nome = 'Aditivo Radiador'
+        self.oleo.save()
+        self.assertEqual(self.buscar('oleo'), ['Filtro de Óleo'])
+        self.assertEqual(self.buscar('aditivo'), ['Aditivo Radiador'])
+
+        self.gol.modelo = 'Voyage'
+        self.gol.save()
+        self.assertIn('Fluído de Freio', self.buscar('voyage'))
+
+        self.fluido.delete()
+        self.assertNotIn('Fluído de Freio', self.buscar('voyage'))
+
+    def test_view(self):
+        response = self.client.get('/api/search/pecas/', {'q': 'óleo', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(self.client.get('/api/search/pecas/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/pecas/', {'q': '"*'}).json()['count'], 0)
+
+
+class AsyncGatewayTests(TestCase):
+    """Variante async do gateway (/api/async/) no modo internal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(modelo='HB20', ano=2020)
+        cls.peca = Peca.objects.create(nome='Radiador', valor=Decimal('400.00'), owner=cls.car)
+
+    def setUp(self):
+        microservice_a.cache.clear()
+
+    def test_mesmo_contrato_que_o_gateway_sincrono(self):
+        for path in ('cars/', f'cars/{self.car.id}/pecas/', 'pecas/?nome=radi', f'pecas/{self.peca.id}/'):
+            with self.subTest(path=path):
+                sync = self.client.get(f'/api/{path}')
+                async_ = self.client.get(f'/api/async/{path}')
+                self.assertEqual(async_.status_code, sync.status_code)
+                self.assertEqual(async_.json(), sync.json())
+
+    def test_calculo_e_pedido(self):
+        items = {'items': [{'peca_id': self.peca.id, 'quantidade': 1}]}
+        response = self.client.post('/api/async/calculate-price/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['frete'], 0.0)
+
+        response = self.client.post('/api/async/orders/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        pedido_id = response.json()['data']['pedido_id']
+        response = self.client.get(f'/api/async/orders/{pedido_id}/report/')
+        self.assertEqual(response.json()['data']['valor_total'], 400.0)
+
+    def test_erros(self):
+        self.assertEqual(self.client.get('/api/async/cars/999999/').status_code, 404)
+        self.assertEqual(self.client.post('/api/async/cars/').status_code, 405)
+        response = self.client.post('/api/async/orders/', 'x', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_health(self):
+        response = self.client.get('/api/async/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['microservices'], {'service_a': 'online', 'service_b': 'online'})
+
+
+class InstrumentationTests(TestCase):
+    """Server-Timing, log por requisição e dump de requisições lentas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.peca = Peca.objects.create(nome='Radiador', valor=Decimal('80.00'))
+
+    def metricas(self, response):
+        return {
+            metrica.split(';')[0]: metrica for metrica in response['Server-Timing'].split(', ')
+        }
+
+    def test_server_timing(self):
+        response = self.client.post(
+            '/api/orders/', {'items': [{'peca_id': self.peca.id, 'quantidade': 2}]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        metricas = self.metricas(response)
+        self.assertIn('desc="5 queries"', metricas['db'])
+        self.assertIn('service_b.create_order', metricas)
+        self.assertNotIn('service_b.validate_order_data', metricas)
+        self.assertEqual(set(metricas) - {'db', 'service_b.create_order'}, {'render', 'total'})
+
+    def test_fan_out_e_view_async(self):
+        health_checker.reset()
+        metricas = self.metricas(self.client.get('/api/health/'))
+        self.assertIn('service_a.ping', metricas)
+        self.assertIn('service_b.ping', metricas)
+        metricas = self.metricas(self.client.get('/api/async/orders/'))
+        self.assertIn('service_b.list_orders', metricas)
+        self.assertIn('desc="1 queries"', metricas['db'])
+
+    def test_log_estruturado(self):
+        with self.assertLogs('carbuild.requests', 'INFO') as logs:
+            self.client.get('/api/orders/', {'limit': 5})
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual((registro['method'], registro['path'], registro['status']), ('GET', '/api/orders/', 200))
+        self.assertEqual(registro['db_queries'], 1)
+        self.assertEqual(registro['calls']['service_b.list_orders']['count'], 1)
+        self.assertNotIn('sql', registro)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_dump_de_requisicao_lenta(self):
+        with self.assertLogs('carbuild.requests', 'WARNING') as logs:
+            self.client.get('/api/orders/')
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertTrue(registro['slow'])
+        self.assertIn('car_pedido', registro['sql'][0]['sql'])
+
+
+class MetricsTests(TestCase):
+    """Registro de métricas e exposição em GET /api/metrics/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.peca = Peca.objects.create(nome='Radiador', valor=Decimal('80.00'))
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_histograma_acumula_buckets(self):
+        local = MetricsRegistry()
+        hist = local.histogram('teste_seconds', 'Teste', ('rota',), buckets=(0.1, 1))
+        for valor in (0.05, 0.1, 0.5, 3):
+            hist.observe(valor, rota='a"b')
+        texto = local.render()
+        self.assertIn('# TYPE teste_seconds histogram', texto)
+        self.assertIn('teste_seconds_bucket{rota="a\\"b",le="0.1"} 2', texto)
+        self.assertIn('teste_seconds_bucket{rota="a\\"b",le="1.0"} 3', texto)
+        self.assertIn('teste_seconds_bucket{rota="a\\"b",le="+Inf"} 4', texto)
+        self.assertIn('teste_seconds_count{rota="a\\"b"} 4', texto)
+        with self.assertRaises(ValueError):
+            hist.observe(1)
+
+    def test_requisicoes_e_pedidos(self):
+        self.client.post(
+            '/api/calculate-price/', {'items': [{'peca_id': self.peca.id, 'quantidade': 1}] * 3},
+            content_type='application/json'
+        )
+        self.client.post(
+            '/api/orders/', {'items': [{'peca_id': self.peca.id, 'quantidade': 2}]},
+            content_type='application/json'
+        )
+        self.client.post(
+            '/api/orders/batch/',
+            {'orders': [{'items': [{'peca_id': self.peca.id, 'quantidade': 1}]}] * 2
+                       + [{'items': [{'peca_id': 999999, 'quantidade': 1}]}]},
+            content_type='application/json'
+        )
+        self.assertEqual(PEDIDOS_CRIADOS.valor(), 3)
+        self.assertEqual(TAMANHO_CARRINHO.valor(), (1, 3))
+        self.assertEqual(REQUISICOES_HTTP.valor(view='orders', method='POST', status=201), 1)
+        self.assertEqual(REQUISICOES_HTTP.valor(view='create_orders_batch', method='POST', status=207), 1)
+        self.assertEqual(DURACAO_REQUISICAO.valor(view='calculate_price')[0], 1)
+        self.assertEqual(CHAMADAS_CLIENTE.valor(service='service_b', method='create_order', status='success'), 1)
+        self.assertEqual(DURACAO_CHAMADA_CLIENTE.valor(service='service_b', method='create_order')[0], 1)
+
+    def test_status_de_erro_do_cliente(self):
+        self.client.get('/api/orders/00000000-0000-0000-0000-000000000000/report/')
+        self.client.get('/api/async/orders/00000000-0000-0000-0000-000000000000/report/')
+        # A view async delega ao cliente síncrono no modo internal: uma chamada só por requisição
+        self.assertEqual(CHAMADAS_CLIENTE.valor(service='service_b', method='get_order_report', status='error'), 2)
+
+    def test_endpoint_prometheus(self):
+        self.client.get('/api/orders/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        texto = response.content.decode()
+        self.assertIn('carbuild_http_requests_total{view="orders",method="GET",status="200"} 1', texto)
+        self.assertIn('carbuild_client_calls_total{service="service_b",method="list_orders",status="success"} 1', texto)
+        self.assertIn('carbuild_orders_created_total 0', texto)
+        self.assertIn('carbuild_http_requests_in_progress 1', texto)
+        self.assertEqual(self.client.post('/api/metrics/').status_code, 405)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    """PRAGMAs de SQLITE_PRAGMAS aplicados em cada conexão nova (car/db.py)"""
+
+    def conectar(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': os.path.join(diretorio.name, 'pragmas.sqlite3')},
+            alias='pragmas'
+        )
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_perfil_de_producao(self):
+        pragmas = pragmas_atuais(self.conectar())
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        self.assertEqual(pragmas['synchronous'], 1)  # NORMAL
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['cache_size'], -20000)
+        self.assertEqual(pragmas['temp_store'], 2)  # MEMORY
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'wal; DROP TABLE car_peca'})
+    def test_valor_invalido(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.conectar()
+
+    def test_conexoes_persistentes(self):
+        self.assertGreater(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+
+@override_settings(DATABASE_REPLICA_ENABLED=True)
+class ReadReplicaRouterTests(SimpleTestCase):
+    """Leituras do catálogo na réplica, o resto no principal (car/routers.py)"""
+
+    def em_requisicao(self):
+        token = iniciar_requisicao()
+        self.addCleanup(encerrar_requisicao, token)
+
+    def test_catalogo_na_replica_durante_requisicao(self):
+        self.em_requisicao()
+        self.assertEqual(Car.objects.all().db, 'replica')
+        self.assertEqual(Peca.objects.all().db, 'replica')
+        self.assertEqual(Pedido.objects.all().db, 'default')
+
+    def test_fora_de_requisicao_usa_principal(self):
+        self.assertEqual(Peca.objects.all().db, 'default')
+
+    @override_settings(DATABASE_REPLICA_ENABLED=False)
+    def test_desligada(self):
+        self.em_requisicao()
+        self.assertEqual(Peca.objects.all().db, 'default')
+
+    def test_escrita_fixa_leituras_no_principal(self):
+        self.em_requisicao()
+        # Pedidos não mudam o catálogo: leituras seguem na réplica
+        ReadReplicaRouter().db_for_write(Pedido)
+        self.assertEqual(Peca.objects.all().db, 'replica')
+        ReadReplicaRouter().db_for_write(Peca)
+        self.assertEqual(Peca.objects.all().db, 'default')
+        with override_settings(DATABASE_REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(Peca.objects.all().db, 'replica')
+
+    def test_primario_e_transacao(self):
+        self.em_requisicao()
+        with primario():
+            self.assertEqual(Peca.objects.all().db, 'default')
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(Peca.objects.all().db, 'default')
+        self.assertEqual(Peca.objects.all().db, 'replica')
+
+    def test_middleware_abre_estado_por_requisicao(self):
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(Peca.objects.all().db))
+        response = middleware(RequestFactory().get('/api/pecas/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertEqual(Peca.objects.all().db, 'default')
+
+    def test_leitura_apos_escrita_entre_requisicoes(self):
+        def escrever(request):
+            ReadReplicaRouter().db_for_write(Peca)
+            return HttpResponse()
+
+        fabrica = RequestFactory()
+        escrita = ReplicaRoutingMiddleware(escrever)(fabrica.post('/admin/'))
+        cookie = escrita.cookies[COOKIE_ESCRITA]
+        self.assertEqual(cookie['max-age'], 5)
+
+        ler = ReplicaRoutingMiddleware(lambda request: HttpResponse(Peca.objects.all().db))
+        seguinte = fabrica.get('/api/pecas/')
+        seguinte.COOKIES[COOKIE_ESCRITA] = cookie.value
+        self.assertEqual(ler(seguinte).content, b'default')
+        self.assertNotIn(COOKIE_ESCRITA, ler(seguinte).cookies)
+        # Outro cliente, ou cookie adulterado, continua na réplica
+        self.assertEqual(ler(fabrica.get('/api/pecas/')).content, b'replica')
+        adulterado = fabrica.get('/api/pecas/')
+        adulterado.COOKIES[COOKIE_ESCRITA] = cookie.value.replace(':', 'x:', 1)
+        self.assertEqual(ler(adulterado).content, b'replica')
+
+    def test_cache_separado_por_snapshot(self):
+        cache = CatalogCache()
+        fora = cache.make_key('get_cars')
+        self.em_requisicao()
+        with mock.patch('car.replica.geracao_replica', return_value=1):
+            primeiro = cache.make_key('get_cars')
+        with mock.patch('car.replica.geracao_replica', return_value=2):
+            segundo = cache.make_key('get_cars')
+            with primario():
+                self.assertEqual(cache.make_key('get_cars'), fora)
+        self.assertNotIn(primeiro, (fora, segundo))
+
+    def test_cotacao_le_precos_do_principal(self):
+        self.em_requisicao()
+        bancos = []
+        with mock.patch.object(Peca.objects, 'in_bulk', side_effect=lambda ids: bancos.append(Peca.objects.all().db) or {}):
+            microservice_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])
+        self.assertEqual(bancos, ['default'])
+
+    def test_migracoes_so_no_principal(self):
+        router = ReadReplicaRouter()
+        self.assertIs(router.allow_migrate('replica', 'car'), False)
+        self.assertIsNone(router.allow_migrate('default', 'car'))
+
+
+class SnapshotReplicaTests(SimpleTestCase):
+    """Snapshot do principal na réplica com a API de backup do SQLite (car/replica.py)"""
+
+    def test_leitor_aberto_ve_snapshot_novo(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        origem = os.path.join(diretorio.name, 'principal.sqlite3')
+        destino = os.path.join(diretorio.name, 'replica.sqlite3')
+        with sqlite3.connect(origem) as db:
+            db.execute('PRAGMA journal_mode = wal')
+            db.execute('CREATE TABLE peca (id INTEGER PRIMARY KEY)')
+            db.execute('INSERT INTO peca VALUES (1)')
+        copiar_sqlite(origem, destino)
+
+        leitor = sqlite3.connect(destino)
+        self.addCleanup(leitor.close)
+        self.assertEqual(leitor.execute('SELECT count(*) FROM peca').fetchone()[0], 1)
+        with sqlite3.connect(origem) as db:
+            db.execute('INSERT INTO peca VALUES (2)')
+        copiar_sqlite(origem, destino)
+        self.assertEqual(leitor.execute('SELECT count(*) FROM peca').fetchone()[0], 2)
+
+    def test_recusa_mesmo_arquivo(self):
+        # Nos testes a réplica espelha o banco principal (TEST MIRROR)
+        with self.assertRaises(ImproperlyConfigured):
+            snapshot_replica()
+
+
+class HealthCheckTests(TestCase):
+    """GET /api/health/, /api/health/live/ e /api/health/ready/"""
+
+    def setUp(self):
+        health_checker.reset()
+        self.addCleanup(health_checker.reset)
+
+    def test_expoe_pools_http_e_circuitos(self):
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        for service in ('service_a', 'service_b'):
+            self.assertIn('circuits', response.json()['http'][service])
+
+    def test_probes_nao_consultam_o_catalogo(self):
+        # Probes rodam nas threads do HealthChecker; a requisição não faz nenhuma consulta
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/health/')
+        body = response.json()
+        self.assertEqual(body['microservices'], {'service_a': 'online', 'service_b': 'online'})
+        self.assertEqual(set(body['latency_ms']), {'service_a', 'service_b'})
+
+    def test_resultado_em_cache(self):
+        chamadas = []
+        checker = HealthChecker({'service_a': lambda: chamadas.append(1) or {'status': 'success'}})
+        self.assertFalse(checker.check()['cached'])
+        self.assertTrue(checker.check()['cached'])
+        self.assertEqual(len(chamadas), 1)
+        with self.settings(HEALTH_CHECK_CACHE_TTL=0):
+            self.assertFalse(checker.check()['cached'])
+        self.assertEqual(len(chamadas), 2)
+
+    def test_liveness_e_readiness(self):
+        self.assertEqual(self.client.get('/api/health/live/').status_code, 200)
+        self.assertEqual(self.client.get('/api/health/ready/').status_code, 200)
+
+        falha = {'status': 'error', 'message': 'fora do ar'}
+        with mock.patch.dict(health_checker.probes, {'service_b': lambda: falha}):
+            health_checker.reset()
+            response = self.client.get('/api/health/ready/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['dependencies']['service_b']['message'], 'fora do ar')
+            # Liveness não depende dos microsserviços
+            self.assertEqual(self.client.get('/api/health/live/').status_code, 200)
+
+
+class StubClientsMixin:
+    """Microsserviços falsos locais e clientes novos apontando para eles, com o log silenciado"""
+
+    def iniciar_stub(self, **opcoes):
+        stub = StubMicroservice(**opcoes).start()
+        self.addCleanup(stub.stop)
+        return stub
+
+    def criar_clientes(self, url_a, url_b=None):
+        with self.settings(MICROSERVICE_A_URL=url_a, MICROSERVICE_B_URL=url_b or url_a):
+            self.client_a = MicroserviceAClient()
+            self.client_b = MicroserviceBClient()
+        self.addCleanup(self.client_a.http.close)
+        self.addCleanup(self.client_b.http.close)
+        # Falhas injetadas geram warnings/erros esperados no log dos clientes
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+
+@override_settings(MICROSERVICE_RETRY_ATTEMPTS=3, MICROSERVICE_RETRY_DELAY=0)
+class ExternalModeHTTPTests(StubClientsMixin, SimpleTestCase):
+    """Clientes no modo externo contra um microsserviço falso local"""
+
+    def setUp(self):
+        self.stub = self.iniciar_stub()
+        self.criar_clientes(self.stub.url)
+        # Cache próprio e desligado: toda chamada chega ao microsserviço
+        self.client_a.cache = CatalogCache()
+        self.client_a.cache.enabled = False
+
+    def test_conexao_keep_alive_reaproveitada(self):
+        for car_id in range(1, 6):
+            self.assertEqual(self.client_a.get_car_by_id(car_id)['status'], 'success')
+        self.assertEqual(self.stub.connections, 1)
+        stats = self.client_a.http_stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['idle_connections'], 1)
+
+    def test_get_repetido_em_falha_transitoria(self):
+        self.stub.fail_next(503, 'reset')
+        result = self.client_b.get_order_report('abc')
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.client_b.http_stats()['retries'], 2)
+
+    def test_retries_limitados_pelas_tentativas(self):
+        self.stub.fail_next(503, 503, 503, 503)
+        result = self.client_a.get_cars()
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.client_a.http_stats()['failures'], 1)
+
+    def test_post_nao_idempotente_nao_e_repetido(self):
+        self.stub.fail_next(503)
+        result = self.client_b.create_order({'items': [{'peca_id': 1, 'quantidade': 1}]})
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_calculo_de_preco_e_repetivel(self):
+        self.stub.fail_next(502)
+        result = self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual([method for method, _, _ in self.stub.requests], ['POST', 'POST'])
+
+    @override_settings(MICROSERVICE_TIMEOUT=0.05, MICROSERVICE_RETRY_ATTEMPTS=1)
+    def test_timeout_de_leitura_configurado(self):
+        self.stub.delay = 0.5
+        with self.settings(MICROSERVICE_B_URL=self.stub.url):
+            client = MicroserviceBClient()
+        self.addCleanup(client.http.close)
+        result = client.get_order_report('abc')
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('timed out', result['message'])
+
+    def test_ping_externo_via_head(self):
+        self.assertEqual(self.client_a.ping()['status'], 'success')
+        self.assertEqual(self.stub.requests[-1][:2], ('HEAD', '/health/'))
+        # Probe não repete tentativas
+        self.stub.fail_next(503)
+        self.assertEqual(self.client_b.ping()['status'], 'error')
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_backoff_com_jitter(self):
+        for tentativa in range(6):
+            delay = backoff_delay(tentativa, 0.5, 4)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4, 0.5 * 2 ** tentativa))
+
+
+@override_settings(
+    MICROSERVICE_RETRY_ATTEMPTS=1,
+    MICROSERVICE_TIMEOUT=0.1,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD=2,
+    CIRCUIT_BREAKER_TIMEOUT=0.2,
+)
+class CircuitBreakerTests(StubClientsMixin, SimpleTestCase):
+    """Circuit breaker por endpoint contra um microsserviço falso com falhas injetadas"""
+
+    def setUp(self):
+        self.stub = self.iniciar_stub()
+        self.criar_clientes(self.stub.url)
+        self.client_a.cache = CatalogCache()
+        self.client_a.cache.clear()
+
+    def circuito(self, client, endpoint):
+        return client.http_stats()['circuits'][endpoint]
+
+    def test_falha_rapida_com_circuito_aberto(self):
+        # Microsserviço travado: cada chamada espera o timeout de leitura
+        self.stub.delay = 0.5
+        for _ in range(2):
+            self.assertEqual(self.client_b.get_order_report('abc')['status'], 'error')
+        self.assertEqual(self.circuito(self.client_b, 'GET /orders/abc/report/')['state'], 'open')
+        recebidas = len(self.stub.requests)
+
+        inicio = time.perf_counter()
+        result = self.client_b.get_order_report('abc')
+        duracao = time.perf_counter() - inicio
+
+        self.assertTrue(result['circuit_open'])
+        self.assertLess(duracao, 0.05)
+        self.assertEqual(len(self.stub.requests), recebidas)
+
+    def test_meia_abertura_fecha_apos_sucesso(self):
+        self.stub.fail_next(503, 503)
+        for _ in range(2):
+            self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])
+        self.assertTrue(self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])['circuit_open'])
+
+        time.sleep(0.25)
+        result = self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(self.circuito(self.client_b, 'POST /calculate-price/')['state'], 'closed')
+
+    def test_meia_abertura_reabre_apos_falha(self):
+        self.stub.fail_next(503, 503, 503)
+        for _ in range(2):
+            self.client_b.generate_order_id()
+        time.sleep(0.25)
+        self.assertEqual(self.client_b.generate_order_id()['status'], 'error')
+        self.assertEqual(self.circuito(self.client_b, 'POST /generate-order-id/')['state'], 'open')
+        self.assertTrue(self.client_b.generate_order_id()['circuit_open'])
+
+    def abrir_calculo(self):
+        self.stub.fail_next(503, 503)
+        for _ in range(2):
+            self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])
+        time.sleep(0.25)
+
+    def test_erro_local_na_chamada_de_teste_libera_a_vaga(self):
+        self.abrir_calculo()
+        # Decimal não é serializável em JSON: TypeError antes de qualquer I/O
+        result = self.client_b.calculate_price([{'peca_id': 1, 'quantidade': Decimal('1')}])
+        self.assertNotIn('circuit_open', result)
+        self.assertEqual(self.circuito(self.client_b, 'POST /calculate-price/')['state'], 'half_open')
+        self.assertEqual(self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])['status'], 'success')
+
+    def test_chamada_async_interrompida_libera_a_vaga(self):
+        self.abrir_calculo()
+        pool = mock.Mock()
+        cliente = AsyncServiceClient(self.client_b, pool)
+        for erro in (httpx.DecodingError('corpo inválido'), asyncio.CancelledError()):
+            pool.client.return_value.request = mock.AsyncMock(side_effect=erro)
+            try:
+                async_to_sync(cliente._request)('POST', '/calculate-price/', 'Erro', json={})
+            except asyncio.CancelledError:
+                pass
+            self.assertEqual(self.circuito(self.client_b, 'POST /calculate-price/')['state'], 'half_open')
+        self.assertEqual(self.client_b.calculate_price([{'peca_id': 1, 'quantidade': 1}])['status'], 'success')
+
+    def test_circuitos_independentes_por_endpoint(self):
+        self.stub.fail_next(503, 503)
+        self.client_a.get_car_by_id(1)
+        self.client_a.get_car_by_id(2)
+        self.assertEqual(self.circuito(self.client_a, 'GET /cars/{id}/')['state'], 'open')
+        self.assertEqual(self.client_a.get_parts()['status'], 'success')
+
+    def test_catalogo_stale_com_circuito_aberto(self):
+        self.assertEqual(self.client_a.get_cars()['status'], 'success')
+        # Nova geração do catálogo: a entrada normal deixa de valer
+        self.client_a.cache.invalidate()
+        self.stub.fail_next(503, 503)
+        for _ in range(2):
+            self.client_a.cache.invalidate()
+            self.client_a.get_cars()
+        self.client_a.cache.invalidate()
+
+        result = self.client_a.get_cars()
+        self.assertEqual(result['status'], 'success')
+        self.assertTrue(result['stale'])
+        self.assertEqual(self.client_a.cache_stats()['stale_hits'], 1)
+
+
+@override_settings(MICROSERVICE_RETRY_ATTEMPTS=1)
+class FanOutTests(StubClientsMixin, SimpleTestCase):
+    """Chamadas independentes em paralelo: latência da mais lenta, não a soma"""
+
+    def setUp(self):
+        self.stub_a = self.iniciar_stub(delay=0.3)
+        self.stub_b = self.iniciar_stub(delay=0.2)
+        self.criar_clientes(self.stub_a.url, self.stub_b.url)
+
+    def test_health_check_leva_o_maximo_dos_atrasos(self):
+        checker = HealthChecker({'service_a': self.client_a.ping, 'service_b': self.client_b.ping})
+        inicio = time.perf_counter()
+        report = checker.check()
+        duracao = time.perf_counter() - inicio
+
+        self.assertTrue(report['healthy'])
+        self.assertGreaterEqual(duracao, 0.3)
+        # Sequencial seria 0.5s
+        self.assertLess(duracao, 0.45)
+        self.assertGreaterEqual(report['dependencies']['service_a']['latency_ms'], 300)
+        self.assertLess(report['dependencies']['service_b']['latency_ms'], 300)
+
+    def test_resultado_parcial_com_prazo(self):
+        self.stub_a.delay = 1.0
+        inicio = time.perf_counter()
+        resultados = fan_out({'a': self.client_a.ping, 'b': self.client_b.ping}, deadline=0.4)
+        duracao = time.perf_counter() - inicio
+
+        self.assertLess(duracao, 0.6)
+        self.assertTrue(resultados['a']['timeout'])
+        self.assertEqual(resultados['b']['status'], 'success')
+
+    @override_settings(HEALTH_CHECK_DEADLINE=0.4)
+    def test_health_check_reporta_dependencia_lenta_como_offline(self):
+        self.stub_a.delay = 1.0
+        checker = HealthChecker({'service_a': self.client_a.ping, 'service_b': self.client_b.ping})
+        report = checker.check()
+        self.assertFalse(report['healthy'])
+        self.assertTrue(report['dependencies']['service_a']['timeout'])
+        self.assertEqual(report['dependencies']['service_b']['status'], 'online')
+
+    def test_excecao_vira_resposta_de_erro(self):
+        resultados = fan_out({'ok': lambda: {'status': 'success'}, 'falha': lambda: 1 / 0})
+        self.assertEqual(resultados['ok']['status'], 'success')
+        self.assertEqual(resultados['falha']['status'], 'error')
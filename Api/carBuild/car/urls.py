@@ -8,15 +8,20 @@ from .views import (
     # Views de peças (Microsserviço A)
     peca_list,
     peca_detail,
+    search_pecas,
     
     # Views de cálculos e pedidos (Microsserviço B)
     calculate_price,
-    create_order,
+    orders,
+    create_orders_batch,
     order_report,
     generate_order_id,
     
     # Views utilitárias
     health_check,
+    health_live,
+    health_ready,
+    metrics,
 )
 
 urlpatterns = [
@@ -28,13 +33,18 @@ urlpatterns = [
     # ========== ENDPOINTS - PEÇAS (Microsserviço A) ==========
     path('pecas/', peca_list, name='peca_list'),
     path('pecas/<int:peca_id>/', peca_detail, name='peca_detail'),
+    path('search/pecas/', search_pecas, name='search_pecas'),
     
     # ========== ENDPOINTS - CÁLCULOS E PEDIDOS (Microsserviço B) ==========
     path('calculate-price/', calculate_price, name='calculate_price'),
-    path('orders/', create_order, name='create_order'),
+    path('orders/', orders, name='orders'),
+    path('orders/batch/', create_orders_batch, name='create_orders_batch'),
     path('orders/<str:order_id>/report/', order_report, name='order_report'),
     path('generate-order-id/', generate_order_id, name='generate_order_id'),
     
     # ========== ENDPOINTS - UTILITÁRIOS ==========
     path('health/', health_check, name='health_check'),
+    path('health/live/', health_live, name='health_live'),
+    path('health/ready/', health_ready, name='health_ready'),
+    path('metrics/', metrics, name='metrics'),
 ]
\ No newline at end of file
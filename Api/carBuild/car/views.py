@@ -4,27 +4,96 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+import functools
 import json
 
 # Importar os clientes dos microsserviços
 from microservices.service_a import microservice_a
 from microservices.service_b import microservice_b
+from microservices.cache import catalog_cache
+from microservices.health import health_checker
+from microservices.metrics import CONTENT_TYPE, PEDIDOS_CRIADOS, TAMANHO_CARRINHO, registry
 
 # Importações mantidas para compatibilidade
 from .models import Car, Peca, Pedido, ItemPedido
 from .serializers import CarSerializer, PecaSerializer, PedidoSerializer, PedidoListSerializer
+from .idempotency import idempotent
+
+# ========== SNAPSHOT DO CATÁLOGO (ETag/304) ==========
+
+def catalog_snapshot(view):
+    """
+    Serve endpoints do catálogo a partir de um snapshot JSON pré-renderizado.
+    O ETag deriva da versão do catálogo (incrementada a cada escrita em Car/Peca),
+    então If-None-Match responde 304 sem tocar no ORM nem nos renderers do DRF.
+    Deve ser o decorator mais externo, acima de @api_view.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # Browsable API (HTML) e streaming seguem o caminho normal
+        if (request.method != 'GET' or 'stream' in request.GET
+                or 'text/html' in request.META.get('HTTP_ACCEPT', '')):
+            return view(request, *args, **kwargs)
+        
+        etag = catalog_cache.etag(request.get_full_path())
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        
+        snapshot = catalog_cache.get_snapshot(etag)
+        if snapshot is not None:
+            status_code, content_type, content = snapshot
+            response = HttpResponse(content, status=status_code, content_type=content_type)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            response.render()
+            catalog_cache.set_snapshot(etag, response.status_code, response['Content-Type'], response.content)
+        
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept',))
+        return response
+    return wrapper
+
+def ndjson_response(rows):
+    """Resposta em streaming, um objeto JSON por linha (memória constante)"""
+    return StreamingHttpResponse(
+        (json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows),
+        content_type='application/x-ndjson'
+    )
+
+def wants_ndjson(request):
+    return request.GET.get('stream') == 'ndjson'
 
 # ========== GATEWAY VIEWS - CARROS (via Microsserviço A) ==========
 
+@catalog_snapshot
 @api_view(['GET'])
 def car_list(request):
     """
-    Lista todos os carros via Microsserviço A
-    GET /api/cars/
+    Lista os carros via Microsserviço A, paginados por cursor
+    GET /api/cars/?cursor=<next_cursor>&limit=100
+    GET /api/cars/?stream=ndjson
     """
     try:
-        result = microservice_a.get_cars()
+        if wants_ndjson(request):
+            return ndjson_response(microservice_a.stream_cars())
+        
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        validation = microservice_a.validate_pagination(cursor, limit)
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_a.get_cars(cursor=cursor, limit=limit)
         
         if result['status'] == 'success':
             return Response(result, status=status.HTTP_200_OK)
@@ -57,6 +126,7 @@ def car_detail(request, car_id):
             'message': f'Erro no gateway: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@catalog_snapshot
 @api_view(['GET'])
 def car_pecas(request, car_id):
     """
@@ -79,11 +149,13 @@ def car_pecas(request, car_id):
 
 # ========== GATEWAY VIEWS - PEÇAS (via Microsserviço A) ==========
 
+@catalog_snapshot
 @api_view(['GET'])
 def peca_list(request):
     """
-    Lista todas as peças via Microsserviço A
-    GET /api/pecas/
+    Lista as peças via Microsserviço A, paginadas por cursor
+    GET /api/pecas/?nome=&car_id=&min_valor=&max_valor=&cursor=&limit=
+    GET /api/pecas/?stream=ndjson
     """
     try:
         # Extrair filtros dos query parameters
@@ -97,7 +169,16 @@ def peca_list(request):
         # Remover filtros vazios
         filters = {k: v for k, v in filters.items() if v is not None}
         
-        result = microservice_a.get_parts(filters)
+        if wants_ndjson(request):
+            return ndjson_response(microservice_a.stream_parts(filters))
+        
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        validation = microservice_a.validate_pagination(cursor, limit)
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_a.get_parts(filters, cursor=cursor, limit=limit)
         
         if result['status'] == 'success':
             return Response(result, status=status.HTTP_200_OK)
@@ -110,6 +191,7 @@ def peca_list(request):
             'message': f'Erro no gateway: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@catalog_snapshot
 @api_view(['GET'])
 def peca_detail(request, peca_id):
     """
@@ -130,6 +212,39 @@ def peca_detail(request, peca_id):
             'message': f'Erro no gateway: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@catalog_snapshot
+@api_view(['GET'])
+def search_pecas(request):
+    """
+    Busca textual de peças via Microsserviço A (prefixo, sem acento, ranqueada)
+    GET /api/search/pecas/?q=oleo&limit=20
+    """
+    try:
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response({
+                'status': 'error',
+                'message': 'Parâmetro q é obrigatório'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        limit = request.GET.get('limit')
+        validation = microservice_a.validate_pagination(limit=limit)
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_a.search_parts(query, limit=limit)
+        
+        if result['status'] == 'success':
+            return Response(result, status=status.HTTP_200_OK)
+        else:
+            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+    except Exception as e:
+        return Response({
+            'status': 'error',
+            'message': f'Erro no gateway: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # ========== GATEWAY VIEWS - CÁLCULOS E PEDIDOS (via Microsserviço B) ==========
 
 @api_view(['POST'])
@@ -155,6 +270,7 @@ def calculate_price(request):
                 'message': 'Lista de itens é obrigatória'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        TAMANHO_CARRINHO.observe(len(items))
         result = microservice_b.calculate_price(items)
         
         if result['status'] == 'success':
@@ -173,12 +289,56 @@ def calculate_price(request):
             'message': f'Erro no gateway: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@csrf_exempt
+def orders(request):
+    """
+    Rota /api/orders/: GET lista pedidos (order_list), os demais métodos vão para create_order
+    """
+    if request.method == 'GET':
+        return order_list(request)
+    return create_order(request)
+
+@api_view(['GET'])
+def order_list(request):
+    """
+    Lista pedidos via Microsserviço B, mais recentes primeiro, paginados por cursor
+    GET /api/orders/?data_inicio=2025-01-01&data_fim=2025-01-31&min_valor=&max_valor=&cursor=&limit=
+    Cada pedido traz total_itens e quantidade_total (mesma consulta da página)
+    """
+    try:
+        filters = {
+            'data_inicio': request.GET.get('data_inicio'),
+            'data_fim': request.GET.get('data_fim'),
+            'min_valor': request.GET.get('min_valor'),
+            'max_valor': request.GET.get('max_valor'),
+        }
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        validation = microservice_b.validate_order_list(filters, cursor, limit)
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_b.list_orders(validation['filters'], cursor=cursor, limit=limit)
+        
+        if result['status'] == 'success':
+            return Response(result, status=status.HTTP_200_OK)
+        else:
+            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+    except Exception as e:
+        return Response({
+            'status': 'error',
+            'message': f'Erro no gateway: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@idempotent('orders')
 @api_view(['POST'])
 @csrf_exempt
 def create_order(request):
     """
     Criar pedido via Microsserviço B
     POST /api/orders/
+    Header opcional: Idempotency-Key (retries com a mesma chave não duplicam o pedido)
     Body: {
         "items": [
             {"peca_id": 1, "quantidade": 2},
@@ -198,7 +358,11 @@ def create_order(request):
         result = microservice_b.create_order(data)
         
         if result['status'] == 'success':
+            PEDIDOS_CRIADOS.inc()
             return Response(result, status=status.HTTP_201_CREATED)
+        elif result.get('retryable'):
+            # Circuito aberto, rede ou banco ocupado: 503 também libera a Idempotency-Key
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         else:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
             
@@ -213,6 +377,52 @@ def create_order(request):
             'message': f'Erro no gateway: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@idempotent('orders_batch')
+@api_view(['POST'])
+@csrf_exempt
+def create_orders_batch(request):
+    """
+    Criar vários pedidos via Microsserviço B
+    POST /api/orders/batch/
+    Body: {
+        "orders": [
+            {"items": [{"peca_id": 1, "quantidade": 2}]},
+            {"items": [{"peca_id": 3, "quantidade": 1}]}
+        ]
+    }
+    Resposta: 201 se todos foram criados, 207 se só parte, 400 se nenhum;
+    data.results[i] traz o resultado do pedido i
+    """
+    try:
+        data = json.loads(request.body) if request.body else {}
+        
+        validation = microservice_b.validate_orders_batch(data)
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_b.create_orders_bulk(data['orders'])
+        
+        if result['status'] != 'success':
+            http_status = status.HTTP_400_BAD_REQUEST if 'data' in result else status.HTTP_500_INTERNAL_SERVER_ERROR
+        elif result['data']['failed']:
+            http_status = status.HTTP_207_MULTI_STATUS
+        else:
+            http_status = status.HTTP_201_CREATED
+        if result['status'] == 'success':
+            PEDIDOS_CRIADOS.inc(result['data']['created'])
+        return Response(result, status=http_status)
+            
+    except json.JSONDecodeError:
+        return Response({
+            'status': 'error',
+            'message': 'JSON inválido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'status': 'error',
+            'message': f'Erro no gateway: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def order_report(request, order_id):
     """
@@ -237,17 +447,29 @@ def order_report(request, order_id):
 @csrf_exempt
 def generate_order_id(request):
     """
-    Gerar ID único para pedido via Microsserviço B
+    Reservar IDs únicos para pedidos via Microsserviço B
     POST /api/generate-order-id/
+    Body opcional: {"count": 50} para reservar um bloco de IDs de uma vez;
+    cada ID pode ser enviado depois como "id_unico" em POST /api/orders/
     """
     try:
-        result = microservice_b.generate_order_id()
+        data = json.loads(request.body) if request.body else {}
+        validation = microservice_b.validate_order_id_count(data.get('count', 1))
+        if validation['status'] != 'success':
+            return Response(validation, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = microservice_b.generate_order_id(validation['count'])
         
         if result['status'] == 'success':
             return Response(result, status=status.HTTP_200_OK)
         else:
             return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
+    except json.JSONDecodeError:
+        return Response({
+            'status': 'error',
+            'message': 'JSON inválido'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'status': 'error',
@@ -263,22 +485,26 @@ def health_check(request):
     GET /api/health/
     """
     try:
-        # Testar Microsserviço A
-        cars_result = microservice_a.get_cars()
-        service_a_status = cars_result['status'] == 'success'
-        
-        # Testar Microsserviço B
-        order_id_result = microservice_b.generate_order_id()
-        service_b_status = order_id_result['status'] == 'success'
-        
-        overall_status = service_a_status and service_b_status
+        # Probes leves (SELECT 1 / HEAD), em paralelo e com cache curto
+        report = health_checker.check()
+        dependencias = report['dependencies']
+        overall_status = report['healthy']
         
         return Response({
             'status': 'success' if overall_status else 'warning',
             'gateway': 'online',
             'microservices': {
-                'service_a': 'online' if service_a_status else 'offline',
-                'service_b': 'online' if service_b_status else 'offline'
+                nome: dependencia['status'] for nome, dependencia in dependencias.items()
+            },
+            'latency_ms': {
+                nome: dependencia['latency_ms'] for nome, dependencia in dependencias.items()
+            },
+            'checked_at': report['checked_at'],
+            'cached': report['cached'],
+            'cache': microservice_a.cache_stats(),
+            'http': {
+                'service_a': microservice_a.http_stats(),
+                'service_b': microservice_b.http_stats()
             },
             'timestamp': str(timezone.now())
         }, status=status.HTTP_200_OK if overall_status else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -289,3 +515,46 @@ def health_check(request):
             'message': f'Erro no health check: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+@api_view(['GET'])
+def health_live(request):
+    """
+    Liveness: o processo do gateway responde (não consulta dependências)
+    GET /api/health/live/
+    """
+    return Response({
+        'status': 'success',
+        'gateway': 'online',
+        'timestamp': str(timezone.now())
+    })
+
+
+@api_view(['GET'])
+def health_ready(request):
+    """
+    Readiness: os microsserviços respondem aos probes
+    GET /api/health/ready/
+    """
+    try:
+        report = health_checker.check()
+        return Response({
+            'status': 'success' if report['healthy'] else 'error',
+            'dependencies': report['dependencies'],
+            'checked_at': report['checked_at'],
+            'cached': report['cached']
+        }, status=status.HTTP_200_OK if report['healthy'] else status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+    except Exception as e:
+        return Response({
+            'status': 'error',
+            'message': f'Erro no health check: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+def metrics(request):
+    """
+    Métricas do processo no formato texto do Prometheus
+    GET /api/metrics/
+    """
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Deve ser o primeiro middleware
+    'car.middleware.RequestInstrumentationMiddleware',  # Server-Timing e log por requisição
+    'car.middleware.ReplicaRoutingMiddleware',  # Leituras do catálogo na réplica (car/routers.py)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,8 +84,38 @@ WSGI_APPLICATION = 'carBuild.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # SQLITE_PATH aponta para outro arquivo (ex.: banco semeado do benchmark_api)
+        'NAME': os.environ.get('SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
+        # Conexões persistentes: reaproveitadas entre requisições por até CONN_MAX_AGE
+        # segundos e verificadas antes do reuso (uma conexão caída é reaberta)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Réplica de leitura do catálogo: snapshot do principal gravado por
+    # python manage.py snapshot_replica (car/replica.py)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_REPLICA_PATH') or BASE_DIR / 'db_replica.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Leituras de Car/Peca feitas nas requisições vão para 'replica' (car/routers.py);
+# escritas, pedidos e leituras logo após uma escrita ficam no principal
+DATABASE_ROUTERS = ['car.routers.ReadReplicaRouter']
+DATABASE_REPLICA_ENABLED = os.environ.get('DB_REPLICA_ENABLED', '0') == '1'
+DATABASE_REPLICA_STICKY_SECONDS = 5  # Após uma escrita, a requisição lê do principal por este tempo
+
+# PRAGMAs aplicados em cada conexão SQLite nova (car/db.py); {} desliga
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',     # Leitores não bloqueiam o escritor (e vice-versa)
+    'synchronous': 'normal',   # Com WAL não corrompe o banco; fsync só no checkpoint
+    'busy_timeout': 5000,      # ms esperando o lock de escrita antes de "database is locked"
+    'cache_size': -20000,      # Cache de páginas por conexão (negativo = KiB)
+    'mmap_size': 268435456,    # Até 256 MiB do arquivo lidos via mmap
+    'temp_store': 'memory',    # Tabelas temporárias e ordenações em memória
 }
 
 
@@ -129,18 +162,98 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ========== CONFIGURAÇÕES DOS MICROSSERVIÇOS ==========
 
-# URLs dos Microsserviços
-MICROSERVICE_A_URL = 'internal'  # Em produção: 'http://microservice-a:8001'
-MICROSERVICE_B_URL = 'internal'  # Em produção: 'http://microservice-b:8002'
+# URLs dos Microsserviços (sobrescritas pelas variáveis de ambiente de mesmo nome)
+MICROSERVICE_A_URL = os.environ.get('MICROSERVICE_A_URL', 'internal')  # Em produção: 'http://microservice-a:8001'
+MICROSERVICE_B_URL = os.environ.get('MICROSERVICE_B_URL', 'internal')  # Em produção: 'http://microservice-b:8002'
 
 # Configurações de Negócio
 FRETE_GRATIS_VALOR = 200.00  # Valor mínimo para frete grátis
 VALOR_FRETE = 25.00          # Valor do frete padrão
+ORDERS_BATCH_MAX = 500      # Pedidos por requisição em /api/orders/batch/
+ORDER_ID_BLOCK_MAX = 1000   # IDs reservados por chamada a /api/generate-order-id/
+ORDER_ID_RESERVATION_TTL = 86400  # Segundos em que um ID reservado é aceito em create_order
+
+# Idempotency-Key na criação de pedidos (car/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 86400  # Segundos em que uma chave devolve a resposta original
+IDEMPOTENCY_LOCK_TIMEOUT = 30  # Espera de uma duplicata; reserva sem renovação por este tempo é abandonada
+
+# Configurações de Timeout e Retry (modo externo, microservices/http_client.py)
+MICROSERVICE_CONNECT_TIMEOUT = 3  # Timeout de conexão em segundos
+MICROSERVICE_TIMEOUT = 10    # Timeout de leitura em segundos
+MICROSERVICE_RETRY_ATTEMPTS = 3  # Tentativas por chamada idempotente (1 = sem retry)
+MICROSERVICE_RETRY_DELAY = 1  # Delay base entre tentativas (backoff exponencial com jitter)
+MICROSERVICE_RETRY_MAX_DELAY = 10  # Limite do delay entre tentativas
+
+# Pool de conexões HTTP do modo externo (clientes síncronos e async)
+MICROSERVICE_POOL_MAXSIZE = 100   # Conexões simultâneas por pool
+MICROSERVICE_POOL_KEEPALIVE = 20  # Conexões ociosas mantidas abertas
+
+# Circuit breaker por endpoint (microservices/circuit_breaker.py)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5  # Falhas seguidas que abrem o circuito
+CIRCUIT_BREAKER_TIMEOUT = 60  # Segundos com o circuito aberto antes da chamada de teste
+
+# Health check (microservices/health.py)
+HEALTH_CHECK_CACHE_TTL = 2  # Segundos em que o resultado dos probes é reaproveitado
+HEALTH_PROBE_TIMEOUT = 2  # Timeout de cada probe no modo externo
+HEALTH_CHECK_DEADLINE = 3  # Prazo total dos probes; quem passar dele é reportado offline
+
+# Fan-out de chamadas independentes aos microsserviços (microservices/fanout.py)
+FANOUT_MAX_WORKERS = 16  # Threads compartilhadas por todas as chamadas em paralelo
+FANOUT_DEADLINE = 10  # Prazo padrão por chamada, em segundos
+
+# Instrumentação por requisição (car/middleware.py, microservices/instrumentation.py)
+SERVER_TIMING_ENABLED = True  # Cabeçalho Server-Timing com db, métodos dos clientes, render e total
+SLOW_REQUEST_THRESHOLD_MS = None  # Ex.: 500 para logar o SQL das requisições mais lentas que isso
+SLOW_REQUEST_MAX_QUERIES = 100  # Consultas guardadas no dump de requisição lenta
+
+# Log estruturado por requisição: uma linha JSON no logger 'carbuild.requests'.
+# Em INFO registra todas as requisições; em WARNING só as lentas.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'carbuild.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# ========== CONFIGURAÇÕES DE CACHE ==========
+
+# Cache do catálogo (carros e peças) usado pelo Microsserviço A.
+# TIMEOUT é o TTL em segundos; MAX_ENTRIES limita o número de entradas (descarte LRU).
+# Para compartilhar entre processos, troque o BACKEND, por exemplo:
+#   'django.core.cache.backends.filebased.FileBasedCache' com 'LOCATION': '/var/tmp/carbuild_cache'
+#   'django.core.cache.backends.redis.RedisCache' com 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'carbuild-catalog',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', '1') != '0'
+CATALOG_STALE_TIMEOUT = 3600  # Cópia servida com o circuito do Microsserviço A aberto
 
-# Configurações de Timeout e Retry
-MICROSERVICE_TIMEOUT = 10    # Timeout em segundos
-MICROSERVICE_RETRY_ATTEMPTS = 3
-MICROSERVICE_RETRY_DELAY = 1  # Delay entre tentativas
+# Paginação por cursor do catálogo (/api/cars/ e /api/pecas/)
+CATALOG_PAGE_SIZE = 100
+CATALOG_MAX_PAGE_SIZE = 1000
+CATALOG_STREAM_CHUNK_SIZE = 2000  # Linhas lidas por bloco no modo ?stream=ndjson
 
 # ========== CONFIGURAÇÕES DE CORS ==========
 
@@ -160,6 +273,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',  # POST /api/orders/ (car/idempotency.py)
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -0,0 +1,229 @@
+"""
+Clientes assíncronos dos Microsserviços A e B
+Responsável por: chamadas não bloqueantes para o gateway ASGI (car/async_views.py)
+
+No modo externo, todas as chamadas compartilham um pool httpx.AsyncClient com
+keep-alive, então um único worker ASGI multiplexa centenas de chamadas em voo.
+No modo 'internal', as chamadas são delegadas aos clientes síncronos (ORM) via
+sync_to_async, reaproveitando cache, validações e regras de negócio.
+"""
+
+import asyncio
+import logging
+import weakref
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .cache import catalog_cache
+from .http_client import resposta_erro
+from .instrumentation import instrument_client
+from .service_a import microservice_a
+from .service_b import microservice_b
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPPool:
+    """
+    Um httpx.AsyncClient por event loop. Sob ASGI há um único loop por worker,
+    então todas as requisições compartilham o mesmo pool de conexões; sob WSGI
+    cada view async roda em um loop próprio e ganha um cliente descartável.
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    getattr(settings, 'MICROSERVICE_TIMEOUT', 10),
+                    connect=getattr(settings, 'MICROSERVICE_CONNECT_TIMEOUT', 3),
+                ),
+                limits=httpx.Limits(
+                    max_connections=getattr(settings, 'MICROSERVICE_POOL_MAXSIZE', 100),
+                    max_keepalive_connections=getattr(settings, 'MICROSERVICE_POOL_KEEPALIVE', 20),
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Fecha o cliente do loop atual (ex.: no shutdown do servidor ASGI)"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class AsyncServiceClient:
+    """Base dos clientes assíncronos: delegação interna ou HTTP no pool compartilhado"""
+
+    def __init__(self, sync_client, pool):
+        self.sync = sync_client
+        self.base_url = sync_client.base_url
+        self.pool = pool
+
+    async def _internal(self, method, *args, **kwargs):
+        # thread_sensitive=True mantém o ORM em uma única thread, como exige o Django
+        return await sync_to_async(getattr(self.sync, method), thread_sensitive=True)(*args, **kwargs)
+
+    async def _request(self, http_method, path, error_message, **kwargs):
+        # Mesmo circuit breaker do cliente síncrono, por endpoint
+        breaker = self.sync.http.circuits.get(http_method, path)
+        try:
+            breaker.before_call()
+            try:
+                response = await self.pool.client().request(http_method, f"{self.base_url}{path}", **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # Inclui asyncio.CancelledError: a vaga de teste não pode ficar presa
+                breaker.release_trial()
+                raise
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"{error_message}: {str(e)}")
+            return resposta_erro(e)
+
+
+@instrument_client('service_a')
+class AsyncMicroserviceAClient(AsyncServiceClient):
+    """Cliente assíncrono do Microsserviço A (Banco de Dados)"""
+
+    def __init__(self, sync_client, pool):
+        super().__init__(sync_client, pool)
+        self.cache = catalog_cache
+
+    async def _catalog_get(self, method, cache_args, path, error_message, params=None):
+        """GET no catálogo externo, passando pelo mesmo cache do cliente síncrono"""
+        return await self.cache.aget_or_set(
+            method,
+            lambda: self._request('GET', path, error_message, params=params),
+            *cache_args
+        )
+
+    async def get_cars(self, cursor=None, limit=None):
+        if self.base_url == 'internal':
+            return await self._internal('get_cars', cursor=cursor, limit=limit)
+        params = self.sync._parametros_paginacao(cursor, limit)
+        return await self._catalog_get('get_cars', (cursor, limit), '/cars/', 'Erro ao buscar carros', params)
+
+    async def get_car_by_id(self, car_id):
+        if self.base_url == 'internal':
+            return await self._internal('get_car_by_id', car_id)
+        return await self._catalog_get(
+            'get_car_by_id', (car_id,), f'/cars/{car_id}/', f'Erro ao buscar carro {car_id}'
+        )
+
+    async def get_car_parts(self, car_id):
+        if self.base_url == 'internal':
+            return await self._internal('get_car_parts', car_id)
+        return await self._catalog_get(
+            'get_car_parts', (car_id,), f'/cars/{car_id}/parts/', f'Erro ao buscar peças do carro {car_id}'
+        )
+
+    async def get_parts(self, filters=None, cursor=None, limit=None):
+        if self.base_url == 'internal':
+            return await self._internal('get_parts', filters, cursor=cursor, limit=limit)
+        filters = self.sync._normalizar_filtros(filters)
+        params = {**filters, **self.sync._parametros_paginacao(cursor, limit)}
+        return await self._catalog_get(
+            '_get_parts', (filters, cursor, limit), '/parts/', 'Erro ao buscar peças', params
+        )
+
+    async def get_part_by_id(self, part_id):
+        if self.base_url == 'internal':
+            return await self._internal('get_part_by_id', part_id)
+        return await self._catalog_get(
+            'get_part_by_id', (part_id,), f'/parts/{part_id}/', f'Erro ao buscar peça {part_id}'
+        )
+
+    async def search_parts(self, query, limit=None):
+        if self.base_url == 'internal':
+            return await self._internal('search_parts', query, limit=limit)
+        params = {'q': query, **self.sync._parametros_paginacao(None, limit)}
+        return await self._catalog_get(
+            'search_parts', (query, limit), '/search/parts/', f"Erro na busca de peças '{query}'", params
+        )
+
+    def validate_pagination(self, cursor=None, limit=None):
+        # Validação pura, sem I/O
+        return self.sync.validate_pagination(cursor, limit)
+
+
+@instrument_client('service_b')
+class AsyncMicroserviceBClient(AsyncServiceClient):
+    """Cliente assíncrono do Microsserviço B (Cálculos e Pedidos)"""
+
+    async def calculate_price(self, items_data):
+        if self.base_url == 'internal':
+            return await self._internal('calculate_price', items_data)
+        return await self._request(
+            'POST', '/calculate-price/', 'Erro ao calcular preço', json={'items': items_data}
+        )
+
+    async def generate_order_id(self, count=1):
+        if self.base_url == 'internal':
+            return await self._internal('generate_order_id', count)
+        return await self._request(
+            'POST', '/generate-order-id/', 'Erro ao gerar ID do pedido', json={'count': count}
+        )
+
+    async def create_order(self, order_data):
+        if self.base_url == 'internal':
+            return await self._internal('create_order', order_data)
+        return await self._request('POST', '/create-order/', 'Erro ao criar pedido', json=order_data)
+
+    async def create_orders_bulk(self, orders_data):
+        if self.base_url == 'internal':
+            return await self._internal('create_orders_bulk', orders_data)
+        return await self._request(
+            'POST', '/create-orders-bulk/', 'Erro ao criar pedidos em lote', json={'orders': orders_data}
+        )
+
+    async def list_orders(self, filters=None, cursor=None, limit=None):
+        if self.base_url == 'internal':
+            return await self._internal('list_orders', filters, cursor=cursor, limit=limit)
+        params = dict(filters or {})
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+        return await self._request('GET', '/orders/', 'Erro ao listar pedidos', params=params)
+
+    async def get_order_report(self, order_id):
+        if self.base_url == 'internal':
+            return await self._internal('get_order_report', order_id)
+        return await self._request(
+            'GET', f'/orders/{order_id}/report/', f'Erro ao gerar relatório do pedido {order_id}'
+        )
+
+    def validate_order_data(self, order_data):
+        # Validação pura, sem I/O
+        return self.sync.validate_order_data(order_data)
+
+    def validate_order_list(self, filters=None, cursor=None, limit=None):
+        # Validação pura, sem I/O
+        return self.sync.validate_order_list(filters, cursor, limit)
+
+    def validate_order_id_count(self, count):
+        # Validação pura, sem I/O
+        return self.sync.validate_order_id_count(count)
+
+    def validate_orders_batch(self, batch_data):
+        # Validação pura, sem I/O
+        return self.sync.validate_orders_batch(batch_data)
+
+
+# Pool HTTP e instâncias globais dos clientes assíncronos
+http_pool = AsyncHTTPPool()
+async_microservice_a = AsyncMicroserviceAClient(microservice_a, http_pool)
+async_microservice_b = AsyncMicroserviceBClient(microservice_b, http_pool)
@@ -0,0 +1,225 @@
+"""
+Cache de leitura do catálogo (Microsserviço A)
+Responsável por: cache read-through de carros e peças com TTL e descarte LRU
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from car.replica import origem_catalogo
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """
+    Cache read-through sobre o framework de cache do Django.
+
+    O backend é escolhido pelo alias CATALOG_CACHE_ALIAS em settings.CACHES
+    (locmem por padrão; file/Redis basta trocar o BACKEND). TTL e limite de
+    entradas (LRU) vêm do próprio backend: TIMEOUT e OPTIONS['MAX_ENTRIES'].
+
+    A invalidação é feita por geração: toda chave inclui a versão atual do
+    catálogo, e invalidate() apenas incrementa essa versão. Isso funciona em
+    qualquer backend, sem precisar listar ou apagar chaves. Com a réplica de
+    leitura ligada, a chave inclui também o snapshot da réplica
+    (car/replica.py: origem_catalogo), pois o que foi lido dela só muda no
+    próximo snapshot.
+
+    Cada resposta de sucesso também fica guardada, fora da geração, como cópia
+    "stale" por CATALOG_STALE_TIMEOUT segundos. Ela só é servida (marcada com
+    'stale': True) quando o circuit breaker do microsserviço recusa a chamada.
+    """
+
+    VERSION_KEY = 'catalog:version'
+
+    def __init__(self, alias=None):
+        self.alias = alias or getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')
+        self.enabled = getattr(settings, 'CATALOG_CACHE_ENABLED', True)
+        self.stale_timeout = getattr(settings, 'CATALOG_STALE_TIMEOUT', 3600)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def process_local(self):
+        """locmem: cada processo tem o seu cache, e invalidate() só vale para este processo"""
+        return isinstance(self.backend, LocMemCache)
+
+    def _reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+            self.snapshot_hits = 0
+            self.snapshot_misses = 0
+            self.stale_hits = 0
+
+    def version(self):
+        """Versão atual do catálogo; muda a cada escrita em Car/Peca"""
+        version = self.backend.get(self.VERSION_KEY)
+        if version is None:
+            # Começar de um valor derivado do relógio evita reaproveitar entradas
+            # antigas caso a chave de versão seja descartada pelo LRU
+            version = int(time.time() * 1000)
+            if not self.backend.add(self.VERSION_KEY, version, timeout=None):
+                version = self.backend.get(self.VERSION_KEY, version)
+        return version
+
+    def generation(self):
+        """Versão + origem das leituras (réplica e snapshot em uso), usada nas chaves e ETags"""
+        origem = origem_catalogo()
+        return f'{self.version()}-{origem}' if origem else self.version()
+
+    def _digest(self, *args, **kwargs):
+        payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def make_key(self, method, *args, **kwargs):
+        """Chave = geração + método + argumentos normalizados"""
+        return f'catalog:{self.generation()}:{method}:{self._digest(*args, **kwargs)}'
+
+    def make_stale_key(self, method, *args, **kwargs):
+        """Chave da última resposta boa, independente da versão"""
+        return f'catalog:stale:{method}:{self._digest(*args, **kwargs)}'
+
+    def _store(self, key, method, result, args, kwargs):
+        """Guarda respostas de sucesso; com o circuito aberto, devolve a cópia stale"""
+        if not isinstance(result, dict):
+            return result
+        if result.get('status') == 'success':
+            self.backend.set(key, result)
+            self.backend.set(self.make_stale_key(method, *args, **kwargs), result, timeout=self.stale_timeout)
+        elif result.get('circuit_open'):
+            stale = self.backend.get(self.make_stale_key(method, *args, **kwargs))
+            if stale is not None:
+                with self._lock:
+                    self.stale_hits += 1
+                return {**stale, 'stale': True}
+        return result
+
+    def get_or_set(self, method, loader, *args, **kwargs):
+        """Retorna o resultado em cache ou chama loader(); só respostas de sucesso são guardadas"""
+        if not self.enabled:
+            return loader()
+
+        key = self.make_key(method, *args, **kwargs)
+        result = self.backend.get(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        with self._lock:
+            self.misses += 1
+        return self._store(key, method, loader(), args, kwargs)
+
+    async def aget_or_set(self, method, loader, *args, **kwargs):
+        """
+        Versão assíncrona de get_or_set para os clientes async; loader é uma
+        função que retorna uma coroutine. O backend padrão (locmem) é acessado
+        diretamente, pois não faz I/O.
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = self.make_key(method, *args, **kwargs)
+        result = self.backend.get(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        with self._lock:
+            self.misses += 1
+        return self._store(key, method, await loader(), args, kwargs)
+
+    def etag(self, *args):
+        """ETag forte derivado da versão do catálogo e da representação pedida"""
+        payload = json.dumps(args, default=str)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        return f'"{self.generation()}-{digest}"'
+
+    def get_snapshot(self, etag):
+        """Resposta já renderizada (status, content_type, bytes) para o ETag, se existir"""
+        if not self.enabled:
+            return None
+        snapshot = self.backend.get(f'catalog:snapshot:{etag}')
+        with self._lock:
+            if snapshot is None:
+                self.snapshot_misses += 1
+            else:
+                self.snapshot_hits += 1
+        return snapshot
+
+    def set_snapshot(self, etag, status, content_type, content):
+        if self.enabled:
+            self.backend.set(f'catalog:snapshot:{etag}', (status, content_type, content))
+
+    def invalidate(self):
+        """
+        Invalida todo o catálogo incrementando a versão. Chamado de outro processo
+        (ex.: um comando de management), só alcança o gateway se o backend for
+        compartilhado (ver process_local)
+        """
+        try:
+            self.backend.incr(self.VERSION_KEY)
+        except ValueError:
+            # Chave inexistente (primeiro uso ou descartada): versão nova
+            self.backend.set(self.VERSION_KEY, int(time.time() * 1000), timeout=None)
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        """Limpa o backend e zera os contadores"""
+        self.backend.clear()
+        self._reset_stats()
+
+    def stats(self):
+        """Contadores de acerto/erro para dimensionar o cache"""
+        with self._lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+            snapshot_hits, snapshot_misses = self.snapshot_hits, self.snapshot_misses
+            stale_hits = self.stale_hits
+        total = hits + misses
+        backend = self.backend
+        return {
+            'enabled': self.enabled,
+            'alias': self.alias,
+            'backend': f'{type(backend).__module__}.{type(backend).__name__}',
+            'timeout': backend.default_timeout,
+            'max_entries': getattr(backend, '_max_entries', None),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'invalidations': invalidations,
+            'snapshot_hits': snapshot_hits,
+            'snapshot_misses': snapshot_misses,
+            'stale_hits': stale_hits,
+        }
+
+
+def cached_catalog(method):
+    """Decorator para métodos do MicroserviceAClient servidos pelo self.cache"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.cache.get_or_set(
+            method.__name__,
+            lambda: method(self, *args, **kwargs),
+            *args,
+            **kwargs
+        )
+    return wrapper
+
+
+# Instância global do cache do catálogo
+catalog_cache = CatalogCache()
@@ -0,0 +1,127 @@
+"""
+Circuit breaker dos clientes no modo externo
+Responsável por: falhar rápido quando um endpoint do microsserviço está fora do ar
+"""
+
+import re
+import threading
+import time
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Segmentos variáveis do caminho (ids numéricos e UUIDs) viram {id}, para que
+# /cars/1/ e /cars/2/ compartilhem o mesmo circuito
+_SEGMENTO_ID = re.compile(r'/(\d+|[0-9a-fA-F-]{32,36})(?=/|$)')
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem contato com o microsserviço (circuito aberto)"""
+
+    def __init__(self, endpoint, retry_in):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(
+            f'Circuito aberto para {endpoint}: microsserviço indisponível '
+            f'(nova tentativa em {retry_in:.1f}s)'
+        )
+
+
+def endpoint_key(method, path):
+    """Identificador do endpoint: método + caminho sem ids"""
+    return f'{method.upper()} {_SEGMENTO_ID.sub("/{id}", path.split("?", 1)[0])}'
+
+
+class CircuitBreaker:
+    """
+    Estados:
+    - closed: chamadas passam; CIRCUIT_BREAKER_FAILURE_THRESHOLD falhas
+      consecutivas abrem o circuito
+    - open: chamadas falham na hora (CircuitOpenError) por
+      CIRCUIT_BREAKER_TIMEOUT segundos
+    - half_open: passado o timeout, uma única chamada de teste é liberada;
+      sucesso fecha o circuito, falha o reabre, outros erros só liberam a vaga
+    """
+
+    def __init__(self, endpoint, failure_threshold, reset_timeout):
+        self.endpoint = endpoint
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Libera a chamada ou levanta CircuitOpenError"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            restante = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and restante <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.endpoint, max(restante, 0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Devolve a vaga de teste sem mudar o estado: a chamada terminou por um erro
+        que não diz nada sobre o microsserviço (ex.: corpo não serializável, cancelamento)
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'open_for': round(time.monotonic() - self.opened_at, 3) if self.opened_at else None,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Um CircuitBreaker por endpoint de um microsserviço, criado sob demanda"""
+
+    def __init__(self):
+        self.failure_threshold = getattr(settings, 'CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = getattr(settings, 'CIRCUIT_BREAKER_TIMEOUT', 60)
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, method, path):
+        endpoint = endpoint_key(method, path)
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.endpoint: breaker.stats() for breaker in breakers}
@@ -9,12 +9,18 @@ FRETE_GRATIS_VALOR = 200.00  # Valor mínimo para frete grátis
 VALOR_FRETE = 25.00          # Valor do frete padrão
 
 # Configurações de Timeout
+MICROSERVICE_CONNECT_TIMEOUT = 3  # Timeout em segundos para abrir a conexão
 MICROSERVICE_TIMEOUT = 10    # Timeout em segundos para chamadas HTTP
 
-# Configurações de Retry
+# Configurações de Retry (apenas chamadas idempotentes)
 MICROSERVICE_RETRY_ATTEMPTS = 3
-MICROSERVICE_RETRY_DELAY = 1  # Delay em segundos entre tentativas
+MICROSERVICE_RETRY_DELAY = 1  # Delay base em segundos entre tentativas (com jitter)
+MICROSERVICE_RETRY_MAX_DELAY = 10
 
-# Configurações de Circuit Breaker (para implementação futura)
+# Pool de conexões keep-alive
+MICROSERVICE_POOL_MAXSIZE = 100
+MICROSERVICE_POOL_KEEPALIVE = 20
+
+# Configurações de Circuit Breaker (por endpoint)
 CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
 CIRCUIT_BREAKER_TIMEOUT = 60
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Fan-out de chamadas aos microsserviços
+Responsável por: executar chamadas independentes em paralelo, com prazo e resultados parciais
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Pool compartilhado e limitado por FANOUT_MAX_WORKERS, criado no primeiro uso"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'FANOUT_MAX_WORKERS', 16),
+                    thread_name_prefix='fanout'
+                )
+    return _executor
+
+
+def _executar(call):
+    try:
+        return call()
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': str(e)
+        }
+    finally:
+        # Como no fim de uma requisição: a conexão da thread do pool é reaproveitada
+        # dentro de CONN_MAX_AGE e fechada depois disso (ou se ficou com erro)
+        close_old_connections()
+
+
+def fan_out(calls, deadline=None):
+    """
+    Executa {'nome': callable} em paralelo e retorna {'nome': resultado}.
+
+    O tempo total fica perto da chamada mais lenta, não da soma. Chamadas que
+    não terminam em `deadline` segundos (FANOUT_DEADLINE por padrão) viram
+    {'status': 'error', 'timeout': True} e as demais são devolvidas normalmente.
+    A chamada atrasada continua ocupando uma thread do pool até terminar (os
+    clientes HTTP têm timeout próprio), mas ninguém espera por ela.
+
+    Exceções viram respostas de erro no formato dos clientes. No modo internal,
+    cada chamada usa sua própria conexão de banco (fora da transação da view),
+    então só faça fan-out de leituras.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'FANOUT_DEADLINE', 10)
+
+    executor = _get_executor()
+    # Cada chamada roda em uma cópia do contexto (instrumentação da requisição, por exemplo)
+    futures = {
+        nome: executor.submit(contextvars.copy_context().run, _executar, call)
+        for nome, call in calls.items()
+    }
+    wait(futures.values(), timeout=deadline)
+
+    resultados = {}
+    for nome, future in futures.items():
+        if future.done():
+            resultados[nome] = future.result()
+        else:
+            future.cancel()
+            resultados[nome] = {
+                'status': 'error',
+                'message': f'Tempo limite de {deadline}s excedido',
+                'timeout': True
+            }
+    return resultados
@@ -0,0 +1,90 @@
+"""
+Health check do gateway
+Responsável por: probes leves e concorrentes dos microsserviços, com cache curto
+"""
+
+import functools
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from .fanout import fan_out
+from .service_a import microservice_a
+from .service_b import microservice_b
+
+
+def _medir(probe):
+    """Executa o probe medindo a latência"""
+    inicio = time.perf_counter()
+    try:
+        result = probe()
+    except Exception as e:
+        result = {'status': 'error', 'message': str(e)}
+    return {**result, 'latency_ms': round((time.perf_counter() - inicio) * 1000, 2)}
+
+
+def _dependencia(result, deadline):
+    online = result.get('status') == 'success'
+    dependencia = {
+        'status': 'online' if online else 'offline',
+        # Probe que estourou o prazo do fan-out não mediu nada: conta o prazo inteiro
+        'latency_ms': result.get('latency_ms', round(deadline * 1000, 2)),
+    }
+    if not online:
+        dependencia['message'] = result.get('message')
+    if result.get('timeout'):
+        dependencia['timeout'] = True
+    return dependencia
+
+
+class HealthChecker:
+    """
+    Executa os probes ({'service_a': microservice_a.ping, ...}) em paralelo
+    (fan_out, com prazo HEALTH_CHECK_DEADLINE) e guarda o relatório por
+    HEALTH_CHECK_CACHE_TTL segundos, para que probes frequentes do load
+    balancer não virem uma carga extra nos microsserviços. Chamadas
+    simultâneas com o cache expirado esperam um único refresh.
+    """
+
+    def __init__(self, probes):
+        self.probes = probes
+        self._report = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'HEALTH_CHECK_CACHE_TTL', 2)
+
+    def check(self, force=False):
+        """Relatório dos microsserviços; 'cached' indica se veio do cache"""
+        with self._lock:
+            idade = time.monotonic() - self._checked_at
+            if not force and self._report is not None and idade < self.ttl:
+                return {**self._report, 'cached': True, 'age_ms': round(idade * 1000, 2)}
+
+            deadline = getattr(settings, 'HEALTH_CHECK_DEADLINE', 3)
+            resultados = fan_out(
+                {nome: functools.partial(_medir, probe) for nome, probe in self.probes.items()},
+                deadline=deadline
+            )
+            dependencias = {nome: _dependencia(result, deadline) for nome, result in resultados.items()}
+            self._report = {
+                'healthy': all(dep['status'] == 'online' for dep in dependencias.values()),
+                'dependencies': dependencias,
+                'checked_at': str(timezone.now()),
+            }
+            self._checked_at = time.monotonic()
+            return {**self._report, 'cached': False, 'age_ms': 0.0}
+
+    def reset(self):
+        with self._lock:
+            self._report = None
+            self._checked_at = 0
+
+
+# Instância global do health check
+health_checker = HealthChecker({
+    'service_a': microservice_a.ping,
+    'service_b': microservice_b.ping,
+})
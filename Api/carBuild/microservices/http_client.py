@@ -0,0 +1,239 @@
+"""
+Sessões HTTP dos clientes no modo externo
+Responsável por: pool de conexões keep-alive, timeouts e retries com backoff
+"""
+
+import logging
+import random
+import threading
+import time
+import httpx
+import requests
+from django.conf import settings
+from django.db import OperationalError
+from requests.adapters import HTTPAdapter
+from .circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Métodos que podem ser repetidos sem efeito colateral duplicado (RFC 9110, 9.2.2)
+METODOS_IDEMPOTENTES = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Respostas transitórias do microsserviço (ou de um proxy na frente dele)
+STATUS_RETRY = frozenset({502, 503, 504})
+
+# Falhas que não dependem do conteúdo da requisição: rede, timeouts, circuito
+# aberto e banco ocupado ("database is locked")
+ERROS_TRANSITORIOS = (
+    CircuitOpenError,
+    requests.ConnectionError,
+    requests.Timeout,
+    httpx.TransportError,
+    OperationalError,
+)
+
+
+def backoff_delay(tentativa, base, teto):
+    """
+    Espera antes da tentativa seguinte: exponencial com jitter total
+    (aleatório entre 0 e base * 2^tentativa, limitado ao teto), para que
+    clientes que falharam juntos não voltem todos ao mesmo tempo
+    """
+    return random.uniform(0, min(teto, base * (2 ** tentativa)))
+
+
+class ServiceSession:
+    """
+    requests.Session dedicada a um microsserviço.
+
+    Todas as chamadas reaproveitam o mesmo pool de conexões (HTTPAdapter
+    dimensionado por MICROSERVICE_POOL_MAXSIZE), evitando um handshake TCP
+    por requisição. Cada chamada usa (MICROSERVICE_CONNECT_TIMEOUT,
+    MICROSERVICE_TIMEOUT) como timeouts de conexão e leitura.
+
+    Retries (até MICROSERVICE_RETRY_ATTEMPTS tentativas, backoff a partir de
+    MICROSERVICE_RETRY_DELAY) só acontecem em chamadas idempotentes, para
+    erros de rede, timeouts e respostas 502/503/504. Chamadas não idempotentes
+    só são repetidas quando a conexão nem chegou a ser aberta.
+
+    Cada endpoint passa por um circuit breaker (microservices/circuit_breaker.py):
+    depois de CIRCUIT_BREAKER_FAILURE_THRESHOLD chamadas falhas seguidas, as
+    próximas levantam CircuitOpenError sem esperar pelos timeouts.
+    """
+
+    def __init__(self, base_url, name=None):
+        self.base_url = base_url
+        self.name = name or base_url
+        self.pool_maxsize = getattr(settings, 'MICROSERVICE_POOL_MAXSIZE', 100)
+        self.timeout = (
+            getattr(settings, 'MICROSERVICE_CONNECT_TIMEOUT', 3),
+            getattr(settings, 'MICROSERVICE_TIMEOUT', 10),
+        )
+        self.retry_attempts = max(getattr(settings, 'MICROSERVICE_RETRY_ATTEMPTS', 3), 1)
+        self.retry_delay = getattr(settings, 'MICROSERVICE_RETRY_DELAY', 1)
+        self.retry_max_delay = getattr(settings, 'MICROSERVICE_RETRY_MAX_DELAY', 10)
+        self.circuits = CircuitBreakerRegistry()
+        self._session = None
+        self._adapter = None
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    @property
+    def session(self):
+        # Criada sob demanda: no modo internal nenhuma sessão é aberta
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=0,
+                        pool_block=False
+                    )
+                    session = requests.Session()
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._adapter = adapter
+                    self._session = session
+        return self._session
+
+    def _reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+            self.failures = 0
+
+    def _incrementar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def request(self, method, path, idempotent=None, retry=True, **kwargs):
+        """
+        Executa a chamada com retries; idempotent=None decide pelo método HTTP
+        (permite marcar POSTs sem efeito colateral, como cálculos, como repetíveis).
+        retry=False faz uma única tentativa (ex.: probes de health check)
+        """
+        method = method.upper()
+        breaker = self.circuits.get(method, path)
+        breaker.before_call()
+        try:
+            tentativas = self.retry_attempts if retry else 1
+            response = self._request_com_retry(method, path, idempotent, tentativas, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Erro local: sem veredito sobre o microsserviço, mas a vaga de teste volta
+            breaker.release_trial()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def _request_com_retry(self, method, path, idempotent, tentativas, **kwargs):
+        if idempotent is None:
+            idempotent = method in METODOS_IDEMPOTENTES
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+
+        for tentativa in range(tentativas):
+            ultima = tentativa == tentativas - 1
+            self._incrementar('requests')
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # ConnectTimeout é subclasse de ConnectionError e também não enviou nada
+                nao_enviada = isinstance(e, requests.ConnectTimeout)
+                if ultima or not (idempotent or nao_enviada):
+                    self._incrementar('failures')
+                    raise
+                motivo = str(e)
+            except requests.Timeout:
+                if ultima or not idempotent:
+                    self._incrementar('failures')
+                    raise
+                motivo = 'timeout de leitura'
+            else:
+                if response.status_code not in STATUS_RETRY or ultima or not idempotent:
+                    if response.status_code >= 500:
+                        self._incrementar('failures')
+                    return response
+                motivo = f'HTTP {response.status_code}'
+                response.close()
+
+            espera = backoff_delay(tentativa, self.retry_delay, self.retry_max_delay)
+            logger.warning(
+                f"{self.name}: {method} {path} falhou ({motivo}); "
+                f"tentativa {tentativa + 2}/{tentativas} em {espera:.2f}s"
+            )
+            self._incrementar('retries')
+            time.sleep(espera)
+
+    def head(self, path, **kwargs):
+        return self.request('HEAD', path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def stats(self):
+        """Contadores de chamadas e estado do pool de conexões"""
+        connections_opened = 0
+        idle_connections = 0
+        if self._adapter is not None:
+            pools = self._adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections_opened += pool.num_connections
+                idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        with self._lock:
+            return {
+                'base_url': self.base_url,
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'connections_opened': connections_opened,
+                'idle_connections': idle_connections,
+                'pool_maxsize': self.pool_maxsize,
+                'circuits': self.circuits.stats(),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._adapter = None
+
+
+def erro_transitorio(e):
+    """True se um retry da mesma requisição pode dar certo"""
+    if isinstance(e, ERROS_TRANSITORIOS):
+        return True
+    status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+    return status_code is not None and status_code >= 500
+
+
+def resposta_erro(e, **extra):
+    """
+    Resposta de erro padrão dos clientes; marca recusas do circuit breaker e
+    falhas transitórias (retryable: ver erro_transitorio). Qualquer outra
+    exceção (4xx do microsserviço, dado inválido) é definitiva.
+    """
+    resposta = {
+        'status': 'error',
+        'message': str(e),
+        **extra
+    }
+    if isinstance(e, CircuitOpenError):
+        resposta['circuit_open'] = True
+    if erro_transitorio(e):
+        resposta['retryable'] = True
+    return resposta
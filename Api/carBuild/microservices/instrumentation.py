@@ -0,0 +1,188 @@
+"""
+Instrumentação por requisição
+Responsável por: contar consultas SQL e medir o tempo no banco, em cada método
+dos clientes dos microsserviços e na renderização da resposta; os clientes
+também alimentam as métricas do processo (microservices/metrics.py)
+
+O perfil da requisição fica em um ContextVar (aberto pelo
+car.middleware.RequestInstrumentationMiddleware), então vale tanto para views
+síncronas quanto async (sync_to_async copia o contexto) e para o fan-out.
+Fora de uma requisição instrumentada o hook de SQL só consulta o ContextVar.
+"""
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import CHAMADAS_CLIENTE, DURACAO_CHAMADA_CLIENTE
+
+_perfil_atual = contextvars.ContextVar('carbuild_request_profile', default=None)
+
+
+class RequestProfile:
+    """Medições de uma requisição; os registros são thread-safe (fan-out)"""
+
+    def __init__(self, capturar_sql=False, max_sql=100):
+        self.inicio = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.chamadas = {}  # 'service_b.create_order' -> [chamadas, ms]
+        self.render_ms = 0.0
+        self.capturar_sql = capturar_sql
+        self.max_sql = max_sql
+        self.sql = []
+        self._lock = threading.Lock()
+
+    def registrar_sql(self, sql, duracao):
+        ms = duracao * 1000
+        with self._lock:
+            self.db_queries += 1
+            self.db_ms += ms
+            if self.capturar_sql and len(self.sql) < self.max_sql:
+                self.sql.append({'sql': sql, 'ms': round(ms, 3)})
+
+    def registrar_chamada(self, nome, duracao):
+        with self._lock:
+            registro = self.chamadas.setdefault(nome, [0, 0.0])
+            registro[0] += 1
+            registro[1] += duracao * 1000
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def server_timing(self, total_ms):
+        """Valor do cabeçalho Server-Timing (métricas db, <cliente.método>, render e total)"""
+        metricas = [f'db;dur={self.db_ms:.2f};desc="{self.db_queries} queries"']
+        for nome, (chamadas, ms) in self.chamadas.items():
+            metrica = f'{nome};dur={ms:.2f}'
+            if chamadas > 1:
+                metrica += f';desc="{chamadas} calls"'
+            metricas.append(metrica)
+        metricas.append(f'render;dur={self.render_ms:.2f}')
+        metricas.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(metricas)
+
+    def resumo(self, total_ms):
+        """Dicionário para o log estruturado"""
+        return {
+            'total_ms': round(total_ms, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_ms, 2),
+            'calls': {
+                nome: {'count': chamadas, 'ms': round(ms, 2)}
+                for nome, (chamadas, ms) in self.chamadas.items()
+            },
+            'render_ms': round(self.render_ms, 2),
+        }
+
+
+def iniciar_perfil(capturar_sql=False, max_sql=100):
+    """Abre o perfil da requisição; devolve (perfil, token para encerrar_perfil)"""
+    perfil = RequestProfile(capturar_sql, max_sql)
+    return perfil, _perfil_atual.set(perfil)
+
+
+def encerrar_perfil(token):
+    _perfil_atual.reset(token)
+
+
+def perfil_atual():
+    return _perfil_atual.get()
+
+
+# ========== BANCO DE DADOS ==========
+
+def _registrar_sql(execute, sql, params, many, context):
+    """execute_wrapper instalado em todas as conexões; só mede dentro de uma requisição"""
+    perfil = _perfil_atual.get()
+    if perfil is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        perfil.registrar_sql(sql, time.perf_counter() - inicio)
+
+
+def instalar_em(connection, **kwargs):
+    if _registrar_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_sql)
+
+
+def instalar_em_conexoes():
+    """Instala o hook nas conexões da thread atual (as novas recebem via connection_created)"""
+    for connection in connections.all():
+        instalar_em(connection)
+
+
+connection_created.connect(instalar_em)
+
+
+# ========== CLIENTES DOS MICROSSERVIÇOS ==========
+
+def _status_resultado(resultado):
+    """Campo 'status' do dicionário devolvido pelo cliente ('success'/'error')"""
+    if isinstance(resultado, dict):
+        return str(resultado.get('status', 'unknown'))
+    return 'success'
+
+
+def _registrar_chamada(servico, metodo, inicio, status):
+    duracao = time.perf_counter() - inicio
+    CHAMADAS_CLIENTE.inc(service=servico, method=metodo, status=status)
+    DURACAO_CHAMADA_CLIENTE.observe(duracao, service=servico, method=metodo)
+    perfil = _perfil_atual.get()
+    if perfil is not None:
+        perfil.registrar_chamada(f'{servico}.{metodo}', duracao)
+
+
+def _cronometrar(servico, nome, metodo):
+    if inspect.iscoroutinefunction(metodo):
+        @functools.wraps(metodo)
+        async def wrapper_async(self, *args, **kwargs):
+            # No modo internal o cliente async delega ao síncrono, que já registra a chamada
+            if self.base_url == 'internal':
+                return await metodo(self, *args, **kwargs)
+            inicio = time.perf_counter()
+            status = 'exception'
+            try:
+                resultado = await metodo(self, *args, **kwargs)
+                status = _status_resultado(resultado)
+                return resultado
+            finally:
+                _registrar_chamada(servico, nome, inicio, status)
+        return wrapper_async
+
+    @functools.wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        status = 'exception'
+        try:
+            resultado = metodo(self, *args, **kwargs)
+            status = _status_resultado(resultado)
+            return resultado
+        finally:
+            _registrar_chamada(servico, nome, inicio, status)
+    return wrapper
+
+
+def instrument_client(servico):
+    """
+    Decorator de classe: mede cada método público do cliente como '<servico>.<método>'
+    no perfil da requisição e nas métricas (latência e contagem pelo 'status' do resultado).
+    Ficam de fora validações puras (validate_*), estatísticas e geradores (stream_*),
+    cujo tempo é gasto depois, durante o streaming da resposta.
+    """
+    def decorator(cls):
+        for nome, metodo in list(vars(cls).items()):
+            if (nome.startswith('_') or nome.startswith('validate_') or nome == 'http_stats'
+                    or not inspect.isfunction(metodo) or inspect.isgeneratorfunction(metodo)
+                    or inspect.isasyncgenfunction(metodo)):
+                continue
+            setattr(cls, nome, _cronometrar(servico, nome, metodo))
+        return cls
+    return decorator
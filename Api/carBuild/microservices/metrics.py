@@ -0,0 +1,260 @@
+"""
+Métricas do gateway no formato texto do Prometheus
+Responsável por: registro em processo de contadores, gauges e histogramas
+com buckets fixos, expostos em GET /api/metrics/
+
+Cada métrica guarda uma série por combinação de labels, protegida por um lock
+próprio: no caminho quente uma atualização é uma busca em dicionário e uma
+soma (o histograma acha o bucket com bisect). Nada é agregado entre processos;
+com vários workers, o Prometheus coleta cada um e soma as séries.
+"""
+
+import bisect
+import math
+import threading
+
+# Latências em segundos (mesmos buckets padrão dos clientes oficiais do Prometheus)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escapar_label(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return '+Inf'
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def _formatar_labels(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar_label(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Metric:
+    """Base: nome, ajuda, nomes dos labels e as séries por tupla de valores"""
+
+    tipo = 'untyped'
+
+    def __init__(self, nome, ajuda, labels=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _serie_vazia(self):
+        return 0
+
+    def _chave(self, labels):
+        if len(labels) != len(self.labels):
+            raise ValueError(f'{self.nome} espera os labels {self.labels}, recebeu {tuple(labels)}')
+        return tuple(str(labels[nome]) for nome in self.labels)
+
+    def _amostras(self):
+        """Pares (sufixo, valores dos labels, label extra, valor) para a exposição"""
+        with self._lock:
+            series = list(self._series.items())
+        return [('', chave, None, valor) for chave, valor in series]
+
+    def valor(self, **labels):
+        """Valor atual de uma série (usado nos testes e no diagnóstico)"""
+        with self._lock:
+            return self._series.get(self._chave(labels), 0)
+
+    def render(self):
+        linhas = [
+            f'# HELP {self.nome} {self.ajuda}',
+            f'# TYPE {self.nome} {self.tipo}',
+        ]
+        for sufixo, chave, extra, valor in self._amostras():
+            linhas.append(
+                f'{self.nome}{sufixo}{_formatar_labels(self.labels, chave, extra)} {_formatar_valor(valor)}'
+            )
+        return '\n'.join(linhas)
+
+    def reset(self):
+        # Sem labels, a série única aparece zerada desde o início
+        with self._lock:
+            self._series.clear()
+            if not self.labels:
+                self._series[()] = self._serie_vazia()
+
+
+class Counter(Metric):
+    """Só cresce; o Prometheus calcula taxas com rate()"""
+
+    tipo = 'counter'
+
+    def inc(self, valor=1, **labels):
+        if valor < 0:
+            raise ValueError('Counter só pode ser incrementado')
+        chave = self._chave(labels)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+
+class Gauge(Metric):
+    """
+    Valor que sobe e desce. Com `funcao`, o valor é lido na coleta:
+    a função devolve {tupla de valores dos labels: valor}.
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, labels=(), funcao=None):
+        super().__init__(nome, ajuda, labels)
+        self.funcao = funcao
+
+    def set(self, valor, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            self._series[chave] = valor
+
+    def inc(self, valor=1, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def dec(self, valor=1, **labels):
+        self.inc(-valor, **labels)
+
+    def _amostras(self):
+        if self.funcao is None:
+            return super()._amostras()
+        return [('', tuple(map(str, chave)), None, valor) for chave, valor in self.funcao().items()]
+
+
+class Histogram(Metric):
+    """Distribuição em buckets fixos (limites superiores), mais soma e contagem"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, labels=(), buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(nome, ajuda, labels)
+
+    def _serie_vazia(self):
+        # contagens por bucket (a última é o +Inf), soma, total
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, valor, **labels):
+        chave = self._chave(labels)
+        # bisect_left: o valor igual ao limite conta no próprio bucket (le = "menor ou igual")
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = self._serie_vazia()
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def valor(self, **labels):
+        """(total de observações, soma) de uma série"""
+        with self._lock:
+            serie = self._series.get(self._chave(labels))
+            return (serie[2], serie[1]) if serie else (0, 0.0)
+
+    def _amostras(self):
+        with self._lock:
+            series = [(chave, list(contagens), soma, total) for chave, (contagens, soma, total) in self._series.items()]
+        amostras = []
+        for chave, contagens, soma, total in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (math.inf,), contagens):
+                acumulado += contagem
+                amostras.append(('_bucket', chave, f'le="{_formatar_valor(float(limite))}"', acumulado))
+            amostras.append(('_sum', chave, None, soma))
+            amostras.append(('_count', chave, None, total))
+        return amostras
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, na ordem de registro"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def register(self, metrica):
+        with self._lock:
+            if metrica.nome in self._metricas:
+                raise ValueError(f'Métrica {metrica.nome} já registrada')
+            self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def counter(self, nome, ajuda, labels=()):
+        return self.register(Counter(nome, ajuda, labels))
+
+    def gauge(self, nome, ajuda, labels=(), funcao=None):
+        return self.register(Gauge(nome, ajuda, labels, funcao))
+
+    def histogram(self, nome, ajuda, labels=(), buckets=BUCKETS_LATENCIA):
+        return self.register(Histogram(nome, ajuda, labels, buckets))
+
+    def render(self):
+        """Exposição completa no formato texto 0.0.4"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return '\n'.join(metrica.render() for metrica in metricas) + '\n'
+
+    def reset(self):
+        """Zera todas as séries (testes)"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            metrica.reset()
+
+
+registry = MetricsRegistry()
+
+
+# ========== MÉTRICAS DO GATEWAY ==========
+
+REQUISICOES_HTTP = registry.counter(
+    'carbuild_http_requests_total',
+    'Requisições atendidas pelo gateway, por view, método e status HTTP',
+    ('view', 'method', 'status'),
+)
+DURACAO_REQUISICAO = registry.histogram(
+    'carbuild_http_request_duration_seconds',
+    'Tempo total de cada requisição no gateway, por view',
+    ('view',),
+)
+REQUISICOES_EM_ANDAMENTO = registry.gauge(
+    'carbuild_http_requests_in_progress',
+    'Requisições sendo atendidas neste processo',
+)
+
+# ========== MÉTRICAS DOS CLIENTES DOS MICROSSERVIÇOS ==========
+
+CHAMADAS_CLIENTE = registry.counter(
+    'carbuild_client_calls_total',
+    "Chamadas aos clientes dos microsserviços, pelo campo 'status' do resultado "
+    "(success, error ou exception quando o método levanta)",
+    ('service', 'method', 'status'),
+)
+DURACAO_CHAMADA_CLIENTE = registry.histogram(
+    'carbuild_client_call_duration_seconds',
+    'Latência de cada método dos clientes dos microsserviços',
+    ('service', 'method'),
+)
+
+# ========== MÉTRICAS DE NEGÓCIO ==========
+
+PEDIDOS_CRIADOS = registry.counter(
+    'carbuild_orders_created_total',
+    'Pedidos criados pelo gateway (unitários e em lote)',
+)
+TAMANHO_CARRINHO = registry.histogram(
+    'carbuild_cart_items',
+    'Itens por carrinho enviado para cálculo de preço',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250, 500),
+)
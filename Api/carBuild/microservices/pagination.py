@@ -0,0 +1,134 @@
+"""
+Paginação por cursor (keyset)
+Responsável por: cursores opacos, páginas ordenadas por id (catálogo) ou por
+data decrescente (pedidos) e streaming NDJSON
+"""
+
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou adulterado"""
+
+
+def _encode(payload):
+    payload = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def _decode(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+
+def encode_cursor(last_id):
+    """Cursor opaco a partir do último id entregue"""
+    return _encode({'id': last_id})
+
+
+def decode_cursor(cursor):
+    """Último id entregue a partir do cursor opaco"""
+    try:
+        last_id = int(_decode(cursor)['id'])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise InvalidCursor(f'Cursor inválido: {cursor}')
+    return last_id
+
+
+def encode_date_cursor(last_date, last_id):
+    """Cursor opaco a partir da data e do id da última linha entregue"""
+    return _encode({'d': last_date.isoformat(), 'id': last_id})
+
+
+def decode_date_cursor(cursor):
+    """(data, id) da última linha entregue a partir do cursor opaco"""
+    try:
+        payload = _decode(cursor)
+        last_date = parse_datetime(payload['d'])
+        last_id = int(payload['id'])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise InvalidCursor(f'Cursor inválido: {cursor}')
+    if last_date is None:
+        raise InvalidCursor(f'Cursor inválido: {cursor}')
+    return last_date, last_id
+
+
+def parse_limit(limit):
+    """Tamanho da página, limitado a CATALOG_MAX_PAGE_SIZE"""
+    default = getattr(settings, 'CATALOG_PAGE_SIZE', 100)
+    maximum = getattr(settings, 'CATALOG_MAX_PAGE_SIZE', 1000)
+    if limit in (None, ''):
+        return default
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f'limit inválido: {limit}')
+    if limit <= 0:
+        raise ValueError('limit deve ser maior que 0')
+    return min(limit, maximum)
+
+
+def keyset_queryset(queryset, cursor=None, limit=None):
+    """Queryset (não avaliado) da página: uma linha extra indica se há próxima página"""
+    limit = parse_limit(limit)
+    queryset = queryset.order_by('id')
+    if cursor:
+        queryset = queryset.filter(id__gt=decode_cursor(cursor))
+    return queryset[:limit + 1]
+
+
+def paginate_queryset(queryset, cursor=None, limit=None):
+    """
+    Página keyset ordenada por id: WHERE id > último_id ORDER BY id LIMIT n+1.
+    Custo constante por página, independente da posição no catálogo.
+    Retorna (linhas, next_cursor); next_cursor é None na última página.
+    """
+    limit = parse_limit(limit)
+    rows = list(keyset_queryset(queryset, cursor, limit))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
+
+
+def date_keyset_queryset(queryset, field, cursor=None, limit=None):
+    """
+    Queryset (não avaliado) da página mais recente primeiro, por (field, id):
+    WHERE field <= d AND (field < d OR (field = d AND id < último_id))
+    ORDER BY field DESC, id DESC LIMIT n+1.
+    O "field <= d" redundante deixa o SQLite posicionar o índice (field, id)
+    direto no cursor; o id desempata linhas com a mesma data.
+    """
+    limit = parse_limit(limit)
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        last_date, last_id = decode_date_cursor(cursor)
+        queryset = queryset.filter(**{f'{field}__lte': last_date}).filter(
+            Q(**{f'{field}__lt': last_date}) | Q(**{field: last_date, 'id__lt': last_id})
+        )
+    return queryset[:limit + 1]
+
+
+def paginate_by_date(queryset, field, cursor=None, limit=None):
+    """
+    Página keyset por data decrescente (ver date_keyset_queryset).
+    Retorna (linhas, next_cursor); next_cursor é None na última página.
+    """
+    limit = parse_limit(limit)
+    rows = list(date_keyset_queryset(queryset, field, cursor, limit))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_date_cursor(getattr(rows[-1], field), rows[-1].id)
+    return rows, None
+
+
+def stream_queryset(queryset, serializer_class):
+    """Gera um dict serializado por linha, lendo o banco em blocos via iterator()"""
+    chunk_size = getattr(settings, 'CATALOG_STREAM_CHUNK_SIZE', 2000)
+    for obj in queryset.order_by('id').iterator(chunk_size=chunk_size):
+        yield serializer_class(obj).data
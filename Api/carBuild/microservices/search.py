@@ -0,0 +1,104 @@
+"""
+Busca textual de peças (Microsserviço A)
+Responsável por: busca por prefixo ranqueada sobre o índice FTS5 car_peca_fts e
+filtro por substring do nome sobre o índice trigram car_peca_trgm
+"""
+
+import re
+from django.db import OperationalError, connections, router
+from django.db.models.expressions import RawSQL
+from car.models import Peca, normalizar_texto
+
+# Peso das colunas no bm25: nome da peça pesa mais que o modelo do carro
+PESO_NOME = 10.0
+PESO_MODELO = 2.0
+
+_TERMO = re.compile(r'\w+', re.UNICODE)
+
+# O tokenizer trigram só indexa termos com 3 caracteres ou mais
+TRIGRAMA_MIN = 3
+
+# (alias, arquivo) -> car_peca_trgm existe (migração 0008; exige SQLite 3.34+)
+_trigram_disponivel = {}
+
+
+def termos_busca(query):
+    """Termos normalizados (sem caixa/acento) da consulta do usuário"""
+    return _TERMO.findall(normalizar_texto(query))
+
+
+def fts_match_expression(query):
+    """
+    Expressão MATCH do FTS5: cada termo vira uma busca por prefixo e todos
+    precisam casar ("pastilha fre" -> "pastilha"* "fre"*)
+    """
+    return ' '.join(f'"{termo}"*' for termo in termos_busca(query))
+
+
+def buscar_ids_fts(query, limit):
+    """Ids das peças em ordem de relevância (bm25; menor é melhor)"""
+    expressao = fts_match_expression(query)
+    if not expressao:
+        return []
+    # Mesmo banco das leituras de Peca (réplica, se car/routers.py a escolher)
+    with connections[router.db_for_read(Peca)].cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid FROM car_peca_fts
+            WHERE car_peca_fts MATCH %s
+            ORDER BY bm25(car_peca_fts, {PESO_NOME}, {PESO_MODELO}), rowid
+            LIMIT %s
+            """,
+            [expressao, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def buscar_pecas(query, limit):
+    """Peças (com carro carregado) em ordem de relevância"""
+    ids = None
+    # O índice só existe no SQLite (criado pela migração 0003_peca_fts)
+    if connections[router.db_for_read(Peca)].vendor == 'sqlite':
+        try:
+            ids = buscar_ids_fts(query, limit)
+        except OperationalError:
+            # SQLite sem FTS5 ou migração não aplicada
+            ids = None
+    if ids is None:
+        ids = buscar_ids_contains(query, limit)
+
+    pecas = Peca.objects.select_related('owner').in_bulk(ids)
+    return [pecas[peca_id] for peca_id in ids if peca_id in pecas]
+
+
+def buscar_ids_contains(query, limit):
+    """Alternativa sem FTS5: todos os termos como substring da coluna normalizada"""
+    queryset = Peca.objects.all()
+    for termo in termos_busca(query):
+        queryset = queryset.filter(nome_normalizado__contains=termo)
+    return list(queryset.order_by('id').values_list('id', flat=True)[:limit])
+
+
+def _tem_trigram(alias):
+    banco = connections[alias]
+    chave = (alias, str(banco.settings_dict['NAME']))
+    if chave not in _trigram_disponivel:
+        disponivel = False
+        if banco.vendor == 'sqlite':
+            with banco.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'car_peca_trgm'")
+                disponivel = cursor.fetchone() is not None
+        _trigram_disponivel[chave] = disponivel
+    return _trigram_disponivel[chave]
+
+
+def filtro_substring_nome(termo):
+    """
+    Subconsulta com os ids das peças cujo nome normalizado contém `termo`, pelo
+    índice trigram (uma frase de trigramas no MATCH equivale ao LIKE '%termo%').
+    None quando o índice não atende: termo curto ou banco sem car_peca_trgm.
+    """
+    if len(termo) < TRIGRAMA_MIN or not _tem_trigram(router.db_for_read(Peca)):
+        return None
+    frase = '"' + termo.replace('"', '""') + '"'
+    return RawSQL('SELECT rowid FROM car_peca_trgm WHERE car_peca_trgm MATCH %s', [frase])
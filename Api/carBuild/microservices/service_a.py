@@ -3,19 +3,25 @@ Microsserviço A - Gerenciamento de Banco de Dados
 Responsável por: Carros, Peças, operações CRUD no banco
 """
 
-import requests
 from django.conf import settings
+from django.db import connection
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
-from car.models import Car, Peca
+from car.models import Car, Peca, normalizar_texto
 from car.serializers import CarSerializer, PecaSerializer
+from .cache import catalog_cache, cached_catalog
+from .http_client import ServiceSession, resposta_erro
+from .instrumentation import instrument_client
+from .pagination import decode_cursor, paginate_queryset, parse_limit, stream_queryset
+from .search import buscar_pecas, filtro_substring_nome
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+@instrument_client('service_a')
 class MicroserviceAClient:
     """Cliente para comunicação com Microsserviço A (Banco de Dados)"""
     
@@ -24,32 +30,46 @@ class MicroserviceAClient:
         # Em produção, seria uma URL externa como http://microservice-a:8001
         self.base_url = getattr(settings, 'MICROSERVICE_A_URL', 'internal')
         
-    def get_cars(self):
-        """Buscar todos os carros"""
+        # Sessão HTTP com pool keep-alive, timeouts e retries (modo externo)
+        self.http = ServiceSession(self.base_url, name='service_a')
+        
+        # Cache de leitura do catálogo (invalidado por sinais em car.signals)
+        self.cache = catalog_cache
+        
+    @cached_catalog
+    def get_cars(self, cursor=None, limit=None):
+        """Buscar carros, paginados por cursor (ordem de id)"""
         try:
             if self.base_url == 'internal':
                 # Simulando chamada interna
-                cars = Car.objects.all()
+                cars, next_cursor = paginate_queryset(Car.objects.all(), cursor, limit)
                 serializer = CarSerializer(cars, many=True)
                 return {
                     'status': 'success',
                     'data': serializer.data,
-                    'count': len(serializer.data)
+                    'count': len(serializer.data),
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
                 }
             else:
                 # Chamada HTTP real para microsserviço externo
-                response = requests.get(f"{self.base_url}/cars/", timeout=10)
+                params = self._parametros_paginacao(cursor, limit)
+                response = self.http.get("/cars/", params=params)
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao buscar carros: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e),
-                'data': []
-            }
+            return resposta_erro(e, data=[])
     
+    def stream_cars(self):
+        """Gera todos os carros, um dict por vez, sem materializar a tabela"""
+        if self.base_url == 'internal':
+            yield from stream_queryset(Car.objects.all(), CarSerializer)
+        else:
+            yield from self._stream_externo('/cars/', {})
+    
+    @cached_catalog
     def get_car_by_id(self, car_id):
         """Buscar carro por ID"""
         try:
@@ -61,23 +81,21 @@ class MicroserviceAClient:
                     'data': serializer.data
                 }
             else:
-                response = requests.get(f"{self.base_url}/cars/{car_id}/", timeout=10)
+                response = self.http.get(f"/cars/{car_id}/")
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao buscar carro {car_id}: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e)
-            }
+            return resposta_erro(e)
     
+    @cached_catalog
     def get_car_parts(self, car_id):
         """Buscar peças de um carro específico"""
         try:
             if self.base_url == 'internal':
                 car = get_object_or_404(Car, id=car_id)
-                parts = car.pecas.all()
+                parts = car.pecas.select_related('owner')
                 serializer = PecaSerializer(parts, many=True)
                 return {
                     'status': 'success',
@@ -86,55 +104,149 @@ class MicroserviceAClient:
                     'count': len(serializer.data)
                 }
             else:
-                response = requests.get(f"{self.base_url}/cars/{car_id}/parts/", timeout=10)
+                response = self.http.get(f"/cars/{car_id}/parts/")
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao buscar peças do carro {car_id}: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e),
-                'data': []
-            }
+            return resposta_erro(e, data=[])
+    
+    def get_parts(self, filters=None, cursor=None, limit=None):
+        """Buscar peças com filtros opcionais, paginadas por cursor (ordem de id)"""
+        return self._get_parts(self._normalizar_filtros(filters), cursor, limit)
+    
+    def stream_parts(self, filters=None):
+        """Gera as peças filtradas, um dict por vez, sem materializar a tabela"""
+        filters = self._normalizar_filtros(filters)
+        if self.base_url == 'internal':
+            yield from stream_queryset(self._filtrar_pecas(filters), PecaSerializer)
+        else:
+            yield from self._stream_externo('/parts/', filters)
+    
+    def _normalizar_filtros(self, filters):
+        """
+        Remove filtros vazios e espaços nas pontas, para que consultas
+        equivalentes compartilhem a mesma entrada de cache
+        """
+        normalizados = {}
+        for chave, valor in (filters or {}).items():
+            if valor is None:
+                continue
+            valor = str(valor).strip()
+            if valor:
+                normalizados[chave] = valor
+        return normalizados
+    
+    def _filtrar_pecas(self, filters):
+        """Queryset de peças com os filtros do gateway aplicados"""
+        queryset = Peca.objects.select_related('owner')
+        
+        if filters:
+            if filters.get('nome'):
+                # Busca por substring na coluna normalizada (sem caixa/acento), pelo
+                # índice trigram car_peca_trgm. Termos curtos (ou SQLite sem trigram)
+                # varrem só o índice car_peca_nome_norm_idx (covering index)
+                termo = normalizar_texto(filters['nome'])
+                ids = filtro_substring_nome(termo)
+                if ids is None:
+                    ids = Peca.objects.filter(nome_normalizado__contains=termo).values('id')
+                queryset = queryset.filter(id__in=ids)
+            faixa = {}
+            if filters.get('min_valor'):
+                faixa['valor__gte'] = filters['min_valor']
+            if filters.get('max_valor'):
+                faixa['valor__lte'] = filters['max_valor']
+            if filters.get('car_id'):
+                # Índice car_peca_owner_valor_idx cobre dono + faixa de preço
+                queryset = queryset.filter(owner_id=filters['car_id'], **faixa)
+            elif faixa:
+                # Sem dono, a faixa (mesmo de um lado só) vai por car_peca_valor_idx; filtrada
+                # direto, o SQLite prefere percorrer car_peca inteira na ordem do id
+                queryset = queryset.filter(id__in=Peca.objects.filter(**faixa).values('id'))
+        
+        return queryset
     
-    def get_parts(self, filters=None):
-        """Buscar peças com filtros opcionais"""
+    @cached_catalog
+    def _get_parts(self, filters, cursor=None, limit=None):
         try:
             if self.base_url == 'internal':
-                queryset = Peca.objects.all()
-                
-                if filters:
-                    if filters.get('nome'):
-                        queryset = queryset.filter(nome__icontains=filters['nome'])
-                    if filters.get('car_id'):
-                        queryset = queryset.filter(owner_id=filters['car_id'])
-                    if filters.get('min_valor'):
-                        queryset = queryset.filter(valor__gte=filters['min_valor'])
-                    if filters.get('max_valor'):
-                        queryset = queryset.filter(valor__lte=filters['max_valor'])
-                
-                serializer = PecaSerializer(queryset, many=True)
+                pecas, next_cursor = paginate_queryset(self._filtrar_pecas(filters), cursor, limit)
+                serializer = PecaSerializer(pecas, many=True)
                 return {
                     'status': 'success',
                     'data': serializer.data,
                     'count': len(serializer.data),
-                    'filters_applied': filters or {}
+                    'filters_applied': filters or {},
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
                 }
             else:
-                params = filters or {}
-                response = requests.get(f"{self.base_url}/parts/", params=params, timeout=10)
+                params = {**(filters or {}), **self._parametros_paginacao(cursor, limit)}
+                response = self.http.get("/parts/", params=params)
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao buscar peças: {str(e)}")
+            return resposta_erro(e, data=[])
+    
+    @cached_catalog
+    def search_parts(self, query, limit=None):
+        """Busca textual de peças por prefixo, ranqueada por relevância (FTS5)"""
+        try:
+            if self.base_url == 'internal':
+                pecas = buscar_pecas(query, parse_limit(limit))
+                serializer = PecaSerializer(pecas, many=True)
+                return {
+                    'status': 'success',
+                    'data': serializer.data,
+                    'count': len(serializer.data),
+                    'query': query
+                }
+            else:
+                params = {'q': query, **self._parametros_paginacao(None, limit)}
+                response = self.http.get("/search/parts/", params=params)
+                response.raise_for_status()
+                return response.json()
+                
+        except Exception as e:
+            logger.error(f"Erro na busca de peças '{query}': {str(e)}")
+            return resposta_erro(e, data=[])
+    
+    def validate_pagination(self, cursor=None, limit=None):
+        """Validar cursor e limit antes de consultar"""
+        try:
+            parse_limit(limit)
+            if cursor:
+                decode_cursor(cursor)
+            return {
+                'status': 'success',
+                'message': 'Paginação válida'
+            }
+        except ValueError as e:
             return {
                 'status': 'error',
-                'message': str(e),
-                'data': []
+                'message': str(e)
             }
     
+    def _parametros_paginacao(self, cursor, limit):
+        params = {}
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+        return params
+    
+    def _stream_externo(self, path, params):
+        """Repassa o NDJSON do microsserviço externo linha a linha"""
+        with self.http.get(path, params={**params, 'stream': 'ndjson'}, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
+    @cached_catalog
     def get_part_by_id(self, part_id):
         """Buscar peça por ID"""
         try:
@@ -146,16 +258,39 @@ class MicroserviceAClient:
                     'data': serializer.data
                 }
             else:
-                response = requests.get(f"{self.base_url}/parts/{part_id}/", timeout=10)
+                response = self.http.get(f"/parts/{part_id}/")
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao buscar peça {part_id}: {str(e)}")
+            return resposta_erro(e)
+
+    def ping(self):
+        """Verificação leve de disponibilidade para o health check (não consulta o catálogo)"""
+        try:
+            if self.base_url == 'internal':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            else:
+                timeout = getattr(settings, 'HEALTH_PROBE_TIMEOUT', 2)
+                response = self.http.head('/health/', retry=False, timeout=(timeout, timeout))
+                response.raise_for_status()
             return {
-                'status': 'error',
-                'message': str(e)
+                'status': 'success'
             }
+        except Exception as e:
+            logger.error(f"Erro no ping do Microsserviço A: {str(e)}")
+            return resposta_erro(e)
+
+    def cache_stats(self):
+        """Estatísticas do cache do catálogo"""
+        return self.cache.stats()
+
+    def http_stats(self):
+        """Estatísticas do pool HTTP do modo externo"""
+        return self.http.stats()
 
 # Instância global do cliente
 microservice_a = MicroserviceAClient()
\ No newline at end of file
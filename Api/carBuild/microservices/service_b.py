@@ -3,19 +3,26 @@ Microsserviço B - Cálculos e Pedidos
 Responsável por: Cálculo de preços, geração de IDs únicos, relatórios de pedidos
 """
 
-import requests
-import uuid
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from car.models import Pedido, ItemPedido, Peca
-from car.serializers import PedidoSerializer, ItemPedidoSerializer
+from car.order_ids import reservar_ids_pedido, validar_id_reservado
+from car.routers import primario
+from car.serializers import PedidoSerializer, ItemPedidoSerializer, PedidoListSerializer
+from .http_client import ServiceSession, resposta_erro
+from .instrumentation import instrument_client
+from .pagination import decode_date_cursor, paginate_by_date, parse_limit
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+@instrument_client('service_b')
 class MicroserviceBClient:
     """Cliente para comunicação com Microsserviço B (Cálculos e Pedidos)"""
     
@@ -24,9 +31,15 @@ class MicroserviceBClient:
         # Em produção, seria uma URL externa como http://microservice-b:8002
         self.base_url = getattr(settings, 'MICROSERVICE_B_URL', 'internal')
         
+        # Sessão HTTP com pool keep-alive, timeouts e retries (modo externo)
+        self.http = ServiceSession(self.base_url, name='service_b')
+        
         # Configurações de negócio
         self.frete_gratis_valor = getattr(settings, 'FRETE_GRATIS_VALOR', 200)
         self.valor_frete = getattr(settings, 'VALOR_FRETE', 25)
+        self.batch_max_orders = getattr(settings, 'ORDERS_BATCH_MAX', 500)
+        self.order_id_block_max = getattr(settings, 'ORDER_ID_BLOCK_MAX', 1000)
+        self.order_id_ttl = getattr(settings, 'ORDER_ID_RESERVATION_TTL', 86400)
         
     def calculate_price(self, items_data):
         """
@@ -35,28 +48,31 @@ class MicroserviceBClient:
         """
         try:
             if self.base_url == 'internal':
+                linhas = self._agrupar_itens(items_data)
+                
+                # Uma única consulta para todas as peças do carrinho; no principal,
+                # como em create_order, para o preço cotado ser o preço cobrado
+                with primario():
+                    pecas = Peca.objects.in_bulk(list(linhas.keys()))
+                faltantes = [peca_id for peca_id in linhas if peca_id not in pecas]
+                if faltantes:
+                    return self._erro_pecas_faltantes(faltantes)
+                
                 total_subtotal = Decimal('0.00')
                 items_details = []
                 
-                for item in items_data:
-                    try:
-                        peca = Peca.objects.get(id=item['peca_id'])
-                        quantidade = int(item['quantidade'])
-                        subtotal = peca.valor * quantidade
-                        total_subtotal += subtotal
-                        
-                        items_details.append({
-                            'peca_id': peca.id,
-                            'peca_nome': peca.nome,
-                            'peca_valor': float(peca.valor),
-                            'quantidade': quantidade,
-                            'subtotal': float(subtotal)
-                        })
-                    except Peca.DoesNotExist:
-                        return {
-                            'status': 'error',
-                            'message': f'Peça com ID {item["peca_id"]} não encontrada'
-                        }
+                for peca_id, quantidade in linhas.items():
+                    peca = pecas[peca_id]
+                    subtotal = peca.valor * quantidade
+                    total_subtotal += subtotal
+                    
+                    items_details.append({
+                        'peca_id': peca.id,
+                        'peca_nome': peca.nome,
+                        'peca_valor': float(peca.valor),
+                        'quantidade': quantidade,
+                        'subtotal': float(subtotal)
+                    })
                 
                 # Calcular frete
                 frete = Decimal('0.00') if total_subtotal >= self.frete_gratis_valor else Decimal(str(self.valor_frete))
@@ -74,73 +90,136 @@ class MicroserviceBClient:
                 }
             else:
                 # Chamada HTTP real para microsserviço externo
-                response = requests.post(
-                    f"{self.base_url}/calculate-price/",
+                # Cálculo sem efeito colateral: pode ser repetido com segurança
+                response = self.http.post(
+                    "/calculate-price/",
                     json={'items': items_data},
-                    timeout=10
+                    idempotent=True
                 )
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao calcular preço: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e)
-            }
+            return resposta_erro(e)
     
-    def generate_order_id(self):
-        """Gerar ID único para pedido"""
+    def _agrupar_itens(self, items_data):
+        """
+        Normaliza os itens do carrinho em {peca_id: quantidade}, somando as
+        quantidades de linhas repetidas e preservando a ordem de chegada
+        """
+        linhas = {}
+        for item in items_data:
+            peca_id = int(item['peca_id'])
+            linhas[peca_id] = linhas.get(peca_id, 0) + int(item['quantidade'])
+        return linhas
+    
+    def _erro_id_em_uso(self, ids):
+        """Resposta de erro para IDs reservados já usados por outro pedido"""
+        return {
+            'status': 'error',
+            'message': f"id_unico já utilizado: {', '.join(str(id_unico) for id_unico in ids)}",
+            'duplicate_ids': [str(id_unico) for id_unico in ids]
+        }
+    
+    def _erro_pecas_faltantes(self, faltantes):
+        """Resposta de erro listando todas as peças inexistentes de uma vez"""
+        if len(faltantes) == 1:
+            message = f'Peça com ID {faltantes[0]} não encontrada'
+        else:
+            ids = ', '.join(str(peca_id) for peca_id in faltantes)
+            message = f'Peças com IDs {ids} não encontradas'
+        return {
+            'status': 'error',
+            'message': message,
+            'missing_ids': faltantes
+        }
+    
+    def generate_order_id(self, count=1):
+        """
+        Reservar IDs únicos para pedidos (UUIDv7 assinados, ver car.order_ids)
+        count: quantidade de IDs reservados de uma vez; qualquer um deles pode
+        ser enviado depois como id_unico em create_order/create_orders_bulk
+        """
         try:
             if self.base_url == 'internal':
-                # Gerar UUID único
-                order_id = str(uuid.uuid4())
+                order_ids = [str(order_id) for order_id in reservar_ids_pedido(count)]
+                generated_at = datetime.now()
                 return {
                     'status': 'success',
                     'data': {
-                        'order_id': order_id,
-                        'generated_at': datetime.now().isoformat()
+                        'order_id': order_ids[0],
+                        'order_ids': order_ids,
+                        'generated_at': generated_at.isoformat(),
+                        'expires_at': (generated_at + timedelta(seconds=self.order_id_ttl)).isoformat()
                     }
                 }
             else:
-                response = requests.post(f"{self.base_url}/generate-order-id/", timeout=10)
+                response = self.http.post("/generate-order-id/", json={'count': count})
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao gerar ID do pedido: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e)
-            }
+            return resposta_erro(e)
     
     def create_order(self, order_data):
         """
         Criar pedido completo
         order_data: {
             'items': [{'peca_id': 1, 'quantidade': 2}],
-            'valor_total': 150.00
+            'valor_total': 150.00,
+            'id_unico': '...'  # opcional: ID reservado em generate_order_id
         }
         """
         try:
             if self.base_url == 'internal':
-                # Criar pedido
-                pedido = Pedido.objects.create()
+                id_unico = None
+                if order_data.get('id_unico'):
+                    try:
+                        id_unico = validar_id_reservado(order_data['id_unico'])
+                    except ValueError as e:
+                        return {
+                            'status': 'error',
+                            'message': str(e)
+                        }
+                
+                # Buscar todas as peças do pedido em uma única consulta
+                peca_ids = {int(item_data['peca_id']) for item_data in order_data['items']}
+                # No principal: a réplica pode não ter peças novas ou preços atualizados
+                with primario():
+                    pecas = Peca.objects.in_bulk(list(peca_ids))
+                faltantes = sorted(peca_ids - pecas.keys())
+                if faltantes:
+                    return self._erro_pecas_faltantes(faltantes)
                 
-                # Adicionar itens
-                for item_data in order_data['items']:
-                    peca = Peca.objects.get(id=item_data['peca_id'])
-                    ItemPedido.objects.create(
-                        pedido=pedido,
-                        peca=peca,
-                        quantidade=item_data['quantidade']
-                    )
+                # Preço congelado no item no momento do pedido
+                itens = [
+                    ItemPedido(
+                        peca=pecas[int(item_data['peca_id'])],
+                        quantidade=int(item_data['quantidade'])
+                    ).congelar_valores()
+                    for item_data in order_data['items']
+                ]
                 
-                # Calcular total
-                pedido.calcular_total()
+                # Total calculado em memória, gravado junto com o pedido
+                pedido = Pedido(valor_total=sum((item.subtotal for item in itens), Decimal('0.00')))
+                if id_unico is not None:
+                    pedido.id_unico = id_unico
+                try:
+                    with transaction.atomic():
+                        pedido.save()
+                        for item in itens:
+                            item.pedido = pedido
+                        ItemPedido.objects.bulk_create(itens)
+                except IntegrityError:
+                    # Único índice único envolvido é o de id_unico
+                    if id_unico is None:
+                        raise
+                    return self._erro_id_em_uso([id_unico])
                 
-                # Gerar relatório
-                relatorio = pedido.gerar_relatorio()
+                # Relatório montado a partir dos mesmos objetos, sem reconsultar
+                relatorio = pedido.gerar_relatorio(itens)
                 
                 return {
                     'status': 'success',
@@ -152,27 +231,152 @@ class MicroserviceBClient:
                     }
                 }
             else:
-                response = requests.post(
-                    f"{self.base_url}/create-order/",
-                    json=order_data,
-                    timeout=10
-                )
+                response = self.http.post("/create-order/", json=order_data)
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao criar pedido: {str(e)}")
-            return {
-                'status': 'error',
-                'message': str(e)
-            }
+            return resposta_erro(e)
+    
+    def create_orders_bulk(self, orders_data):
+        """
+        Criar vários pedidos de uma vez
+        orders_data: [{'items': [{'peca_id': 1, 'quantidade': 2}], 'id_unico': opcional}, ...]
+        
+        Todos os pedidos são validados antes de gravar, com uma única consulta
+        de peças para o lote inteiro. Pedidos inválidos voltam com o erro na
+        sua posição (results[i]) e não impedem os demais, que são gravados com
+        dois INSERTs em lote (pedidos e itens) na mesma transação. Um id reservado
+        gravado por outra requisição no meio do lote só derruba o próprio pedido.
+        """
+        try:
+            if self.base_url == 'internal':
+                resultados = [None] * len(orders_data)
+                validos = []
+                for indice, order_data in enumerate(orders_data):
+                    validation = self.validate_order_data(order_data) if isinstance(order_data, dict) else {
+                        'status': 'error',
+                        'message': 'Pedido deve ser um objeto'
+                    }
+                    if validation['status'] == 'success':
+                        try:
+                            linhas = [
+                                (int(item_data['peca_id']), int(item_data['quantidade']))
+                                for item_data in order_data['items']
+                            ]
+                        except (TypeError, ValueError):
+                            validation = {
+                                'status': 'error',
+                                'message': 'peca_id e quantidade devem ser inteiros'
+                            }
+                    id_unico = None
+                    if validation['status'] == 'success' and order_data.get('id_unico'):
+                        try:
+                            id_unico = validar_id_reservado(order_data['id_unico'])
+                        except ValueError as e:
+                            validation = {
+                                'status': 'error',
+                                'message': str(e)
+                            }
+                    if validation['status'] != 'success':
+                        resultados[indice] = {'index': indice, **validation}
+                    else:
+                        validos.append((indice, linhas, id_unico))
+                
+                # IDs reservados repetidos no lote ou já usados (consulta só se houver algum)
+                reservados = [id_unico for _, _, id_unico in validos if id_unico is not None]
+                reservados_lote = set(reservados)
+                em_uso = set()
+                if reservados:
+                    em_uso = set(Pedido.objects.filter(id_unico__in=reservados).values_list('id_unico', flat=True))
+                
+                # Uma única consulta para as peças de todos os pedidos
+                peca_ids = {peca_id for _, linhas, _ in validos for peca_id, _ in linhas}
+                with primario():
+                    pecas = Peca.objects.in_bulk(list(peca_ids))
+                
+                novos = []
+                for indice, linhas, id_unico in validos:
+                    if id_unico is not None:
+                        if id_unico in em_uso:
+                            resultados[indice] = {'index': indice, **self._erro_id_em_uso([id_unico])}
+                            continue
+                        em_uso.add(id_unico)
+                    faltantes = sorted({peca_id for peca_id, _ in linhas} - pecas.keys())
+                    if faltantes:
+                        resultados[indice] = {'index': indice, **self._erro_pecas_faltantes(faltantes)}
+                        continue
+                    itens = [
+                        ItemPedido(peca=pecas[peca_id], quantidade=quantidade).congelar_valores()
+                        for peca_id, quantidade in linhas
+                    ]
+                    pedido = Pedido(valor_total=sum((item.subtotal for item in itens), Decimal('0.00')))
+                    if id_unico is not None:
+                        pedido.id_unico = id_unico
+                    novos.append((indice, pedido, itens))
+                
+                while novos:
+                    try:
+                        with transaction.atomic():
+                            # bulk_create preenche os ids (RETURNING), usados pelos itens
+                            Pedido.objects.bulk_create([pedido for _, pedido, _ in novos])
+                            todos_itens = []
+                            for _, pedido, itens in novos:
+                                for item in itens:
+                                    item.pedido = pedido
+                                todos_itens.extend(itens)
+                            ItemPedido.objects.bulk_create(todos_itens)
+                        break
+                    except IntegrityError:
+                        # Outra requisição gravou um id reservado do lote depois da checagem
+                        # em em_uso: só esses pedidos falham, o resto é gravado de novo
+                        reservados = [pedido.id_unico for _, pedido, _ in novos if pedido.id_unico in reservados_lote]
+                        em_uso = set(Pedido.objects.filter(id_unico__in=reservados).values_list('id_unico', flat=True))
+                        if not em_uso:
+                            raise
+                        for indice, pedido, _ in novos:
+                            if pedido.id_unico in em_uso:
+                                resultados[indice] = {'index': indice, **self._erro_id_em_uso([pedido.id_unico])}
+                        novos = [novo for novo in novos if novo[1].id_unico not in em_uso]
+                        for _, pedido, _ in novos:
+                            # Ids de um INSERT anterior ao que falhou foram desfeitos pelo rollback
+                            pedido.pk = None
+                
+                for indice, pedido, itens in novos:
+                    resultados[indice] = {
+                        'index': indice,
+                        'status': 'success',
+                        'pedido_id': str(pedido.id_unico),
+                        'valor_total': float(pedido.valor_total),
+                        'data_pedido': pedido.data_pedido.isoformat(),
+                        'total_itens': len(itens)
+                    }
+                
+                return {
+                    'status': 'success' if novos else 'error',
+                    'message': f'{len(novos)} de {len(orders_data)} pedidos criados',
+                    'data': {
+                        'created': len(novos),
+                        'failed': len(orders_data) - len(novos),
+                        'results': resultados
+                    }
+                }
+            else:
+                response = self.http.post("/create-orders-bulk/", json={'orders': orders_data})
+                response.raise_for_status()
+                return response.json()
+                
+        except Exception as e:
+            logger.error(f"Erro ao criar pedidos em lote: {str(e)}")
+            return resposta_erro(e)
     
     def get_order_report(self, order_id):
         """Gerar relatório de um pedido específico"""
         try:
             if self.base_url == 'internal':
                 try:
-                    pedido = Pedido.objects.get(id_unico=order_id)
+                    pedido = Pedido.objects.com_itens_relatorio().get(id_unico=order_id)
                     relatorio = pedido.gerar_relatorio()
                     
                     return {
@@ -185,16 +389,163 @@ class MicroserviceBClient:
                         'message': f'Pedido {order_id} não encontrado'
                     }
             else:
-                response = requests.get(f"{self.base_url}/orders/{order_id}/report/", timeout=10)
+                response = self.http.get(f"/orders/{order_id}/report/")
                 response.raise_for_status()
                 return response.json()
                 
         except Exception as e:
             logger.error(f"Erro ao gerar relatório do pedido {order_id}: {str(e)}")
+            return resposta_erro(e)
+    
+    def list_orders(self, filters=None, cursor=None, limit=None):
+        """
+        Listar pedidos, mais recentes primeiro, paginados por cursor em (data_pedido, id)
+        filters: data_inicio, data_fim (AAAA-MM-DD ou ISO 8601), min_valor, max_valor
+        total_itens e quantidade_total vêm na mesma consulta da página
+        """
+        try:
+            if self.base_url == 'internal':
+                queryset = self._filtrar_pedidos(filters).com_totais_itens()
+                pedidos, next_cursor = paginate_by_date(queryset, 'data_pedido', cursor, limit)
+                serializer = PedidoListSerializer(pedidos, many=True)
+                return {
+                    'status': 'success',
+                    'data': serializer.data,
+                    'count': len(serializer.data),
+                    'filters_applied': filters or {},
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+            else:
+                params = dict(filters or {})
+                if cursor:
+                    params['cursor'] = cursor
+                if limit:
+                    params['limit'] = limit
+                response = self.http.get("/orders/", params=params)
+                response.raise_for_status()
+                return response.json()
+                
+        except Exception as e:
+            logger.error(f"Erro ao listar pedidos: {str(e)}")
+            return resposta_erro(e, data=[])
+    
+    def _data_filtro(self, valor, fim=False):
+        """
+        Converte o filtro de data em (datetime, inclusivo). Uma data sem hora
+        cobre o dia inteiro: data_fim=2025-01-31 vira data_pedido < 2025-02-01.
+        Comparar o datetime direto (sem __date) mantém o uso do índice.
+        """
+        # parse_date primeiro: parse_datetime também aceita AAAA-MM-DD (como meia-noite)
+        dia = parse_date(valor)
+        inclusivo = True
+        if dia is not None:
+            if fim:
+                dia += timedelta(days=1)
+                inclusivo = False
+            momento = datetime.combine(dia, datetime.min.time())
+        else:
+            momento = parse_datetime(valor)
+            if momento is None:
+                raise ValueError(f'Data inválida: {valor} (use AAAA-MM-DD ou ISO 8601)')
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        return momento, inclusivo
+    
+    def _filtrar_pedidos(self, filters):
+        """Queryset de pedidos com os filtros da listagem aplicados"""
+        queryset = Pedido.objects.all()
+        
+        if filters:
+            if filters.get('data_inicio'):
+                inicio, _ = self._data_filtro(filters['data_inicio'])
+                queryset = queryset.filter(data_pedido__gte=inicio)
+            if filters.get('data_fim'):
+                fim, inclusivo = self._data_filtro(filters['data_fim'], fim=True)
+                lookup = 'data_pedido__lte' if inclusivo else 'data_pedido__lt'
+                queryset = queryset.filter(**{lookup: fim})
+            if filters.get('min_valor'):
+                queryset = queryset.filter(valor_total__gte=filters['min_valor'])
+            if filters.get('max_valor'):
+                queryset = queryset.filter(valor_total__lte=filters['max_valor'])
+        
+        return queryset
+    
+    def validate_order_list(self, filters=None, cursor=None, limit=None):
+        """Validar filtros, cursor e limit da listagem; devolve os filtros não vazios"""
+        normalizados = {
+            chave: str(valor).strip() for chave, valor in (filters or {}).items()
+            if valor is not None and str(valor).strip()
+        }
+        try:
+            for chave in ('data_inicio', 'data_fim'):
+                if chave in normalizados:
+                    self._data_filtro(normalizados[chave])
+            for chave in ('min_valor', 'max_valor'):
+                if chave in normalizados:
+                    try:
+                        valor = Decimal(normalizados[chave])
+                    except ArithmeticError:
+                        raise ValueError(f'{chave} deve ser um número')
+                    if not valor.is_finite():
+                        # NaN/Infinity passam no Decimal() mas quebram a consulta
+                        raise ValueError(f'{chave} deve ser um número finito')
+            parse_limit(limit)
+            if cursor:
+                decode_date_cursor(cursor)
+        except ValueError as e:
             return {
                 'status': 'error',
                 'message': str(e)
             }
+        return {
+            'status': 'success',
+            'message': 'Filtros válidos',
+            'filters': normalizados
+        }
+    
+    def validate_order_id_count(self, count):
+        """Validar a quantidade de IDs pedida em generate_order_id"""
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            return {
+                'status': 'error',
+                'message': 'count deve ser um número inteiro'
+            }
+        if not 1 <= count <= self.order_id_block_max:
+            return {
+                'status': 'error',
+                'message': f'count deve estar entre 1 e {self.order_id_block_max}'
+            }
+        return {
+            'status': 'success',
+            'message': 'Quantidade válida',
+            'count': count
+        }
+    
+    def validate_orders_batch(self, batch_data):
+        """Validar o envelope do lote; cada pedido é validado em create_orders_bulk"""
+        orders = batch_data.get('orders')
+        if not orders:
+            return {
+                'status': 'error',
+                'message': 'Lista de pedidos é obrigatória'
+            }
+        if not isinstance(orders, list):
+            return {
+                'status': 'error',
+                'message': 'Orders deve ser uma lista'
+            }
+        if len(orders) > self.batch_max_orders:
+            return {
+                'status': 'error',
+                'message': f'Máximo de {self.batch_max_orders} pedidos por lote'
+            }
+        return {
+            'status': 'success',
+            'message': 'Lote válido'
+        }
     
     def validate_order_data(self, order_data):
         """Validar dados do pedido antes de criar"""
@@ -218,7 +569,16 @@ class MicroserviceBClient:
                         'message': 'Cada item deve ter peca_id e quantidade'
                     }
                 
-                if item['quantidade'] <= 0:
+                try:
+                    int(item['peca_id'])
+                    quantidade = int(item['quantidade'])
+                except (TypeError, ValueError):
+                    return {
+                        'status': 'error',
+                        'message': 'peca_id e quantidade devem ser inteiros'
+                    }
+                
+                if quantidade <= 0:
                     return {
                         'status': 'error',
                         'message': 'Quantidade deve ser maior que 0'
@@ -236,5 +596,27 @@ class MicroserviceBClient:
                 'message': str(e)
             }
 
+    def ping(self):
+        """Verificação leve de disponibilidade para o health check (não consulta o catálogo)"""
+        try:
+            if self.base_url == 'internal':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            else:
+                timeout = getattr(settings, 'HEALTH_PROBE_TIMEOUT', 2)
+                response = self.http.head('/health/', retry=False, timeout=(timeout, timeout))
+                response.raise_for_status()
+            return {
+                'status': 'success'
+            }
+        except Exception as e:
+            logger.error(f"Erro no ping do Microsserviço B: {str(e)}")
+            return resposta_erro(e)
+
+    def http_stats(self):
+        """Estatísticas do pool HTTP do modo externo"""
+        return self.http.stats()
+
 # Instância global do cliente
 microservice_b = MicroserviceBClient()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Microsserviço falso para testes e benchmarks do modo externo
+Responsável por: servidor HTTP local com latência e falhas configuráveis
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+RESPOSTA_PADRAO = {'status': 'success', 'data': [], 'count': 0}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog grande: o padrão (5) derruba conexões nos testes de carga
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Cliente que desistiu por timeout fecha a conexão no meio da resposta
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.stub._registrar_conexao()
+
+    def responder(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        path = urlsplit(self.path).path
+        stub._registrar_requisicao(self.command, self.path, body)
+
+        falha = stub._proxima_falha()
+        if falha == 'reset':
+            # Fecha a conexão sem responder (erro de rede para o cliente)
+            self.close_connection = True
+            return
+        if stub.delay:
+            time.sleep(stub.delay)
+
+        status_code, payload = (falha, {'status': 'error', 'message': 'falha injetada'}) if falha else \
+            stub.routes.get(path, (200, RESPOSTA_PADRAO))
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    do_GET = responder
+    do_HEAD = responder
+    do_POST = responder
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubMicroservice:
+    """
+    Servidor HTTP local que responde qualquer rota com RESPOSTA_PADRAO.
+
+    - delay: latência fixa em segundos antes de cada resposta
+    - routes: {'/cars/1/': (200, {...})} para respostas específicas por caminho
+    - fail_next(503, 'reset', ...): próximas requisições falham nessa ordem
+      ('reset' fecha a conexão sem resposta)
+
+    Registra as requisições recebidas (requests) e as conexões TCP aceitas
+    (connections), o que permite verificar retries e reuso de keep-alive.
+    """
+
+    def __init__(self, delay=0, routes=None, host='127.0.0.1', port=0):
+        self.delay = delay
+        self.routes = dict(routes or {})
+        self.requests = []
+        self.connections = 0
+        self._falhas = deque()
+        self._lock = threading.Lock()
+        self._server = StubServer((host, port), StubHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fail_next(self, *falhas):
+        with self._lock:
+            self._falhas.extend(falhas)
+
+    def _proxima_falha(self):
+        with self._lock:
+            return self._falhas.popleft() if self._falhas else None
+
+    def _registrar_conexao(self):
+        with self._lock:
+            self.connections += 1
+
+    def _registrar_requisicao(self, method, path, body):
+        with self._lock:
+            self.requests.append((method, path, body))
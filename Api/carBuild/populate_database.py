@@ -9,6 +9,7 @@ Uso:
 Opções:
 - --clear: Limpa dados existentes antes de popular
 - --cars-only: Popula apenas carros e peças (sem pedidos)
+- --scale [...]: Dados sintéticos em volume (repassado a `manage.py populate_db --scale`)
 """
 
 import os
@@ -23,6 +24,7 @@ django.setup()
 
 # Importar modelos após configurar Django
 from car.models import Car, Peca, Pedido, ItemPedido
+from django.core.management import call_command
 from django.db import transaction
 
 def limpar_dados():
@@ -233,6 +235,11 @@ def main():
     """Função principal"""
     print('🚀 Iniciando população do banco de dados...\n')
     
+    if '--scale' in sys.argv:
+        # Mesma implementação do comando (bulk_create em blocos, seed, --workers)
+        call_command('populate_db', *sys.argv[1:])
+        return 0
+    
     # Verificar argumentos
     clear_data = '--clear' in sys.argv
     cars_only = '--cars-only' in sys.argv
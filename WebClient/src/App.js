@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { carService, calculationService, pedidoService, apiUtils } from "./api";
 import CartPage from "./CartPage";
 
@@ -12,6 +12,9 @@ function App() {
   const [carsLoading, setCarsLoading] = useState(false);
   const [pricingLoading, setPricingLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Chave de idempotência da compra em andamento: reenviar o mesmo carrinho
+  // (ex.: depois de um timeout) não cria um segundo pedido
+  const orderKeyRef = useRef(null);
   const [pricingError, setPricingError] = useState(null);
   const [purchaseResult, setPurchaseResult] = useState(null);
   const [showPurchasePage, setShowPurchasePage] = useState(false);
@@ -25,9 +28,9 @@ function App() {
       setError(null); // Limpar erro anterior
       try {
         console.log("🚗 Carregando carros da API...");
-        const response = await carService.getAll();
-        console.log("✅ Carros carregados:", response.data);
-        setCars(response.data.data || []);
+        const allCars = await carService.getAll();
+        console.log("✅ Carros carregados:", allCars.length);
+        setCars(allCars);
       } catch (err) {
         console.error("❌ Erro ao carregar carros:", err);
         setError(`Erro ao carregar carros: ${err.response?.data?.message || err.message}`);
@@ -108,6 +111,11 @@ function App() {
     setSelectedParts(newSelectedParts);
   };
 
+  // Carrinho alterado: a próxima compra é um pedido novo, com chave nova
+  useEffect(() => {
+    orderKeyRef.current = null;
+  }, [selectedParts]);
+
   //cálculo de preços em tempo real via Microsserviço B
   useEffect(() => {
     const calculatePricing = async () => {
@@ -178,7 +186,10 @@ function App() {
       console.log('🛒 Enviando pedido para Microsserviço B:', { items });
 
       // Criar pedido via Microsserviço B
-      const response = await pedidoService.create({ items });
+      if (!orderKeyRef.current) {
+        orderKeyRef.current = apiUtils.newIdempotencyKey();
+      }
+      const response = await pedidoService.create({ items }, orderKeyRef.current);
 
       if (response.data.status === 'success') {
         console.log('✅ Pedido criado via Microsserviço B:', response.data);
@@ -202,6 +213,7 @@ function App() {
           }))
         };
 
+        orderKeyRef.current = null;
         setPurchaseResult(mockResponse);
         setShowPurchasePage(true);
       } else {
@@ -5,6 +5,8 @@ import config from './config';
 const api = axios.create({
   baseURL: config.API_BASE_URL,
   timeout: config.API_TIMEOUT,
+  // Envia o cookie de leitura após escrita (réplica do catálogo no gateway)
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -35,8 +37,20 @@ api.interceptors.response.use(
 
 // Funções da API para carros
 export const carService = {
-  // Listar todos os carros
-  getAll: () => api.get('/cars/'),
+  // Uma página de carros (?cursor=<next_cursor>)
+  getPage: (cursor) => api.get('/cars/', { params: cursor ? { cursor } : {} }),
+  
+  // Listar todos os carros, seguindo next_cursor até a última página
+  getAll: async () => {
+    const cars = [];
+    let cursor = null;
+    do {
+      const response = await carService.getPage(cursor);
+      cars.push(...(response.data.data || []));
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return cars;
+  },
   
   // Obter peças de um carro específico
   getPecas: (carId) => api.get(`/cars/${carId}/pecas/`),
@@ -52,6 +66,8 @@ export const pecaService = {
     if (filters.car_id) params.append('car_id', filters.car_id);
     if (filters.min_valor) params.append('min_valor', filters.min_valor);
     if (filters.max_valor) params.append('max_valor', filters.max_valor);
+    if (filters.cursor) params.append('cursor', filters.cursor);
+    if (filters.limit) params.append('limit', filters.limit);
     
     const query = params.toString();
     return api.get(`/pecas/${query ? '?' + query : ''}`);
@@ -72,8 +88,10 @@ export const calculationService = {
 
 // Funções da API para pedidos (Microsserviço B)
 export const pedidoService = {
-  // Criar pedido
-  create: (orderData) => api.post('/orders/', orderData),
+  // Criar pedido (retries com a mesma idempotencyKey não duplicam o pedido)
+  create: (orderData, idempotencyKey) => api.post('/orders/', orderData, {
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+  }),
   
   // Obter relatório de um pedido
   getReport: (orderId) => api.get(`/orders/${orderId}/report/`),
@@ -81,6 +99,13 @@ export const pedidoService = {
 
 // Funções utilitárias
 export const apiUtils = {
+  // Nova chave para o cabeçalho Idempotency-Key
+  newIdempotencyKey: () => (
+    window.crypto?.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+  ),
+  
   // Health check dos microsserviços
   healthCheck: () => api.get('/health/'),
   